@@ -0,0 +1,73 @@
+import config
+import json
+import logging
+import os
+import sqlite3
+
+_Logger = logging.getLogger(__name__)
+
+# bump whenever the anchors or form labels extracted from a webpage change, so that cached pages are parsed again
+ANALYSIS_VERSION = 3
+
+
+class AnalysisCache:
+    """
+    Persistent cache of the anchors and form labels extracted from the downloaded webpages, keyed by page content hash
+    and analysis version. Several analysis processes can share the same cache file.
+    """
+
+    def __init__(self, cache_file=None) -> None:
+        self.cache_file = cache_file or config.ANALYSIS_CACHE_FILE
+        os.makedirs(os.path.dirname(self.cache_file) or ".", exist_ok=True)
+        self.connection = sqlite3.connect(self.cache_file, timeout=60, isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS webpages ("
+            "digest TEXT NOT NULL, version TEXT NOT NULL, anchors TEXT NOT NULL, form_labels TEXT NOT NULL, "
+            "PRIMARY KEY (digest, version))"
+        )
+
+    @property
+    def version(self):
+        # the parser backend changes the extracted text, pages parsed by another backend are not reused
+        return f"{ANALYSIS_VERSION}-{config.HTML_PARSER_BACKEND}"
+
+    def get(self, digest):
+        """returns (anchors, form labels) of a webpage or None if it is not cached"""
+
+        row = self.connection.execute(
+            "SELECT anchors, form_labels FROM webpages WHERE digest = ? AND version = ?", (digest, self.version)
+        ).fetchone()
+        if row is None:
+            return None
+        anchors, form_labels = row
+        return json.loads(anchors), json.loads(form_labels)
+
+    def put(self, digest, anchors, form_labels):
+        self.connection.execute(
+            "INSERT OR REPLACE INTO webpages VALUES (?, ?, ?, ?)",
+            (digest, self.version, json.dumps(anchors), json.dumps(form_labels)),
+        )
+
+    def close(self):
+        self.connection.close()
+
+
+# cache of the current process. sqlite connections must not be shared with forked analysis workers
+_analysis_cache = None
+_analysis_cache_pid = None
+
+
+def get_analysis_cache():
+    """returns the analysis cache of the current process"""
+
+    global _analysis_cache, _analysis_cache_pid
+    if (
+        _analysis_cache is None
+        or _analysis_cache_pid != os.getpid()
+        or _analysis_cache.cache_file != config.ANALYSIS_CACHE_FILE
+    ):
+        _analysis_cache = AnalysisCache()
+        _analysis_cache_pid = os.getpid()
+    return _analysis_cache
@@ -0,0 +1,398 @@
+import config, utils, page_store
+from utils import CandidateUtils
+from html.parser import HTMLParser
+from typing import NamedTuple
+from urllib.parse import urljoin, urlsplit
+from urllib.request import url2pathname
+from urllib.robotparser import RobotFileParser
+import asyncio
+import importlib.util
+import logging
+import mimetypes
+import os
+import time
+
+# httpx is imported when the first website is downloaded, local files are read without it
+
+_Logger = logging.getLogger(__name__)
+
+URLLENGTH_LIMIT = 2083  # longer links are not followed, like Scrapy's URLLENGTH_LIMIT
+
+
+class FetchedPage(NamedTuple):
+    url: str
+    status: int
+    headers: list
+    body: bytes
+    content_type: str
+    encoding: str
+
+
+class LinkCollector(HTMLParser):
+    """Collects the href of every anchor and the title of a webpage"""
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.links = []
+        self.title = None
+        self.in_title = False
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "a":
+            self.links.append(dict(attrs).get("href"))
+        elif tag == "title" and self.title is None:
+            self.title = ""
+            self.in_title = True
+
+    def handle_endtag(self, tag):
+        if tag == "title":
+            self.in_title = False
+
+    def handle_data(self, data):
+        if self.in_title:
+            self.title += data
+
+
+def is_text(content_type, body):
+    """Check if a page is a document whose links are followed, rather than an attachment saved as it is"""
+
+    if content_type:
+        return content_type.startswith("text/") or "html" in content_type or "xml" in content_type
+    return b"<html" in body[:1024].lower()
+
+
+def get_request_headers():
+    """returns config.HEADERS, only accepting the content encodings that can be decoded"""
+
+    headers = dict(config.HEADERS)
+    encodings = ["gzip", "deflate"]
+    if importlib.util.find_spec("brotli") or importlib.util.find_spec("brotlicffi"):
+        encodings.append("br")
+    headers["accept-encoding"] = ", ".join(encodings)
+    return headers
+
+
+def decode_body(page):
+    """returns the text of a page, in the encoding it declares if Python knows it"""
+
+    try:
+        return page.body.decode(page.encoding or "utf-8", "replace")
+    except LookupError:
+        return page.body.decode("utf-8", "replace")
+
+
+def parse_page(page):
+    """returns the href of every anchor and the title of a page, parsed by lxml when it is the config.HTML_PARSER_BACKEND"""
+
+    text = decode_body(page)
+    html = utils.get_lxml_html() if config.HTML_PARSER_BACKEND == "lxml" else None
+    # libxml2 silently stops at NUL bytes, such pages go to html.parser like in utils.LxmlWebpage
+    if html is not None and "\x00" not in text:
+        try:
+            document = html.document_fromstring(text)
+        except Exception:
+            document = None
+        if document is not None:
+            title = document.find(".//title")
+            return [link.get("href") for link in document.iter("a")], title.text if title is not None else None
+
+    collector = LinkCollector()
+    collector.feed(text)
+    collector.close()
+    return collector.links, collector.title
+
+
+def read_file(url):
+    with open(url2pathname(urlsplit(url).path), "rb") as f:
+        return f.read()
+
+
+class CandidateCrawl:
+    """Download state of a single candidate"""
+
+    def __init__(self, name, office, website) -> None:
+        self.key = (name, office, website)
+        self.name = name
+        self.office = office
+        self.website = website
+        self.frontier = set()
+        # links found in the candidate's pages
+        self.links = set()
+        self.pages = 0
+        self.bytes = 0
+        self.started = time.time()
+        self.stopped = False
+        # pool of the connections to the candidate's website, None for a local website
+        self.client = None
+
+
+class AsyncCrawler:
+    """
+    Downloads static candidate websites with asyncio, to the same database, page store and manifest as WebsiteCrawler.
+    Every candidate has a pool of connections to its website, over HTTP/2 when h2 is installed. Requests are limited to
+    config.ASYNC_CONCURRENCY in total and config.ASYNC_HOST_CONCURRENCY per host.
+    Pages are never rendered, focused crawls and sitemap seeding are left to the Scrapy engine.
+    """
+
+    def __init__(self, analysis_pipeline=None) -> None:
+        self.database_file = utils.get_database_file()
+        self.error_file = utils.get_error_file()
+        self.manifest_file = utils.get_manifest_file()
+        self.page_store = page_store.get_page_store()
+        self.analysis_pipeline = analysis_pipeline
+        self.headers = get_request_headers()
+        self.semaphore = None
+        self.host_semaphores = {}
+        # origin -> task getting its robots.txt parser, None when every page may be downloaded
+        self.robots = {}
+        self.saved = 0
+
+    async def crawl(self, candidates):
+        """Download the (name, office, website) candidates, config.ASYNC_CONCURRENCY at a time"""
+
+        self.semaphore = asyncio.Semaphore(config.ASYNC_CONCURRENCY)
+        pending = iter(sorted(candidates))
+
+        async def worker():
+            for candidate in pending:
+                await self.crawl_candidate(CandidateCrawl(*candidate))
+
+        try:
+            await asyncio.gather(*(worker() for _ in range(min(config.ASYNC_CONCURRENCY, len(candidates)))))
+        finally:
+            if self.page_store:
+                self.page_store.close()
+
+    def create_client(self):
+        """returns a pool of connections for a candidate's website"""
+
+        import httpx
+
+        # a pool per candidate stays small, httpx spends time proportional to the connections of a pool on every request
+        return httpx.AsyncClient(
+            headers=self.headers,
+            http2=importlib.util.find_spec("h2") is not None,
+            timeout=config.ASYNC_TIMEOUT,
+            follow_redirects=True,
+            # like Scrapy, campaign sites with broken certificates are still downloaded
+            verify=False,
+            limits=httpx.Limits(max_connections=config.ASYNC_HOST_CONCURRENCY, max_keepalive_connections=config.ASYNC_HOST_CONCURRENCY),
+        )
+
+    async def crawl_candidate(self, crawl):
+        """Download a candidate's website breadth first, a depth at a time"""
+
+        _Logger.info(f"Working on {crawl.name}->{crawl.office}->{crawl.website}")
+        if not crawl.website.startswith("file://"):
+            crawl.client = self.create_client()
+        depth = 0
+        urls = [crawl.website] if self.enqueue_once(crawl, crawl.website) else []
+        try:
+            while urls and not crawl.stopped:
+                links = await asyncio.gather(*(self.download(crawl, url, depth) for url in urls))
+                urls = [url for page_links in links for url in page_links if self.enqueue_once(crawl, url)]
+                depth += 1
+        finally:
+            if crawl.client is not None:
+                await crawl.client.aclose()
+
+        status = "done" if crawl.pages else "failed"
+        _Logger.info(f"Download of {crawl.name}->{crawl.office} {status} with {crawl.pages} pages")
+        self.manifest_file.writerow([*crawl.key, status, crawl.pages, int(time.time())])
+        if self.analysis_pipeline:
+            self.analysis_pipeline.end_candidate(crawl.key)
+
+    def enqueue_once(self, crawl, url):
+        """Check the url against the candidate's frontier and add it, see WebsiteCrawler.enqueueOnce"""
+
+        fingerprint = utils.get_url_fingerprint(utils.canonicalize_url(url))
+        if fingerprint in crawl.frontier:
+            return False
+        crawl.frontier.add(fingerprint)
+        return True
+
+    async def download(self, crawl, url, depth):
+        """Download and save a page, returns the links to follow"""
+
+        if crawl.stopped:
+            return []
+        if not await self.is_allowed(crawl, url):
+            _Logger.debug(f"{url} forbidden by robots.txt")
+            self.error_file.writerow([crawl.name, url, depth, "IgnoreRequest: Forbidden by robots.txt"])
+            return []
+        try:
+            page = await self.fetch(crawl, url)
+        except Exception as e:
+            _Logger.error(f"Could not download {url}: {repr(e)}")
+            self.error_file.writerow([crawl.name, url, depth, repr(e)])
+            return []
+        if page.status != 200:
+            _Logger.error(f"{page.status} error on url {url}")
+            self.error_file.writerow([crawl.name, url, depth, f"HttpError: Ignoring non-200 response ({page.status})"])
+            return []
+        # pages of a stopped candidate that were already downloading
+        if crawl.stopped:
+            return []
+        # a redirect target is saved, and its links resolved, under its own url, once like any other page
+        if page.url != url:
+            if not self.enqueue_once(crawl, page.url) and utils.canonicalize_url(page.url) != utils.canonicalize_url(url):
+                _Logger.debug(f"{url} redirected to {page.url}, already downloaded")
+                return []
+            url = page.url
+
+        links, title = parse_page(page) if is_text(page.content_type, page.body) else ([], None)
+        self.save_page(crawl, url, depth, page, title)
+
+        crawl.pages += 1
+        crawl.bytes += len(page.body)
+        self.check_budget(crawl, url, depth)
+        if crawl.stopped or depth > config.MAX_DEPTH:
+            return []
+        return self.get_links(crawl, url, links)
+
+    async def fetch(self, crawl, url):
+        """returns the FetchedPage of a url of a candidate's website, local files are read in a thread"""
+
+        if url.startswith("file://"):
+            body = await asyncio.to_thread(read_file, url)
+            content_type = mimetypes.guess_type(urlsplit(url).path)[0] or ""
+            return FetchedPage(url, 200, [], body, content_type, None)
+
+        async with self.get_host_semaphore(url), self.semaphore:
+            response = await crawl.client.get(url)
+        content_type = response.headers.get("content-type", "").split(";")[0].strip().lower()
+        return FetchedPage(str(response.url), response.status_code, response.headers.multi_items(), response.content, content_type, response.encoding)
+
+    def get_host_semaphore(self, url):
+        host = urlsplit(url).netloc
+        if host not in self.host_semaphores:
+            self.host_semaphores[host] = asyncio.Semaphore(config.ASYNC_HOST_CONCURRENCY)
+        return self.host_semaphores[host]
+
+    async def is_allowed(self, crawl, url):
+        """Check a url against the robots.txt of its site, fetched once per site"""
+
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https"):
+            return True
+        origin = f"{parts.scheme}://{parts.netloc}"
+        if origin not in self.robots:
+            self.robots[origin] = asyncio.ensure_future(self.get_robots(crawl, origin))
+        robots = await self.robots[origin]
+        return robots is None or robots.can_fetch(self.headers["user-agent"], url)
+
+    async def get_robots(self, crawl, origin):
+        """returns the robots.txt parser of a site, None if the site has no robots.txt"""
+
+        try:
+            page = await self.fetch(crawl, origin + "/robots.txt")
+        except Exception as e:
+            _Logger.debug(f"Could not get {origin}/robots.txt: {repr(e)}")
+            return None
+        if page.status != 200:
+            return None
+        robots = RobotFileParser()
+        robots.parse(decode_body(page).splitlines())
+        return robots
+
+    def save_page(self, crawl, url, depth, page, page_title):
+        """Save a page to a html file, or to the page store set by config.PAGE_STORAGE, see WebsiteCrawler.saveHtml"""
+
+        candidate_name = crawl.name.replace(" ", "")
+        filetocreate = page_store.get_webpage_path(candidate_name, crawl.office, url, page_title)
+        if self.page_store:
+            storage = self.page_store.save(
+                page.body,
+                url=url,
+                status=page.status,
+                headers=page.headers,
+                metadata={"name": candidate_name, "office": crawl.office, "depth": depth},
+            )
+            _Logger.debug(f"Saving {page.url}, Path -> {filetocreate}, Blob -> {storage}")
+        else:
+            storage = ""
+            os.makedirs(os.path.dirname(filetocreate), exist_ok=True)
+            _Logger.debug(f"Saving {page.url}, Path -> {filetocreate}")
+            with open(filetocreate, "wb") as f:
+                f.write(page.body)
+
+        fetcher = "file" if url.startswith("file://") else "http"
+        self.database_file.writerow([candidate_name, url, filetocreate, depth, fetcher, storage])
+        self.saved += 1
+        if self.analysis_pipeline:
+            self.analysis_pipeline.put_page(crawl.key, filetocreate, storage)
+
+    def check_budget(self, crawl, url, depth):
+        """Stop a candidate whose download went over the page, byte or time budget, see WebsiteCrawler.checkCandidateBudget"""
+
+        if config.CANDIDATE_MAX_PAGES and crawl.pages >= config.CANDIDATE_MAX_PAGES:
+            reason = f"page budget of {config.CANDIDATE_MAX_PAGES} pages reached"
+        elif config.CANDIDATE_MAX_BYTES and crawl.bytes >= config.CANDIDATE_MAX_BYTES:
+            reason = f"byte budget of {config.CANDIDATE_MAX_BYTES} bytes reached"
+        elif config.CANDIDATE_MAX_SECONDS and time.time() - crawl.started >= config.CANDIDATE_MAX_SECONDS:
+            reason = f"time budget of {config.CANDIDATE_MAX_SECONDS} seconds reached"
+        else:
+            return
+        if not crawl.stopped:
+            _Logger.info(f"Stopping download of {crawl.name}->{crawl.office}: {reason}")
+            self.error_file.writerow([crawl.name, url, depth, f"Download stopped: {reason}"])
+        crawl.stopped = True
+
+    def get_links(self, crawl, page_url, hrefs):
+        """returns the same domain links of a page to follow that the candidate's pages did not link to yet, see WebsiteCrawler.followLinks"""
+
+        # local websites link to local files, web pages only to web pages
+        schemes = ("file",) if page_url.startswith("file://") else ("http", "https")
+        # navigation and footer links repeat on every page, they are only checked once.
+        # Relative links other than queries resolve the same from every page of a folder
+        folder = page_url.rsplit("/", 1)[0]
+        links = []
+        for href in dict.fromkeys(hrefs):
+            if not href or href.startswith("?"):
+                if not href or (page_url, href) in crawl.links:
+                    continue
+                crawl.links.add((page_url, href))
+            elif (folder, href) in crawl.links:
+                continue
+            else:
+                crawl.links.add((folder, href))
+            if utils.skipUrl(href):
+                continue
+            url = href if utils.isAbsolute(href) else urljoin(page_url, href)
+            if url in crawl.links:
+                continue
+            crawl.links.add(url)
+            if not utils.isSameDomain(page_url, href):
+                continue
+            if urlsplit(url).scheme not in schemes or len(url) > URLLENGTH_LIMIT:
+                continue
+            links.append(url)
+        return links
+
+
+def start(analysis_pipeline=None):
+    """Download the pending candidates with the asyncio engine. Their pages are handed to analysis_pipeline as they are saved, if given"""
+
+    candidates = {candidate for candidate in CandidateUtils.load_candidates() if candidate[2]}
+    pending = utils.get_pending_candidates(candidates)
+    _Logger.info(f"{len(candidates) - len(pending)} candidates already downloaded, {len(pending)} to download")
+    if not pending:
+        _Logger.info("Download already completed")
+        return
+    if any(not website.startswith("file://") for _, _, website in pending) and importlib.util.find_spec("httpx") is None:
+        _Logger.error("The asyncio download engine needs httpx: pip install httpx, or httpx[http2] for HTTP/2")
+        return
+
+    utils.create_html_folder()
+    start_time = time.time()
+    crawler = AsyncCrawler(analysis_pipeline)
+    asyncio.run(crawler.crawl(pending))
+    elapsed = time.time() - start_time
+    _Logger.info(f"----Time taken in seconds----:{elapsed}, {crawler.saved} pages ({crawler.saved / max(elapsed, 1e-6):.0f} pages/s)")
+
+
+if __name__ == "__main__":
+    if config.OUTPUT_ROOT:
+        utils.set_output_root(config.OUTPUT_ROOT)
+    utils.create_logger()
+    start()
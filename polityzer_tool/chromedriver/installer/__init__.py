@@ -7,17 +7,26 @@ from typing import Optional, AnyStr
 from . import utils
 
 
-def install(cwd: bool = False, path: Optional[AnyStr] = None):
+def install(
+    cwd: bool = False,
+    path: Optional[AnyStr] = None,
+    version: Optional[str] = None,
+    cache_dir: Optional[AnyStr] = None,
+    sha256: Optional[str] = None,
+):
     """
     Appends the directory of the chromedriver binary file to PATH.
 
     :param cwd: Flag indicating whether to download to current working directory. If the `cwd` is True, then path argument will be ignored.
     :param path: Specify the path where the Chrome driver will be installed. If the `cwd` value is True, this value is ignored.
+    :param version: Pinned chromedriver version, installed without probing chrome. None to match the installed chrome.
+    :param cache_dir: Local artifact cache directory the chromedriver archives are read from and saved to.
+    :param sha256: Expected checksum of the chromedriver archive.
     :return: The file path of chromedriver
     """
     if cwd:
         path = os.getcwd()
-    chromedriver_filepath = utils.download_chromedriver(path)
+    chromedriver_filepath = utils.download_chromedriver(path, version=version, cache_dir=cache_dir, sha256=sha256)
     if not chromedriver_filepath:
         logging.debug("Can not download chromedriver.")
         return
@@ -5,6 +5,9 @@ Helper functions for filename and URL generation.
 
 import sys
 import os
+import glob
+import hashlib
+import json
 import subprocess
 import urllib.request
 import urllib.error
@@ -183,6 +186,177 @@ def get_matched_chromedriver_version(version):
     return
 
 
+def get_chrome_fingerprint():
+    """
+    Identifies the installed chrome binary without running it, so that a driver matched to it can be reused until chrome
+    is updated.
+    :return: [path, modification time, size] of the chrome executable or None if it is not found
+    """
+    platform, _ = get_platform_architecture()
+    try:
+        if platform == "linux":
+            path = os.path.realpath(get_linux_executable_path())
+        elif platform == "mac":
+            path = "/Applications/Google Chrome.app/Contents/MacOS/Google Chrome"
+        else:
+            return None
+        stat = os.stat(path)
+    except (OSError, ValueError):
+        return None
+    return [path, stat.st_mtime_ns, stat.st_size]
+
+
+def get_file_sha256(path):
+    """
+    :param path: path of the file
+    :return: the sha256 hex digest of the file
+    """
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def get_stamp_path(chromedriver_filepath):
+    """
+    :return: path of the file recording the version, checksum and chrome of an installed chromedriver
+    """
+    return chromedriver_filepath + ".json"
+
+
+def read_stamp(chromedriver_filepath):
+    try:
+        with open(get_stamp_path(chromedriver_filepath)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_stamp(chromedriver_filepath, chromedriver_version):
+    stamp = {
+        "version": chromedriver_version,
+        "sha256": get_file_sha256(chromedriver_filepath),
+        "chrome": get_chrome_fingerprint(),
+    }
+    with open(get_stamp_path(chromedriver_filepath), "w") as f:
+        json.dump(stamp, f)
+
+
+def is_installed_chromedriver_current(chromedriver_filepath, version=None):
+    """
+    Fast path that neither runs chrome nor uses the network: an installed chromedriver is current when its binary still
+    has the checksum recorded at install time, and it is the pinned version or was installed for the same chrome binary.
+    :param chromedriver_filepath: path of the installed chromedriver
+    :param version: pinned chromedriver version, None to match the installed chrome
+    :return: True if the installed chromedriver can be used as is
+    """
+    stamp = read_stamp(chromedriver_filepath)
+    if not stamp or not os.path.isfile(chromedriver_filepath):
+        return False
+    if get_file_sha256(chromedriver_filepath) != stamp.get("sha256"):
+        return False
+    if version:
+        return stamp.get("version") == version
+    fingerprint = get_chrome_fingerprint()
+    return fingerprint is not None and fingerprint == stamp.get("chrome")
+
+
+def get_cached_archive_path(cache_dir, version):
+    """
+    :return: path of a chromedriver archive in the local artifact cache
+    """
+    platform, architecture = get_platform_architecture()
+    return os.path.join(cache_dir, f"chromedriver_{platform}{architecture}-{version}.zip")
+
+
+def find_cached_chromedriver_version(cache_dir, chrome_version):
+    """
+    :param cache_dir: local artifact cache directory
+    :param chrome_version: the version of chrome
+    :return: the newest cached chromedriver version for the major version of chrome or None
+    """
+    if not cache_dir:
+        return None
+    platform, architecture = get_platform_architecture()
+    prefix = f"chromedriver_{platform}{architecture}-"
+    pattern = os.path.join(cache_dir, prefix + get_major_version(chrome_version) + ".*.zip")
+    versions = [os.path.basename(archive_path)[len(prefix) : -len(".zip")] for archive_path in glob.glob(pattern)]
+    if not versions:
+        return None
+    return max(versions, key=lambda version: [int(part) for part in version.split(".") if part.isdigit()])
+
+
+def read_cached_archive(cache_dir, version, sha256=None):
+    """
+    Reads a chromedriver archive from the local artifact cache, checking it against the checksum saved next to it and
+    against `sha256` if given.
+    :return: the archive bytes or None if it is not cached or fails the checks
+    """
+    if not cache_dir:
+        return None
+    archive_path = get_cached_archive_path(cache_dir, version)
+    if not os.path.isfile(archive_path):
+        return None
+    with open(archive_path, "rb") as f:
+        archive = f.read()
+    digest = hashlib.sha256(archive).hexdigest()
+    checksum_path = archive_path + ".sha256"
+    try:
+        with open(checksum_path) as f:
+            saved_checksum = f.read().strip()
+    except FileNotFoundError:
+        saved_checksum = None
+    except OSError as e:
+        _Logger.warning(f"Could not read the checksum file {checksum_path} of the cached chromedriver archive: {e}. Ignoring the archive")
+        return None
+    if saved_checksum is None:
+        if not sha256:
+            _Logger.warning(f"The cached chromedriver archive {archive_path} has no checksum file and no sha256 is configured. Ignoring it")
+            return None
+    elif not re.fullmatch(r"[0-9a-f]{64}", saved_checksum):
+        _Logger.warning(f"The checksum file {checksum_path} is empty or truncated, the archive was not fully cached. Ignoring it")
+        return None
+    elif digest != saved_checksum:
+        _Logger.warning(f"The cached chromedriver archive {archive_path} does not match its saved checksum. Ignoring it")
+        return None
+    if sha256 and digest != sha256:
+        _Logger.warning(f"The cached chromedriver archive {archive_path} does not match the configured sha256. Ignoring it")
+        return None
+    return archive
+
+
+def write_cached_archive(cache_dir, version, archive):
+    """
+    Saves a downloaded chromedriver archive and its checksum to the local artifact cache.
+    """
+    if not cache_dir:
+        return
+    os.makedirs(cache_dir, exist_ok=True)
+    archive_path = get_cached_archive_path(cache_dir, version)
+    # both files are renamed into place, an interrupted write leaves no partial archive or checksum behind
+    with open(archive_path + ".tmp", "wb") as f:
+        f.write(archive)
+    os.replace(archive_path + ".tmp", archive_path)
+    with open(archive_path + ".sha256.tmp", "w") as f:
+        f.write(hashlib.sha256(archive).hexdigest() + "\n")
+    os.replace(archive_path + ".sha256.tmp", archive_path + ".sha256")
+
+
+def download_chromedriver_archive(version, sha256=None):
+    """
+    :return: the chromedriver archive downloaded from chromedriver.storage.googleapis.com
+    """
+    url = get_chromedriver_url(version=version)
+    try:
+        response = urllib.request.urlopen(url)
+        if response.getcode() != 200:
+            raise urllib.error.URLError("Not Found")
+    except urllib.error.URLError:
+        raise RuntimeError(f"Failed to download chromedriver archive: {url}")
+    archive = response.read()
+    if sha256 and hashlib.sha256(archive).hexdigest() != sha256:
+        raise RuntimeError(f"Checksum mismatch for the chromedriver archive: {url}")
+    return archive
+
+
 def get_chromedriver_path():
     """
     :return: path of the chromedriver binary
@@ -197,19 +371,38 @@ def print_chromedriver_path():
     print(get_chromedriver_path())
 
 
-def download_chromedriver(path: Optional[AnyStr] = None):
+def download_chromedriver(
+    path: Optional[AnyStr] = None,
+    version: Optional[str] = None,
+    cache_dir: Optional[AnyStr] = None,
+    sha256: Optional[str] = None,
+):
     """
     Downloads, unzips and installs chromedriver.
     If a chromedriver binary is found in PATH it will be copied, otherwise downloaded.
+    Archives are taken from and saved to the local artifact cache `cache_dir`, so that later installs need no network.
 
     :param str path: Path of the directory where to save the downloaded chromedriver to.
+    :param str version: Pinned chromedriver version. Chrome is not probed when it is set.
+    :param str cache_dir: Local artifact cache directory of the chromedriver archives.
+    :param str sha256: Expected checksum of the chromedriver archive.
     :return: The file path of chromedriver
     """
-    chrome_version = get_chrome_version()
-    if not chrome_version:
-        _Logger.debug("Chrome is not installed.")
-        return
-    chromedriver_version = get_matched_chromedriver_version(chrome_version)
+    if path:
+        chromedriver_filepath = os.path.join(os.path.abspath(path), get_chromedriver_filename())
+        if is_installed_chromedriver_current(chromedriver_filepath, version):
+            _Logger.debug("Chromedriver is already installed and verified.")
+            return chromedriver_filepath
+
+    chromedriver_version = version
+    if not chromedriver_version:
+        chrome_version = get_chrome_version()
+        if not chrome_version:
+            _Logger.debug("Chrome is not installed.")
+            return
+        chromedriver_version = find_cached_chromedriver_version(cache_dir, chrome_version)
+        if not chromedriver_version:
+            chromedriver_version = get_matched_chromedriver_version(chrome_version)
     if not chromedriver_version:
         _Logger.warning("Can not find chromedriver for currently installed chrome version.")
         return
@@ -228,20 +421,19 @@ def download_chromedriver(path: Optional[AnyStr] = None):
         _Logger.info(f"Downloading chromedriver ({chromedriver_version})...")
         if not os.path.isdir(chromedriver_dir):
             os.makedirs(chromedriver_dir)
-        url = get_chromedriver_url(version=chromedriver_version)
-        try:
-            response = urllib.request.urlopen(url)
-            if response.getcode() != 200:
-                raise urllib.error.URLError("Not Found")
-        except urllib.error.URLError:
-            raise RuntimeError(f"Failed to download chromedriver archive: {url}")
-        archive = BytesIO(response.read())
-        with zipfile.ZipFile(archive) as zip_file:
+        archive = read_cached_archive(cache_dir, chromedriver_version, sha256)
+        if archive is None:
+            archive = download_chromedriver_archive(chromedriver_version, sha256)
+            write_cached_archive(cache_dir, chromedriver_version, archive)
+        else:
+            _Logger.info(f"Using the cached chromedriver archive ({chromedriver_version})")
+        with zipfile.ZipFile(BytesIO(archive)) as zip_file:
             zip_file.extract(chromedriver_filename, chromedriver_dir)
     else:
         _Logger.info("Chromedriver is already installed.")
     if not os.access(chromedriver_filepath, os.X_OK):
         os.chmod(chromedriver_filepath, 0o744)
+    write_stamp(chromedriver_filepath, chromedriver_version)
     return chromedriver_filepath
 
 
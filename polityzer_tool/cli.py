@@ -0,0 +1,103 @@
+import argparse
+import os
+import sys
+
+# the polityzer modules import each other as top level modules
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import config  # noqa: E402
+
+# stage name -> config flag enabling the stage
+STAGES = {
+    "download": "DOWNLOAD_SITES",
+    "privacy_policy": "PRIVACY_POLICY_ANALYSIS",
+    "link_extractor": "LINK_EXTRACTOR_ANALYSIS",
+    "form_extractor": "FORM_EXTRACTOR_ANALYSIS",
+}
+ANALYSIS_STAGES = ["privacy_policy", "link_extractor", "form_extractor"]
+
+
+def shard(value):
+    """argparse type of the --shard option"""
+
+    import utils
+
+    try:
+        utils.parse_shard(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid shard {value!r}, expected K/N with 1 <= K <= N")
+    return value
+
+
+def get_parser():
+    parser = argparse.ArgumentParser(
+        prog="polityzer",
+        description="Download the websites of election campaigns and analyze their privacy policies, links and forms. "
+        "Settings not given on the command line are read from config.py",
+    )
+    parser.add_argument(
+        "-C",
+        "--directory",
+        help="folder holding the database, html and results folders, the current folder by default",
+    )
+    parser.add_argument(
+        "-s",
+        "--stage",
+        action="append",
+        choices=list(STAGES) + ["analysis"],
+        help="stage to run, can be repeated. 'analysis' runs the three analyzers. The stages enabled in config.py by default",
+    )
+    parser.add_argument(
+        "--engine",
+        choices=["scrapy", "asyncio"],
+        help="download engine. 'asyncio' is faster on static sites but never renders pages with headless Chrome",
+    )
+    parser.add_argument("--name", action="append", help="only process the candidate with this name, can be repeated")
+    parser.add_argument("--office", action="append", help="only process the candidates running for this office, can be repeated")
+    parser.add_argument(
+        "--state", action="append", help="only process the candidates of this state, can be repeated. Needs a state column in the candidate file"
+    )
+    parser.add_argument("--shard", type=shard, help="only process the K-th of N deterministic partitions of the candidates, e.g. 3/16")
+    parser.add_argument(
+        "-o",
+        "--output-root",
+        help="folder the html, database, logs and results folders are written to. shards/shard-K-of-N with --shard, the current folder otherwise",
+    )
+    return parser
+
+
+def main(argv=None):
+    args = get_parser().parse_args(argv)
+
+    if args.directory:
+        os.chdir(args.directory)
+    if args.stage:
+        stages = set(args.stage)
+        if "analysis" in stages:
+            stages.update(ANALYSIS_STAGES)
+        for stage, flag in STAGES.items():
+            setattr(config, flag, int(stage in stages))
+    if args.engine:
+        config.DOWNLOAD_ENGINE = args.engine
+    if args.name:
+        config.CANDIDATE_NAMES = args.name
+    if args.office:
+        config.CANDIDATE_OFFICES = args.office
+    if args.state:
+        config.CANDIDATE_STATES = args.state
+    if args.shard:
+        config.CANDIDATE_SHARD = args.shard
+    if args.output_root:
+        config.OUTPUT_ROOT = args.output_root
+    elif args.shard:
+        import utils
+
+        config.OUTPUT_ROOT = utils.get_shard_root(args.shard)
+
+    import polityzer
+
+    polityzer.main()
+
+
+if __name__ == "__main__":
+    main()
@@ -17,6 +17,24 @@ HEADERS = {
 # chromedriver settings
 CHROMEDRIVER_FOLDER = "chromedriver"
 CHROMEDRIVER_PATH = os.path.join(CHROMEDRIVER_FOLDER, "chromedriver")  # path to the chromedriver executable
+CHROMEDRIVER_VERSION = None  # chromedriver version to install, e.g. "114.0.5735.90". None installs the version matching the installed Chrome
+CHROMEDRIVER_CACHE_FOLDER = os.path.join(
+    os.path.expanduser("~"), ".cache", "polityzer", "chromedriver"
+)  # local cache of the downloaded chromedriver archives. Copy the archives there to install chromedriver without network access
+CHROMEDRIVER_SHA256 = None  # expected sha256 of the chromedriver archive of CHROMEDRIVER_VERSION, None to only check the archives against the checksums saved in the cache
+SELENIUM_POOL_SIZE = 4  # number of headless Chrome instances kept warm to render pages concurrently
+SELENIUM_POOL_MAX_PAGES = 200  # pages a Chrome instance renders before it is replaced by a fresh one, 0 to never replace it
+SELENIUM_BLOCK_RESOURCES = 1  # do not load images, fonts, media and trackers when rendering pages, the analyses only need the DOM
+SELENIUM_BLOCKED_EXTENSIONS = [  # extensions of the images, fonts and media chrome does not load when SELENIUM_BLOCK_RESOURCES is set. Only the urls whose path ends with one are blocked, so never list a document extension
+    ".png", ".jpg", ".jpeg", ".gif", ".webp", ".svg", ".ico",
+    ".woff", ".woff2", ".ttf", ".otf", ".eot",
+    ".mp4", ".webm", ".mp3", ".m4a", ".ogg",
+]
+SELENIUM_BLOCKED_HOSTS = [  # third party hosts, and their subdomains, chrome does not load when SELENIUM_BLOCK_RESOURCES is set
+    "google-analytics.com", "googletagmanager.com", "doubleclick.net", "googlesyndication.com",
+    "connect.facebook.net", "hotjar.com", "fonts.googleapis.com", "fonts.gstatic.com",
+    "youtube.com", "vimeo.com",
+]
 
 # crawler settings
 MAX_DEPTH = 2  # depth to which candidate websites will be crawled by the crawler
@@ -24,7 +42,51 @@ DATABASE_FOLDER = "database"  # folder that contains the different database file
 CANDIDATE_OFFICE_WEBSITE = os.path.join(
     DATABASE_FOLDER, "candidate_office_website.csv"
 )  # input file containing the list of the candidates, their offices and website links that are to be crawled and downloaded
+CANDIDATE_NAMES = []  # only download and analyze the candidates with these names, every candidate when empty. Also set by 'polityzer --name'
+CANDIDATE_OFFICES = []  # only download and analyze the candidates running for these offices, every office when empty. Also set by 'polityzer --office'
+CANDIDATE_STATES = []  # only download and analyze the candidates of these states, needs a "state" column in CANDIDATE_OFFICE_WEBSITE. Also set by 'polityzer --state'
+CANDIDATE_SHARD = None  # "K/N" to only download and analyze the K-th of N deterministic partitions of the candidates. Also set by 'polityzer --shard'
+OUTPUT_ROOT = None  # folder the html, page store, database, logs and results folders are created in, the current folder when None. The candidate file and chromedriver stay shared. Also set by 'polityzer --output-root'
+SHARDS_FOLDER = "shards"  # folder of the output roots of a sharded run, 'polityzer --shard K/N' writes to shards/shard-K-of-N. Combine them with 'python merge_shards.py'
 HTML_FOLDER = "html"  # folder where the candidate website pages will be downloaded to
+CRAWL_MANIFEST = os.path.join(
+    DATABASE_FOLDER, "crawl_manifest.csv"
+)  # csv recording the candidates whose download finished, only missing, failed or stale candidates are downloaded again
+RECRAWL_AFTER_DAYS = 0  # days after which a downloaded candidate is considered stale and downloaded again, 0 to never download it again
+CRAWL_JOBDIR = os.path.join(
+    DATABASE_FOLDER, "crawl_state"
+)  # folder where Scrapy persists the state of the crawl so that an interrupted crawl continues where it stopped, "" to disable
+PAGE_STORAGE = "blobs"  # how downloaded pages are saved: "blobs" (compressed, deduplicated by content in PAGE_STORE_FOLDER), "warc" (appended to gzipped WARC files in WARC_FOLDER) or "files" (one file per page in HTML_FOLDER)
+PAGE_STORE_FOLDER = "pages"  # folder of the content addressed page store
+PAGE_STORE_COMPRESSION = "gzip"  # compression of the stored pages: "gzip" or "zstd" (requires the zstandard package)
+WARC_FOLDER = "warc"  # folder of the WARC files written when PAGE_STORAGE is "warc"
+WARC_MAX_SIZE = 1024 * 1024 * 1024  # size in bytes after which a new WARC file is started
+ATTACHMENTS_FOLDER = "attachments"  # folder where the files downloaded by headless Chrome while rendering pages are saved
+TRACKING_QUERY_PARAMS = ["gclid", "fbclid", "msclkid", "mc_cid", "mc_eid", "refcode"]  # query parameters, besides utm_*, ignored when deciding if two links point to the same page
+FOCUSED_CRAWL = 0  # download the links that look like privacy policy or terms pages first, for runs that only need PRIVACY_POLICY_ANALYSIS
+FOCUSED_PAGE_BUDGET = 20  # pages downloaded per candidate in a focused crawl, 0 for no limit
+FOCUSED_STOP_ON_POLICY = 1  # stop a candidate's focused crawl as soon as its privacy policy page is downloaded
+FOCUSED_POLICY_KEYWORDS = ["privacy"]  # words marking the link to the privacy policy page itself in a focused crawl, matched case insensitively in link texts and urls. Add e.g. "privacidad" for Spanish sites, along with PRIVACY_KEYWORDS so that the link is downloaded first
+CANDIDATE_MAX_PAGES = 0  # pages downloaded per candidate before its crawl is stopped, 0 for no limit
+CANDIDATE_MAX_BYTES = 0  # total size in bytes of the pages downloaded per candidate before its crawl is stopped, 0 for no limit
+CANDIDATE_MAX_SECONDS = 0  # seconds after its first request a candidate's crawl is stopped, 0 for no limit
+SITEMAP_SEEDING = 0  # also seed each candidate's crawl with the pages listed in its sitemaps, found in robots.txt or at /sitemap.xml
+SITEMAP_MAX_URLS = 500  # pages seeded from the sitemaps of a candidate, 0 for no limit
+DOMAIN_CACHE_SIZE = 65536  # number of hosts whose registered domain is memoized when checking if links are same domain
+DOWNLOAD_ENGINE = "scrapy"  # "scrapy" downloads with Scrapy and renders the pages that need JavaScript with headless Chrome. "asyncio" only fetches pages over plain HTTP, for static sites, and needs httpx. Also set by 'polityzer --engine'
+ASYNC_CONCURRENCY = 64  # requests in flight, and candidates downloaded at a time, with the asyncio engine
+ASYNC_HOST_CONCURRENCY = 8  # requests in flight per host with the asyncio engine
+ASYNC_TIMEOUT = 20  # seconds after which a request of the asyncio engine fails
+HYBRID_FETCH = 1  # fetch pages over plain HTTP first and render them with headless Chrome only when they seem to need JavaScript
+SPA_MARKERS = [
+    '<div id="root"></div>',
+    '<div id="app"></div>',
+    'id="__next"',
+    "data-reactroot",
+    "ng-version=",
+    "window.__NUXT__",
+    "You need to enable JavaScript",
+]  # markers of javascript rendered single page apps, pages containing them are always rendered with headless Chrome
 
 # normal logs settings
 LOGS_FOLDER = "logs"  # logs produced during the crawling and analysis
@@ -44,14 +106,27 @@ ERROR_FILEPATH = os.path.join(
 
 # results settings
 RESULTS_FOLDER = "results"  # folder containing the results produced by the different analyzer scripts
+RESULTS_FORMAT = "json"  # "json" writes each result file once the analysis is over, "jsonl" writes one line per candidate as soon as it is analyzed next to it (convert with 'python result_writer.py')
 
 
 # Individual component settings
 # Crawler/Downlader
 DOWNLOAD_SITES = 1
 
+# analysis settings
+ANALYSIS_WORKERS = os.cpu_count() or 1  # number of processes the candidates are sharded across during analysis, 1 analyzes them in the main process
+ANALYSIS_CHUNKSIZE = 4  # number of candidates handed to an analysis worker at a time
+PIPELINE_ANALYSIS = 0  # when downloading, analyze the pages in the ANALYSIS_WORKERS processes while the crawl goes on instead of after it. A candidate's results are written as soon as its download completes
+PIPELINE_QUEUE_SIZE = 1000  # downloaded pages waiting for each analysis worker in PIPELINE_ANALYSIS mode. The crawl waits while the queue of a worker is full
+ANALYSIS_CACHE = 1  # keep the links, anchor texts and form labels extracted from every webpage so that unchanged webpages are not parsed again by later runs
+ANALYSIS_CACHE_FILE = os.path.join(DATABASE_FOLDER, "analysis_cache.sqlite")  # sqlite database of the analysis cache
+HTML_PARSER_BACKEND = "lxml"  # parser used to extract links and forms from the downloaded webpages: "lxml" (fast, falls back to "html.parser" on webpages it cannot parse) or "html.parser"
+
 # privacy_policy_analyzer settings
 PRIVACY_POLICY_ANALYSIS = 1
+PRIVACY_KEYWORDS = [
+    "privacy", "terms", "conditions", "notice", "statement", "disclosure",
+]  # words marking links to privacy policies in link texts and urls, matched case insensitively. Add e.g. "privacidad", "términos", "condiciones", "aviso" for Spanish sites
 PRIVACY_POLICY_RESULTS = os.path.join(
     RESULTS_FOLDER, "privacy_policy_result.json"
 )  # result file that lists whether the candidates have privacy policies in their websites as well as potential privacy policy links found in their website
@@ -1,7 +1,6 @@
-import config
+import config, utils, result_writer
 from utils import CandidateUtils
 import logging
-import json
 
 _Logger = logging.getLogger(__name__)
 
@@ -10,25 +9,59 @@ class FormExtractor:
     def __init__(self) -> None:
         self.candidates = CandidateUtils.load_candidates()
 
-    def extract_formfields(self):
-        candidate_fields = dict()
+    def prepare(self):
+        """Create the folders the analysis writes to"""
+
+        utils.create_results_folder()
+
+    def begin_candidate(self, candidate, candidate_office, candidate_website):
+        _Logger.debug(f"Working on {candidate},{candidate_office}")
+        self.candidate = candidate
+        self.candidate_office = candidate_office
+        self.candidate_website = candidate_website
+        self.input_fields = set()
+
+    def analyze_webpage(self, webpage, page):
+        self.input_fields.update(page.get_form_labels())
+
+    def end_candidate(self):
+        form_fields = list(self.input_fields)
+        _Logger.debug(f"extracted fields for {self.candidate}-{self.candidate_office}:{str(form_fields)}")
+        return {
+            "office": self.candidate_office,
+            "website": self.candidate_website,
+            "form_fields": form_fields,
+        }
+
+    def iter_results(self):
+        """yields every candidate with its result entry as soon as it is analyzed"""
+
+        self.prepare()
         for candidate, candidate_office, candidate_website in self.candidates:
             _Logger.debug(f"Working on {candidate},{candidate_office}")
 
             form_fields = CandidateUtils.get_form_fields(candidate, candidate_office)
             _Logger.debug(f"extracted fields for {candidate}-{candidate_office}:{str(form_fields)}")
-            candidate_fields[candidate] = {
+            yield candidate, {
                 "office": candidate_office,
                 "website": candidate_website,
                 "form_fields": form_fields,
             }
-        return candidate_fields
+
+    def extract_formfields(self):
+        return dict(self.iter_results())
 
 
 def start():
     analyzer = FormExtractor()
     _Logger.info("Starting form_extractor")
-    candidate_fields = analyzer.extract_formfields()
-    with open(config.FORM_EXTRACTOR_RESULTS, "w") as f:
-        json.dump(candidate_fields, f, indent=1)
+    write_results(analyzer.iter_results())
     _Logger.info("Completed form_extractor!")
+
+
+def write_results(candidate_fields):
+    """Write (candidate, entry) pairs to the form extractor results as they are produced"""
+
+    with result_writer.get_result_writer(config.FORM_EXTRACTOR_RESULTS) as writer:
+        for candidate, entry in candidate_fields:
+            writer.write(candidate, entry)
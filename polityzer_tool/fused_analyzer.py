@@ -0,0 +1,313 @@
+import config, result_writer, utils
+from utils import CandidateUtils, parse_webpage
+import privacy_policy_analyzer, link_extractor, form_extractor
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+import time
+
+_Logger = logging.getLogger(__name__)
+
+# analyzer name -> (analyzer class, config setting of the analyzer's results file)
+ANALYZERS = {
+    "privacy_policy": (privacy_policy_analyzer.Privacy_Policy_Check, "PRIVACY_POLICY_RESULTS"),
+    "link_extractor": (link_extractor.Website_LinkExtractor, "LINK_EXTRACTOR_RESULTS"),
+    "form_extractor": (form_extractor.FormExtractor, "FORM_EXTRACTOR_RESULTS"),
+}
+
+
+def get_enabled_analyzer_names():
+    """returns the names of the analyses enabled in config.py"""
+
+    names = []
+    if config.PRIVACY_POLICY_ANALYSIS:
+        names.append("privacy_policy")
+    if config.LINK_EXTRACTOR_ANALYSIS:
+        names.append("link_extractor")
+    if config.FORM_EXTRACTOR_ANALYSIS:
+        names.append("form_extractor")
+    return names
+
+
+def get_analyzers(names):
+    """returns (name, analyzer, results file) for every given analyzer name"""
+
+    analyzers = []
+    for name in names:
+        analyzer_class, results_setting = ANALYZERS[name]
+        analyzers.append((name, analyzer_class(), getattr(config, results_setting)))
+    return analyzers
+
+
+class FusedAnalyzer:
+    """Runs several analyzers over the downloaded websites while parsing every webpage only once"""
+
+    def __init__(self, analyzers, workers=1) -> None:
+        self.candidates = CandidateUtils.load_candidates()
+        self.analyzers = analyzers
+        self.workers = workers
+
+    def analyze_candidate(self, candidate, candidate_office, candidate_website):
+        """returns the result entry of every analyzer for a single candidate"""
+
+        for _, analyzer, _ in self.analyzers:
+            analyzer.begin_candidate(candidate, candidate_office, candidate_website)
+        for webpage in CandidateUtils.get_webpages(candidate, candidate_office):
+            page = parse_webpage(webpage)
+            for _, analyzer, _ in self.analyzers:
+                analyzer.analyze_webpage(webpage, page)
+        return [analyzer.end_candidate() for _, analyzer, _ in self.analyzers]
+
+    def iter_candidate_entries(self):
+        """yields every candidate with its analyzer entries, in the order of the candidate file"""
+
+        if self.workers <= 1:
+            for candidate in self.candidates:
+                yield candidate, self.analyze_candidate(*candidate)
+            return
+
+        # every candidate folder is independent, so the candidates are sharded across worker processes
+        candidates = list(self.candidates)
+        names = [name for name, _, _ in self.analyzers]
+        # workers started with spawn, the default on macOS and Windows, import config.py again and need its runtime changes
+        initargs = (names, utils.get_config_settings())
+        with ProcessPoolExecutor(self.workers, initializer=_init_worker, initargs=initargs) as executor:
+            results = executor.map(_analyze_candidate, candidates, chunksize=config.ANALYSIS_CHUNKSIZE)
+            yield from zip(candidates, results)
+
+    def analyze(self):
+        """Write the entries of every candidate to the analyzers' results as soon as the candidate is analyzed"""
+
+        for _, analyzer, _ in self.analyzers:
+            analyzer.prepare()
+
+        with ExitStack() as stack:
+            writers = [
+                stack.enter_context(result_writer.get_result_writer(results_file))
+                for _, _, results_file in self.analyzers
+            ]
+            for (candidate, _, _), entries in self.iter_candidate_entries():
+                for writer, entry in zip(writers, entries):
+                    writer.write(candidate, entry)
+
+
+# analyzer owned by each worker process of the pool
+_worker_analyzer = None
+
+
+def _init_worker(names, settings):
+    global _worker_analyzer
+    utils.apply_config_settings(settings)
+    _worker_analyzer = FusedAnalyzer(get_analyzers(names))
+
+
+def _analyze_candidate(candidate):
+    return _worker_analyzer.analyze_candidate(*candidate)
+
+
+class AnalysisPipeline:
+    """
+    Analyzes the pages of a crawl as they are downloaded. The crawler hands every saved page to the worker process
+    owning its candidate, picked by candidate hash, and the candidate's results are written once its download completes.
+    The candidates the crawl did not download entirely, e.g. already downloaded or resumed from a previous run,
+    are analyzed from the disk when the pipeline is closed.
+    """
+
+    def __init__(self, analyzers, workers=1) -> None:
+        self.analyzers = analyzers
+        self.workers = workers
+        self.queues = []
+        self.processes = []
+        self.results = multiprocessing.Queue()
+        self.collector = None
+        self.writers = ExitStack()
+        self.result_writers = []
+        # candidate -> number of pages handed to its worker
+        self.pages = {}
+        self.dead_workers = set()
+        self.skipped = set()
+        self.finalized = set()
+        self.downloaded_folders = set()
+
+    def start(self):
+        # candidates with pages saved by a previous run are left to the analysis from the disk
+        if os.path.isfile(config.DATABASE_FILE):
+            self.downloaded_folders = {os.path.dirname(row["filepath"]) for row in utils.read_database_file(config.DATABASE_FILE)}
+
+        for _, analyzer, _ in self.analyzers:
+            analyzer.prepare()
+        names = [name for name, _, _ in self.analyzers]
+        settings = utils.get_config_settings()
+        for _ in range(self.workers):
+            pages = multiprocessing.Queue(config.PIPELINE_QUEUE_SIZE)
+            process = multiprocessing.Process(target=_pipeline_worker, args=(names, settings, pages, self.results), daemon=True)
+            process.start()
+            self.queues.append(pages)
+            self.processes.append(process)
+
+        self.result_writers = [
+            self.writers.enter_context(result_writer.get_result_writer(results_file)) for _, _, results_file in self.analyzers
+        ]
+        self.collector = threading.Thread(target=self.collect, name="analysis-collector", daemon=True)
+        self.collector.start()
+
+    def collect(self):
+        """Write the entries of the candidates finalized by the workers"""
+
+        for candidate, entries in iter(self.results.get, None):
+            # the analysis failed, the candidate is analyzed from the disk when the pipeline is closed
+            if entries is None:
+                continue
+            for writer, entry in zip(self.result_writers, entries):
+                writer.write(candidate[0], entry)
+            self.finalized.add(candidate)
+
+    def put(self, worker, message):
+        """Put a message on the queue of a worker, unless the worker died. Returns whether the message was put"""
+
+        while worker not in self.dead_workers:
+            if not self.processes[worker].is_alive():
+                # its candidates are not finalized, they are analyzed from the disk when the pipeline is closed
+                _Logger.error(f"Analysis worker {worker} exited with code {self.processes[worker].exitcode}")
+                self.dead_workers.add(worker)
+                break
+            try:
+                self.queues[worker].put(message, timeout=1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def get_worker(self, candidate):
+        return utils.get_candidate_shard(candidate[0], candidate[1], self.workers) - 1
+
+    def put_page(self, candidate, webpage, storage=""):
+        """Hand a webpage of a (name, office, website) candidate that was just saved to the candidate's worker"""
+
+        if candidate in self.skipped:
+            return
+        if candidate not in self.pages and os.path.dirname(webpage) in self.downloaded_folders:
+            self.skipped.add(candidate)
+            return
+        self.pages[candidate] = self.pages.get(candidate, 0) + 1
+        self.put(self.get_worker(candidate), ("page", candidate, webpage, storage))
+
+    def end_candidate(self, candidate):
+        """Finalize the results of a candidate whose download completed"""
+
+        self.skipped.discard(candidate)
+        if self.pages.pop(candidate, 0):
+            self.put(self.get_worker(candidate), ("end", candidate))
+
+    def close(self):
+        """Wait for the workers, then analyze the candidates that were not finalized and write the results"""
+
+        for worker in range(self.workers):
+            self.put(worker, None)
+        for process in self.processes:
+            process.join()
+        self.results.put(None)
+        self.collector.join()
+        _Logger.info(f"{len(self.finalized)} candidates analyzed during the download")
+
+        # not downloaded by this crawl, downloaded in part by a previous run or still downloading when the crawl was interrupted
+        fused = FusedAnalyzer(self.analyzers, workers=self.workers)
+        fused.candidates = [candidate for candidate in fused.candidates if tuple(candidate) not in self.finalized]
+        _Logger.info(f"Analyzing the {len(fused.candidates)} remaining candidates")
+        with self.writers:
+            for (candidate, _, _), entries in fused.iter_candidate_entries():
+                for writer, entry in zip(self.result_writers, entries):
+                    writer.write(candidate, entry)
+
+    def terminate(self):
+        for process in self.processes:
+            process.terminate()
+
+
+def _pipeline_worker(names, settings, pages, results):
+    """
+    Worker process of an AnalysisPipeline. Keeps the analyzers of every candidate being downloaded.
+    The results of a candidate whose analysis failed are None, so the pipeline analyzes it from the disk instead.
+    """
+
+    utils.apply_config_settings(settings)
+    candidates = {}
+    for message in iter(pages.get, None):
+        action, candidate = message[:2]
+        if action == "page":
+            webpage, storage = message[2:]
+            if candidate not in candidates:
+                try:
+                    analyzers = [analyzer for _, analyzer, _ in get_analyzers(names)]
+                    for analyzer in analyzers:
+                        analyzer.begin_candidate(*candidate)
+                except Exception:
+                    _Logger.exception(f"Could not start the analysis of {candidate[0]}")
+                    analyzers = None
+                candidates[candidate] = analyzers, []
+            analyzers, webpages = candidates[candidate]
+            utils.set_webpage_storage(webpage, storage)
+            webpages.append(webpage)
+            if analyzers is None:
+                continue
+            try:
+                page = parse_webpage(webpage)
+                for analyzer in analyzers:
+                    analyzer.analyze_webpage(webpage, page)
+            except Exception:
+                _Logger.exception(f"Could not analyze {webpage}")
+        elif action == "end":
+            analyzers, webpages = candidates.pop(candidate)
+            entries = None
+            if analyzers is not None:
+                try:
+                    entries = [analyzer.end_candidate() for analyzer in analyzers]
+                except Exception:
+                    _Logger.exception(f"Could not finalize the analysis of {candidate[0]}")
+            # an exception would end the worker, and the crawl would block on its full queue
+            results.put((candidate, entries))
+            for webpage in webpages:
+                utils.set_webpage_storage(webpage, None)
+
+
+def start_pipeline(crawl):
+    """Run crawl(analysis_pipeline=...), analyzing the downloaded pages while the crawl goes on"""
+
+    names = get_enabled_analyzer_names()
+    workers = max(1, config.ANALYSIS_WORKERS)
+    _Logger.info(f"Starting pipelined analysis: {', '.join(names)} ({workers} worker(s))")
+    start_time = time.time()
+
+    pipeline = AnalysisPipeline(get_analyzers(names), workers=workers)
+    pipeline.start()
+    try:
+        crawl(analysis_pipeline=pipeline)
+    except BaseException:
+        pipeline.terminate()
+        raise
+    pipeline.close()
+    _Logger.info(f"Completed download and analysis in {time.time() - start_time} seconds")
+
+
+def start():
+    names = get_enabled_analyzer_names()
+    if not names:
+        return
+    analyzers = get_analyzers(names)
+    workers = max(1, config.ANALYSIS_WORKERS)
+    _Logger.info(f"Starting fused analysis: {', '.join(names)} ({workers} worker(s))")
+    start_time = time.time()
+
+    FusedAnalyzer(analyzers, workers=workers).analyze()
+    _Logger.info(f"Completed fused analysis in {time.time() - start_time} seconds")
+
+
+if __name__ == "__main__":
+    if config.OUTPUT_ROOT:
+        utils.set_output_root(config.OUTPUT_ROOT)
+    utils.create_logger()
+    start()
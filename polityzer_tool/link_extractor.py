@@ -1,6 +1,5 @@
-import utils, config
-from utils import CandidateUtils, LinkExtractor
-import json
+import utils, config, result_writer
+from utils import CandidateUtils, parse_webpage
 import logging
 from urllib.parse import urljoin
 
@@ -11,47 +10,72 @@ class Website_LinkExtractor:
     def __init__(self) -> None:
         self.candidates = CandidateUtils.load_candidates()
 
-    def link_extractor(self):
-        candidate_links = dict()
-        for candidate, candidate_office, candidate_website in self.candidates:
-            _Logger.debug(f"Working on {candidate},{candidate_office}")
-            inbound_links = set()
-            outbound_links = set()
-            inbound_counter = 0
-            outbound_counter = 0
+    def prepare(self):
+        """Create the folders the analysis writes to"""
+
+        utils.create_results_folder()
+
+    def begin_candidate(self, candidate, candidate_office, candidate_website):
+        _Logger.debug(f"Working on {candidate},{candidate_office}")
+        self.candidate_office = candidate_office
+        self.candidate_website = candidate_website
+        self.inbound_links = set()
+        self.outbound_links = set()
+        self.inbound_counter = 0
+        self.outbound_counter = 0
+
+    def analyze_webpage(self, webpage, page):
+        links_in_page = page.get_links()
+        for link in links_in_page:
+
+            # if the link is relative, it is inbound.
+            if not utils.isAbsolute(link):
+                link = urljoin(self.candidate_website, link)
+                self.inbound_links.add(link)
+                self.inbound_counter += 1
+                continue
+
+            # if it is not relative, check if it is same domain
+            if utils.isSameDomain(link, self.candidate_website):
+                self.inbound_links.add(link)
+                self.inbound_counter += 1
+            else:
+                self.outbound_links.add(link)
+                self.outbound_counter += 1
+
+    def end_candidate(self):
+        _Logger.debug(f"{self.inbound_counter} inbound links, {self.outbound_counter} outbound links")
+        return {
+            "office": self.candidate_office,
+            "website": self.candidate_website,
+            "inbound_links": list(self.inbound_links),
+            "outbound_links": list(self.outbound_links),
+        }
 
+    def iter_results(self):
+        """yields every candidate with its result entry as soon as it is analyzed"""
+
+        self.prepare()
+        for candidate, candidate_office, candidate_website in self.candidates:
+            self.begin_candidate(candidate, candidate_office, candidate_website)
             for webpage in CandidateUtils.get_webpages(candidate, candidate_office):
-                links_in_page = LinkExtractor.get_links(webpage)
-                for link in links_in_page:
-
-                    # if the link is relative, it is inbound.
-                    if not utils.isAbsolute(link):
-                        link = urljoin(candidate_website, link)
-                        inbound_links.add(link)
-                        inbound_counter += 1
-                        continue
-
-                    # if it is not relative, check if it is same domain
-                    if utils.isSameDomain(link, candidate_website):
-                        inbound_links.add(link)
-                        inbound_counter += 1
-                    else:
-                        outbound_links.add(link)
-                        outbound_counter += 1
-            candidate_links[candidate] = {
-                "office": candidate_office,
-                "website": candidate_website,
-                "inbound_links": list(inbound_links),
-                "outbound_links": list(outbound_links),
-            }
-            _Logger.debug(f"{inbound_counter} inbound links, {outbound_counter} outbound links")
-        return candidate_links
+                self.analyze_webpage(webpage, parse_webpage(webpage))
+            yield candidate, self.end_candidate()
+
+    def link_extractor(self):
+        return dict(self.iter_results())
 
 
 def start():
     analyzer = Website_LinkExtractor()
     _Logger.info("Starting link_extractor")
-    candidate_links = analyzer.link_extractor()
-    with open(config.LINK_EXTRACTOR_RESULTS, "w") as f:
-        json.dump(candidate_links, f, indent=1)
+    write_results(analyzer.iter_results())
     _Logger.info("Completed link_extractor!")
+
+
+def write_results(candidate_links):
+    """Write (candidate, entry) pairs to the link extractor results as they are produced"""
+
+    with result_writer.get_result_writer(config.LINK_EXTRACTOR_RESULTS) as writer:
+        for candidate, entry in candidate_links:
+            writer.write(candidate, entry)
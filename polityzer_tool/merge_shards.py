@@ -0,0 +1,168 @@
+import config, result_writer, utils
+from utils import CandidateUtils
+import argparse
+import csv
+import glob
+import json
+import logging
+import os
+
+_Logger = logging.getLogger(__name__)
+
+# config settings of the result files merged across the shards
+RESULTS_SETTINGS = ["PRIVACY_POLICY_RESULTS", "LINK_EXTRACTOR_RESULTS", "FORM_EXTRACTOR_RESULTS"]
+
+
+def get_shard_roots():
+    """returns the output roots of every shard found in SHARDS_FOLDER"""
+
+    if not os.path.isdir(config.SHARDS_FOLDER):
+        return []
+    return sorted(
+        os.path.join(config.SHARDS_FOLDER, folder)
+        for folder in os.listdir(config.SHARDS_FOLDER)
+        if os.path.isdir(os.path.join(config.SHARDS_FOLDER, folder))
+    )
+
+
+def get_shard_path(root, setting):
+    """returns the path an output setting of config.py has in the shard written to root"""
+
+    return os.path.join(root, utils.get_default_output_path(setting))
+
+
+def merge_database_files(roots, database_file):
+    """
+    Merge the downloaded_websites.csv of the shards. A page downloaded by several shards, or several runs of a shard,
+    keeps the position of its first row and the values of its last one. Returns the number of merged rows
+    """
+
+    rows = {}
+    for root in roots:
+        shard_file = get_shard_path(root, "DATABASE_FILE")
+        if not os.path.isfile(shard_file):
+            continue
+        for row in utils.read_database_file(shard_file):
+            rows[(row["name"], row["url"])] = row
+
+    os.makedirs(os.path.dirname(database_file) or ".", exist_ok=True)
+    with open(database_file, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=utils.DATABASE_FIELDS, delimiter=",")
+        writer.writeheader()
+        writer.writerows(rows.values())
+    return len(rows)
+
+
+def merge_error_files(roots, error_file):
+    """Merge the error csv files of the shards into error_file, dropping repeated rows. Returns the number of merged rows"""
+
+    header = None
+    rows = {}
+    for root in roots:
+        for shard_file in sorted(glob.glob(os.path.join(get_shard_path(root, "LOGS_FOLDER"), "error*.csv"))):
+            with open(shard_file) as f:
+                reader = csv.reader(f, delimiter=",")
+                header = next(reader, None) or header
+                rows.update(dict.fromkeys(tuple(row) for row in reader))
+    if header is None:
+        return 0
+
+    os.makedirs(os.path.dirname(error_file) or ".", exist_ok=True)
+    with open(error_file, "w", newline="") as f:
+        writer = csv.writer(f, delimiter=",")
+        writer.writerow(header)
+        writer.writerows(rows)
+    return len(rows)
+
+
+def merge_values(value, other):
+    """Merge two values of a result entry: lists are joined without duplicates, flags are or-ed, the first non-empty value is kept otherwise"""
+
+    if isinstance(value, list) and isinstance(other, list):
+        # the items of some results are {text: link} dicts, so they are compared on their JSON
+        merged = {}
+        for item in value + other:
+            merged.setdefault(json.dumps(item, sort_keys=True), item)
+        return list(merged.values())
+    if isinstance(value, bool) and isinstance(other, bool):
+        return value or other
+    if isinstance(value, dict) and isinstance(other, dict):
+        return merge_entries(value, other)
+    return value if value not in (None, "") else other
+
+
+def merge_entries(entry, other):
+    """Merge the result entries of the same candidate found in two shards"""
+
+    merged = dict(entry)
+    for key, value in other.items():
+        merged[key] = merge_values(merged[key], value) if key in merged else value
+    return merged
+
+
+def merge_result_files(roots, results_setting):
+    """
+    Merge a result file of the shards, in JSON or JSONL, into the results file set by results_setting in config.RESULTS_FORMAT.
+    The candidates are written in the order of the candidate file, like an analysis run on a single machine.
+    Returns the number of merged candidates
+    """
+
+    results = {}
+    for root in roots:
+        shard_file = get_shard_path(root, results_setting)
+        for candidate, entry in result_writer.iter_results(shard_file):
+            previous = results.get(candidate)
+            if previous is None:
+                results[candidate] = entry
+            elif (previous.get("office"), previous.get("website")) == (entry.get("office"), entry.get("website")):
+                results[candidate] = merge_entries(previous, entry)
+            else:
+                _Logger.warning(f"{candidate} has different entries in several shards, keeping the one of {root}")
+                results[candidate] = entry
+    if not results:
+        return 0
+
+    order = {}
+    if os.path.isfile(config.CANDIDATE_OFFICE_WEBSITE):
+        for candidate, _, _ in CandidateUtils.load_candidates():
+            order.setdefault(candidate, len(order))
+    candidates = sorted(results, key=lambda candidate: order.get(candidate, len(order)))
+    with result_writer.get_result_writer(getattr(config, results_setting)) as writer:
+        for candidate in candidates:
+            writer.write(candidate, results[candidate])
+    return len(results)
+
+
+def merge_shards(roots):
+    """Merge the database, error and result files of the shards written to roots into the output folders of config.py"""
+
+    _Logger.info(f"Merging {len(roots)} shard(s): {', '.join(roots)}")
+    count = merge_database_files(roots, config.DATABASE_FILE)
+    _Logger.info(f"Merged {count} downloaded pages into {config.DATABASE_FILE}")
+    count = merge_error_files(roots, config.ERROR_FILEPATH)
+    _Logger.info(f"Merged {count} errors into {config.ERROR_FILEPATH}")
+    for results_setting in RESULTS_SETTINGS:
+        count = merge_result_files(roots, results_setting)
+        if count:
+            results_file = result_writer.get_results_path(getattr(config, results_setting))
+            _Logger.info(f"Merged the results of {count} candidates into {results_file}")
+
+
+def get_parser():
+    parser = argparse.ArgumentParser(
+        description="Merge the downloaded pages, errors and results of the shards of a sharded run, e.g. written by 'polityzer --shard K/N'"
+    )
+    parser.add_argument("roots", nargs="*", help="output roots of the shards, every folder in SHARDS_FOLDER by default")
+    parser.add_argument("-o", "--output-root", help="folder the merged database, logs and results are written to, the current folder by default")
+    return parser
+
+
+if __name__ == "__main__":
+    args = get_parser().parse_args()
+    # the shard roots are read before the output settings are rebound under the merged output root
+    roots = args.roots or get_shard_roots()
+    output_root = args.output_root or config.OUTPUT_ROOT
+    if output_root:
+        utils.set_output_root(output_root)
+    utils.create_logger()
+    merge_shards(roots)
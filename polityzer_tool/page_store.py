@@ -0,0 +1,243 @@
+import config
+import gzip
+import hashlib
+import io
+import logging
+import os
+import tempfile
+import time
+import uuid
+import zlib
+from datetime import datetime, timezone
+from http import HTTPStatus
+from urllib.parse import urlparse
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+_Logger = logging.getLogger(__name__)
+
+COMPRESSION_SUFFIXES = {"gzip": ".gz", "zstd": ".zst"}
+
+
+class PageStore:
+    """
+    Content addressed store for the downloaded webpages.
+    Every distinct page body is compressed once into <PAGE_STORE_FOLDER>/<first two hash chars>/<sha256><suffix>,
+    identical pages of any candidate share the same blob.
+    """
+
+    def __init__(self, folder=None, compression=None) -> None:
+        self.folder = folder or config.PAGE_STORE_FOLDER
+        self.compression = compression or config.PAGE_STORE_COMPRESSION
+        if self.compression == "zstd" and zstandard is None:
+            _Logger.warning("zstandard is not installed. Compressing the downloaded pages with gzip")
+            self.compression = "gzip"
+        if self.compression not in COMPRESSION_SUFFIXES:
+            raise ValueError(f"Unknown page store compression: {self.compression}")
+
+    def get_blob_path(self, digest):
+        return os.path.join(self.folder, digest[:2], digest + COMPRESSION_SUFFIXES[self.compression])
+
+    def compress(self, body):
+        if self.compression == "zstd":
+            return zstandard.ZstdCompressor().compress(body)
+        return gzip.compress(body, mtime=0)
+
+    def save(self, body, **record):
+        """Store a page body and return the path of its blob. Bodies that are already stored are not written again"""
+
+        blob_path = self.get_blob_path(hashlib.sha256(body).hexdigest())
+        if os.path.isfile(blob_path):
+            return blob_path
+
+        blob_folder = os.path.dirname(blob_path)
+        os.makedirs(blob_folder, exist_ok=True)
+        # write to a temporary file first so that a concurrent or interrupted writer never leaves a partial blob
+        fd, tmp_path = tempfile.mkstemp(dir=blob_folder, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(self.compress(body))
+        os.replace(tmp_path, blob_path)
+        return blob_path
+
+    def close(self):
+        """Blobs are written whole, there is nothing to close"""
+
+
+class WarcStore:
+    """
+    Appends the downloaded webpages as response records to rotating gzipped WARC files in WARC_FOLDER.
+    Every record is a gzip member of its own, so that a page can be read back from its offset in the file.
+    """
+
+    def __init__(self, folder=None, max_size=None) -> None:
+        self.folder = folder or config.WARC_FOLDER
+        self.max_size = max_size or config.WARC_MAX_SIZE
+        self.warc_file = None
+        self.warc_path = None
+        self.serial = 0
+        os.makedirs(self.folder, exist_ok=True)
+
+    def rotate(self):
+        """Close the current WARC file and start a new one"""
+
+        self.close()
+        self.serial += 1
+        filename = f"polityzer-{int(time.time())}-{os.getpid()}-{self.serial:05d}.warc.gz"
+        self.warc_path = os.path.join(self.folder, filename)
+        self.warc_file = open(self.warc_path, "ab")
+        info = b"software: polityzer\r\nformat: WARC File Format 1.1\r\n"
+        self.write_record({"WARC-Type": "warcinfo", "WARC-Filename": filename, "Content-Type": "application/warc-fields"}, info)
+
+    def write_record(self, warc_headers, block):
+        """Append a record and return its offset in the current WARC file"""
+
+        offset = self.warc_file.tell()
+        headers = {
+            "WARC-Record-ID": f"<urn:uuid:{uuid.uuid4()}>",
+            "WARC-Date": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            **warc_headers,
+            "Content-Length": str(len(block)),
+        }
+        record = "".join(["WARC/1.1\r\n"] + [f"{name}: {value}\r\n" for name, value in headers.items()] + ["\r\n"])
+        self.warc_file.write(gzip.compress(record.encode("utf-8") + block + b"\r\n\r\n", mtime=0))
+        self.warc_file.flush()
+        return offset
+
+    def save(self, body, url, status=200, headers=None, metadata=None):
+        """Append a page as a response record and return its location as <warc path>#<offset>"""
+
+        if self.warc_file is None or self.warc_file.tell() >= self.max_size:
+            self.rotate()
+
+        # the body is saved decoded, so the headers describing its transfer encoding no longer apply
+        skipped_headers = {"content-encoding", "content-length", "transfer-encoding"}
+        http_headers = [(name, value) for name, value in headers or [] if name.lower() not in skipped_headers]
+        http_headers.append(("Content-Length", str(len(body))))
+        http_head = f"HTTP/1.1 {status} {get_status_phrase(status)}\r\n"
+        http_head += "".join(f"{name}: {value}\r\n" for name, value in http_headers) + "\r\n"
+
+        warc_headers = {
+            "WARC-Type": "response",
+            "WARC-Target-URI": url,
+            "Content-Type": "application/http;msgtype=response",
+            "WARC-Payload-Digest": "sha256:" + hashlib.sha256(body).hexdigest(),
+        }
+        # candidate metadata as WARC extension fields
+        for name, value in (metadata or {}).items():
+            warc_headers[f"Polityzer-{name.capitalize()}"] = str(value)
+        offset = self.write_record(warc_headers, http_head.encode("latin-1", "replace") + body)
+        return f"{self.warc_path}#{offset}"
+
+    def close(self):
+        if self.warc_file is not None:
+            self.warc_file.close()
+            self.warc_file = None
+
+
+def get_page_store():
+    """returns the store the downloaded pages are saved to as set by config.PAGE_STORAGE, None to save them as files"""
+
+    if config.PAGE_STORAGE == "blobs":
+        return PageStore()
+    if config.PAGE_STORAGE == "warc":
+        return WarcStore()
+    return None
+
+
+def get_webpage_path(candidate_name, candidate_office, url, page_title=None):
+    """
+    returns the path of a downloaded webpage in the candidate's html folder.
+    Pages in the page store keep this path as their name in the database file.
+    """
+
+    fullpath = os.path.join(config.HTML_FOLDER, candidate_office, candidate_name)
+    relativeurlpath = urlparse(url).path
+    rooturlpath = urlparse(url).netloc
+    randomizer = str(time.time()).replace(".", "")
+    if relativeurlpath:
+        relativepath = relativeurlpath.replace("/", "|")
+        return os.path.join(fullpath, "".join([rooturlpath, relativepath, randomizer]))
+    if page_title:
+        return os.path.join(fullpath, "".join([rooturlpath, page_title, randomizer]))
+    return os.path.join(fullpath, "".join([rooturlpath, randomizer]))
+
+
+def get_status_phrase(status):
+    try:
+        return HTTPStatus(status).phrase
+    except ValueError:
+        return ""
+
+
+def read_warc_record(stream):
+    """returns (warc headers, http headers, body) of the next record of a decompressed WARC stream or None at its end"""
+
+    line = stream.readline()
+    while line in (b"\r\n", b"\n"):
+        line = stream.readline()
+    if not line:
+        return None
+    warc_headers = {}
+    for line in iter(stream.readline, b"\r\n"):
+        if not line:
+            break
+        name, _, value = line.decode("utf-8").partition(":")
+        warc_headers[name.strip()] = value.strip()
+    block = stream.read(int(warc_headers.get("Content-Length", 0)))
+
+    http_headers = {}
+    body = block
+    if warc_headers.get("WARC-Type") == "response":
+        http_head, _, body = block.partition(b"\r\n\r\n")
+        for line in http_head.decode("latin-1").split("\r\n")[1:]:
+            name, _, value = line.partition(":")
+            http_headers[name.strip()] = value.strip()
+    return warc_headers, http_headers, body
+
+
+def read_warc_location(location):
+    """returns (warc headers, http headers, body) of the record at a <warc path>#<offset> location"""
+
+    warc_path, _, offset = location.rpartition("#")
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    data = []
+    with open(warc_path, "rb") as f:
+        f.seek(int(offset))
+        # decompress only the gzip member holding the record
+        while not decompressor.eof:
+            chunk = f.read(64 * 1024)
+            if not chunk:
+                break
+            data.append(decompressor.decompress(chunk))
+    return read_warc_record(io.BytesIO(b"".join(data)))
+
+
+def read_blob(blob_path):
+    """returns the decompressed bytes of a blob or a WARC record"""
+
+    if ".warc.gz#" in blob_path:
+        _, _, body = read_warc_location(blob_path)
+        return body
+    if blob_path.endswith(COMPRESSION_SUFFIXES["zstd"]):
+        if zstandard is None:
+            raise RuntimeError(f"zstandard is required to read {blob_path}")
+        with open(blob_path, "rb") as f:
+            return zstandard.ZstdDecompressor().stream_reader(f).read()
+    with gzip.open(blob_path, "rb") as f:
+        return f.read()
+
+
+def open_blob(blob_path):
+    """returns a text file object with the decompressed content of a blob or a WARC record"""
+
+    if ".warc.gz#" in blob_path:
+        _, _, body = read_warc_location(blob_path)
+        return io.TextIOWrapper(io.BytesIO(body))
+    if blob_path.endswith(COMPRESSION_SUFFIXES["zstd"]):
+        if zstandard is None:
+            raise RuntimeError(f"zstandard is required to read {blob_path}")
+        return io.TextIOWrapper(zstandard.ZstdDecompressor().stream_reader(open(blob_path, "rb"), closefd=True))
+    return gzip.open(blob_path, "rt")
@@ -1,18 +1,31 @@
-import website_downloader, privacy_policy_analyzer, link_extractor, form_extractor
-from config import DOWNLOAD_SITES, PRIVACY_POLICY_ANALYSIS, LINK_EXTRACTOR_ANALYSIS, FORM_EXTRACTOR_ANALYSIS
+import config, utils
 
 
 def main():
-    """Start the download and analysis"""
-
-    if DOWNLOAD_SITES:
-        website_downloader.start()
-    if PRIVACY_POLICY_ANALYSIS:
-        privacy_policy_analyzer.start()
-    if LINK_EXTRACTOR_ANALYSIS:
-        link_extractor.start()
-    if FORM_EXTRACTOR_ANALYSIS:
-        form_extractor.start()
+    """Start the download and analysis. Each stage imports its dependencies only when it runs"""
+
+    if config.OUTPUT_ROOT:
+        utils.set_output_root(config.OUTPUT_ROOT)
+    utils.create_logger()
+    analysis = config.PRIVACY_POLICY_ANALYSIS or config.LINK_EXTRACTOR_ANALYSIS or config.FORM_EXTRACTOR_ANALYSIS
+    if config.DOWNLOAD_SITES:
+        if config.DOWNLOAD_ENGINE == "asyncio":
+            import async_downloader as downloader
+        else:
+            import website_downloader as downloader
+
+        if analysis and config.PIPELINE_ANALYSIS:
+            import fused_analyzer
+
+            # the pages are analyzed while they are downloaded
+            fused_analyzer.start_pipeline(downloader.start)
+            return
+        downloader.start()
+    # the enabled analyzers share a single parse of every downloaded webpage
+    if analysis:
+        import fused_analyzer
+
+        fused_analyzer.start()
 
 
 if __name__ == "__main__":
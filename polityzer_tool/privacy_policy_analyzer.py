@@ -1,18 +1,19 @@
-import config, utils
-from utils import CandidateUtils, LinkExtractor
+import config, utils, result_writer
+from utils import CandidateUtils, parse_webpage
 import os
 import logging
-import json
 
 _Logger = logging.getLogger(__name__)
 
 
 class Privacy_Policy_Check:
-    bag_of_words = ["privacy", "terms", "conditions", "notice", "statement", "disclosure"]
+    bag_of_words = config.PRIVACY_KEYWORDS
+    keyword_matcher = utils.KeywordMatcher(bag_of_words)
 
     def __init__(self):
         # self.save_links = config.SAVE_PRIVACY_POLICY_LINKS
         self.candidates = CandidateUtils.load_candidates()
+        self.policy_file_keywords = ["privacy", "policy"]
 
     # def get_candidate_website_folder(self, candidate_name):
     #     html_folder = config.HTML_FOLDER
@@ -25,63 +26,77 @@ class Privacy_Policy_Check:
     #     for webpage in os.listdir(website_path):
     #         yield os.path.join(website_path, webpage)
 
-    def get_privacy_links(self):
+    def prepare(self):
+        """Create the folders the analysis writes to"""
+
         utils.create_results_folder()
 
         # to save privacy policy files in a separate folder
         if config.COPY_PRIVACY_POLICY_FILE:
-            import shutil
-
             utils.create_privacy_policy_folder()
-            keywords = ["privacy", "policy"]
 
-        privacy_links = set()
-        candidate_map = dict()
+    def begin_candidate(self, candidate, candidate_office, website):
+        _Logger.debug(f"Working on {candidate}, {candidate_office}")
+        self.candidate_office = candidate_office
+        self.website = website
+        self.privacy_links = set()
+        self.privacy_flag = False
+        self.privacy_policy_moved = False
+
+    def analyze_webpage(self, webpage, page):
+        for link in page.get_unique_links():
+            if self.keyword_matcher.search(link.text) or self.keyword_matcher.search(link.href):
+                self.privacy_flag = True
+                self.privacy_links.add(link.href)
+
+        if config.COPY_PRIVACY_POLICY_FILE and not self.privacy_policy_moved:
+            is_file = True
+            html_file = webpage.split(os.path.sep)[-1]
+            for keyword in self.policy_file_keywords:
+                if keyword not in html_file:
+                    is_file = False
+                    break
+            if is_file:
+                office_folder = os.path.join(config.PRIVACY_POLICY_FOLDER, self.candidate_office)
+                # analysis workers may create the same office folder concurrently
+                os.makedirs(office_folder, exist_ok=True)
+                utils.copy_webpage(webpage, office_folder)
+                self.privacy_policy_moved = True
+
+    def end_candidate(self):
+        return {
+            "office": self.candidate_office,
+            "website": self.website,
+            "privacy_links": list(self.privacy_links),
+            "privacy_present": self.privacy_flag,
+        }
+
+    def iter_results(self):
+        """yields every candidate with its result entry as soon as it is analyzed"""
+
+        self.prepare()
         for candidate, candidate_office, website in self.candidates:
-            _Logger.debug(f"Working on {candidate}, {candidate_office}")
-            privacy_flag = False
-            privacy_policy_moved = False
+            self.begin_candidate(candidate, candidate_office, website)
             for webpage in CandidateUtils.get_webpages(candidate, candidate_office):
-                links_with_texts = LinkExtractor.get_links_with_texts(webpage)
-                for link in links_with_texts:
-                    privacy_link = [
-                        v
-                        for k, v in link.items()
-                        for word in self.bag_of_words
-                        if word.lower() in k.lower() or word.lower() in v.lower()
-                    ]
-                    if privacy_link:
-                        privacy_flag = True
-                        privacy_links.add(privacy_link[0])
-
-                if config.COPY_PRIVACY_POLICY_FILE and not privacy_policy_moved:
-                    is_file = True
-                    html_file = webpage.split(os.path.sep)[-1]
-                    for keyword in keywords:
-                        if keyword not in html_file:
-                            is_file = False
-                            break
-                    if is_file:
-                        office_folder = os.path.join(config.PRIVACY_POLICY_FOLDER, candidate_office)
-                        if not os.path.isdir(office_folder):
-                            os.mkdir(office_folder)
-                        shutil.copy(webpage, office_folder)
-                        privacy_policy_moved = True
-
-            candidate_map[candidate] = {
-                "office": candidate_office,
-                "website": website,
-                "privacy_links": list(privacy_links),
-                "privacy_present": privacy_flag,
-            }
-        return candidate_map
+                self.analyze_webpage(webpage, parse_webpage(webpage))
+            yield candidate, self.end_candidate()
+
+    def get_privacy_links(self):
+        return dict(self.iter_results())
 
 
 def start():
     analyzer = Privacy_Policy_Check()
     _Logger.info("Starting privacy policy presence analysis.")
-    candidate_with_privacy_links = analyzer.get_privacy_links()
-    with open(config.PRIVACY_POLICY_RESULTS, "w") as f:
-        json.dump(candidate_with_privacy_links, f, indent=1)
+    write_results(analyzer.iter_results())
+
+    results_file = result_writer.get_results_path(config.PRIVACY_POLICY_RESULTS)
+    _Logger.info(f"Privacy Policy presence analysis completed. Results at {results_file}..")
+
+
+def write_results(candidate_with_privacy_links):
+    """Write (candidate, entry) pairs to the privacy policy results as they are produced"""
 
-    _Logger.info(f"Privacy Policy presence analysis completed. Results at {config.PRIVACY_POLICY_RESULTS}..")
+    with result_writer.get_result_writer(config.PRIVACY_POLICY_RESULTS) as writer:
+        for candidate, entry in candidate_with_privacy_links:
+            writer.write(candidate, entry)
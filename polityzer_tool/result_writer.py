@@ -0,0 +1,133 @@
+import config, utils
+import json
+import logging
+import os
+
+_Logger = logging.getLogger(__name__)
+
+
+class ResultWriter:
+    """Writes the result entries of an analysis, one per candidate"""
+
+    def __init__(self, results_file) -> None:
+        self.results_file = results_file
+        os.makedirs(os.path.dirname(results_file) or ".", exist_ok=True)
+
+    def write(self, candidate, entry):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def abort(self):
+        """Called instead of close when the analysis raised"""
+
+        self.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class JsonResultWriter(ResultWriter):
+    """Legacy format: a single JSON object mapping every candidate to its entry, written once the analysis is over"""
+
+    def __init__(self, results_file) -> None:
+        super().__init__(results_file)
+        self.results = dict()
+
+    def write(self, candidate, entry):
+        self.results[candidate] = entry
+
+    def close(self):
+        # written next to the results file and renamed, the previous results stay whole if writing fails
+        tmp_file = self.results_file + ".tmp"
+        with open(tmp_file, "w") as f:
+            json.dump(self.results, f, indent=1)
+        os.replace(tmp_file, self.results_file)
+
+    def abort(self):
+        _Logger.warning(f"Analysis failed, {self.results_file} is left as it was")
+
+
+class JsonlResultWriter(ResultWriter):
+    """One {candidate: entry} JSON object per line, written as soon as the candidate is analyzed"""
+
+    def __init__(self, results_file) -> None:
+        super().__init__(results_file)
+        self.file = open(results_file, "w", buffering=1)
+
+    def write(self, candidate, entry):
+        self.file.write(json.dumps({candidate: entry}) + "\n")
+
+    def close(self):
+        self.file.close()
+
+
+def get_results_path(results_file):
+    """returns the path the results set by a *_RESULTS setting are written to in config.RESULTS_FORMAT"""
+
+    if config.RESULTS_FORMAT == "jsonl":
+        return os.path.splitext(results_file)[0] + ".jsonl"
+    return results_file
+
+
+def get_result_writer(results_file):
+    """returns the writer for the results set by a *_RESULTS setting in config.RESULTS_FORMAT"""
+
+    if config.RESULTS_FORMAT == "jsonl":
+        return JsonlResultWriter(get_results_path(results_file))
+    if config.RESULTS_FORMAT == "json":
+        return JsonResultWriter(results_file)
+    raise ValueError(f"Unknown results format: {config.RESULTS_FORMAT}")
+
+
+def iter_jsonl_results(jsonl_file):
+    """Streams the (candidate, entry) pairs of a JSONL results file"""
+
+    with open(jsonl_file) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            yield from json.loads(line).items()
+
+
+def iter_results(results_file):
+    """Streams the (candidate, entry) pairs of the results set by a *_RESULTS setting, written in JSONL or JSON"""
+
+    jsonl_file = os.path.splitext(results_file)[0] + ".jsonl"
+    if os.path.isfile(jsonl_file):
+        yield from iter_jsonl_results(jsonl_file)
+    elif os.path.isfile(results_file):
+        with open(results_file) as f:
+            yield from json.load(f).items()
+
+
+def jsonl_to_json(jsonl_file, json_file):
+    """Convert a JSONL results file to the legacy JSON format. The last entry of a candidate wins"""
+
+    with JsonResultWriter(json_file) as writer:
+        for candidate, entry in iter_jsonl_results(jsonl_file):
+            writer.write(candidate, entry)
+
+
+def convert_results():
+    """Convert the JSONL results of every analysis found in the results folder to the legacy JSON files"""
+
+    for json_file in (config.PRIVACY_POLICY_RESULTS, config.LINK_EXTRACTOR_RESULTS, config.FORM_EXTRACTOR_RESULTS):
+        jsonl_file = os.path.splitext(json_file)[0] + ".jsonl"
+        if os.path.isfile(jsonl_file):
+            _Logger.info(f"Converting {jsonl_file} to {json_file}")
+            jsonl_to_json(jsonl_file, json_file)
+
+
+if __name__ == "__main__":
+    if config.OUTPUT_ROOT:
+        utils.set_output_root(config.OUTPUT_ROOT)
+    utils.create_logger()
+    convert_results()
@@ -0,0 +1,195 @@
+from scrapy import signals
+from scrapy.http import HtmlResponse
+from scrapy_selenium import SeleniumRequest
+from selenium import webdriver
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.chrome.service import Service
+from selenium.webdriver.support.ui import WebDriverWait
+from twisted.internet import reactor, threads
+from twisted.python.threadpool import ThreadPool
+import logging
+import os
+import queue
+
+_Logger = logging.getLogger(__name__)
+
+
+class PooledDriver:
+    """A headless Chrome instance of the pool and the number of pages it rendered"""
+
+    def __init__(self, driver) -> None:
+        # None when the browser could not be (re)started, it is started again on the next render
+        self.driver = driver
+        self.pages = 0
+
+
+class SeleniumPoolMiddleware:
+    """
+    Downloader middleware rendering SeleniumRequests on a pool of warm headless Chrome instances.
+    Unlike scrapy_selenium.SeleniumMiddleware, which blocks the crawl on a single browser, every driver of the pool
+    renders on its own thread so that up to 'pool_size' pages are rendered concurrently.
+    """
+
+    def __init__(
+        self, executable_path, arguments, pool_size, max_pages, page_load_timeout, download_folder, blocked_urls=None
+    ) -> None:
+        self.executable_path = executable_path
+        self.arguments = arguments
+        # url patterns chrome does not load, None to load every resource of the pages
+        self.blocked_urls = blocked_urls
+        self.download_folder = os.path.abspath(download_folder)
+        os.makedirs(self.download_folder, exist_ok=True)
+        self.pool_size = pool_size
+        self.max_pages = max_pages
+        self.page_load_timeout = page_load_timeout
+        self.stats = None
+
+        self.drivers = queue.Queue()
+        for _ in range(pool_size):
+            self.drivers.put(self.create_driver())
+
+        # one thread per driver, so a rendering thread never waits for a driver
+        self.threadpool = ThreadPool(minthreads=pool_size, maxthreads=pool_size, name="selenium_pool")
+        self.threadpool.start()
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        blocked_urls = None
+        if settings.getbool("SELENIUM_BLOCK_RESOURCES"):
+            blocked_urls = get_blocked_urls(
+                settings.getlist("SELENIUM_BLOCKED_EXTENSIONS"), settings.getlist("SELENIUM_BLOCKED_HOSTS")
+            )
+        middleware = cls(
+            executable_path=settings.get("SELENIUM_DRIVER_EXECUTABLE_PATH"),
+            arguments=settings.getlist("SELENIUM_DRIVER_ARGUMENTS"),
+            pool_size=max(1, settings.getint("SELENIUM_POOL_SIZE", 1)),
+            max_pages=settings.getint("SELENIUM_POOL_MAX_PAGES", 0),
+            page_load_timeout=settings.getint("DOWNLOAD_TIMEOUT"),
+            download_folder=settings.get("SELENIUM_DOWNLOAD_FOLDER"),
+            blocked_urls=blocked_urls,
+        )
+        middleware.stats = crawler.stats
+        crawler.signals.connect(middleware.spider_closed, signals.spider_closed)
+        return middleware
+
+    def create_driver(self):
+        """returns a new headless Chrome instance for the pool"""
+
+        options = Options()
+        for argument in self.arguments:
+            options.add_argument(argument)
+        # files the pages make chrome download (pdfs, documents, ...) go straight to the attachments folder
+        prefs = {
+            "download.default_directory": self.download_folder,
+            "download.prompt_for_download": False,
+            "plugins.always_open_pdf_externally": True,
+        }
+        if self.blocked_urls is not None:
+            options.add_argument("--blink-settings=imagesEnabled=false")
+            prefs["profile.managed_default_content_settings.images"] = 2
+        options.add_experimental_option("prefs", prefs)
+        driver = webdriver.Chrome(service=Service(self.executable_path), options=options)
+        if self.page_load_timeout:
+            driver.set_page_load_timeout(self.page_load_timeout)
+        # old headless chrome ignores the download preferences
+        try:
+            driver.execute_cdp_cmd("Page.setDownloadBehavior", {"behavior": "allow", "downloadPath": self.download_folder})
+        except WebDriverException as e:
+            _Logger.debug(f"Could not set the chrome download folder: {repr(e)}")
+        if self.blocked_urls:
+            # fonts, media and trackers have no chrome preference, they are blocked in the network layer
+            try:
+                driver.execute_cdp_cmd("Network.enable", {})
+                driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": self.blocked_urls})
+            except WebDriverException as e:
+                _Logger.warning(f"Could not block resources in chrome: {repr(e)}")
+        return PooledDriver(driver)
+
+    def recycle(self, pooled_driver, reason):
+        """Quit a driver and replace it with a fresh one"""
+
+        _Logger.debug(f"Recycling chrome driver after {pooled_driver.pages} pages: {reason}")
+        if self.stats:
+            self.stats.inc_value(f"selenium_pool/recycled/{reason}")
+        if pooled_driver.driver is not None:
+            try:
+                pooled_driver.driver.quit()
+            except Exception as e:
+                _Logger.debug(f"Error quitting chrome driver: {repr(e)}")
+        try:
+            return self.create_driver()
+        except Exception as e:
+            _Logger.error(f"Error starting chrome driver: {repr(e)}")
+            return PooledDriver(None)
+
+    def process_request(self, request, spider):
+        """Render SeleniumRequests on the pool, let Scrapy download every other request"""
+
+        if not isinstance(request, SeleniumRequest):
+            return None
+        return threads.deferToThreadPool(reactor, self.threadpool, self.render, request)
+
+    def render(self, request):
+        """Render a request on a pooled driver. Runs on a thread of the pool"""
+
+        pooled_driver = self.drivers.get()
+        try:
+            if pooled_driver.driver is None:
+                pooled_driver = self.create_driver()
+            pooled_driver.pages += 1
+            driver = pooled_driver.driver
+            driver.get(request.url)
+
+            for cookie_name, cookie_value in request.cookies.items():
+                driver.add_cookie({"name": cookie_name, "value": cookie_value})
+
+            if request.wait_until:
+                WebDriverWait(driver, request.wait_time).until(request.wait_until)
+
+            if request.screenshot:
+                request.meta["screenshot"] = driver.get_screenshot_as_png()
+
+            if request.script:
+                driver.execute_script(request.script)
+
+            body = str.encode(driver.page_source)
+            current_url = driver.current_url
+        except WebDriverException:
+            # a crashed or hung browser cannot be trusted with the next page
+            pooled_driver = self.recycle(pooled_driver, "crash")
+            raise
+        finally:
+            if self.max_pages and pooled_driver.pages >= self.max_pages:
+                pooled_driver = self.recycle(pooled_driver, "max_pages")
+            self.drivers.put(pooled_driver)
+
+        return HtmlResponse(current_url, body=body, encoding="utf-8", request=request)
+
+    def spider_closed(self):
+        """Stop the rendering threads and quit every driver of the pool"""
+
+        self.threadpool.stop()
+        while not self.drivers.empty():
+            pooled_driver = self.drivers.get()
+            if pooled_driver.driver is None:
+                continue
+            try:
+                pooled_driver.driver.quit()
+            except Exception as e:
+                _Logger.debug(f"Error quitting chrome driver: {repr(e)}")
+
+
+def get_blocked_urls(extensions, hosts):
+    """
+    returns the url patterns blocked in chrome for the given file extensions and hosts, including the hosts' subdomains.
+    A pattern matches the whole url, so an extension only matches the end of the path and never a page like www.icons.org
+    """
+
+    blocked_urls = []
+    for extension in extensions:
+        blocked_urls += [f"*{extension}", f"*{extension}?*"]
+    for host in hosts:
+        blocked_urls += [f"*://{host}/*", f"*://*.{host}/*"]
+    return blocked_urls
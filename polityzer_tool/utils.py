@@ -1,18 +1,26 @@
-from colorlog import ColoredFormatter
-from urllib.parse import urlparse
+from urllib.parse import urlparse, urlsplit, urlunsplit, parse_qsl, urlencode
 import logging
 import os
-import tldextract
 import csv
 import time
 import shutil
 import hashlib
-from bs4 import BeautifulSoup as bs
+import functools
+import re
+from typing import NamedTuple, Optional
 
 import config
+import page_store
+import analysis_cache
+
+# bs4, lxml, tldextract and colorlog are imported on first use, so that importing utils stays cheap
 
 
 def create_logger(filename="logfile.log"):
+    """Log to the console and to a new log file in LOGS_FOLDER. Called by the entry points, not at import"""
+
+    from colorlog import ColoredFormatter
+
     logs_folder = config.LOGS_FOLDER
     if not os.path.isdir(logs_folder):
         os.mkdir(logs_folder)
@@ -45,7 +53,6 @@ def create_logger(filename="logfile.log"):
     )
 
 
-create_logger()
 _Logger = logging.getLogger(__name__)
 
 
@@ -58,13 +65,22 @@ def configure_ChromeDriver():
 
     if not os.path.isdir(chromedriver_folder):
         os.mkdir(chromedriver_folder)
-    if not os.path.isfile(chromedriver_path):
+    from chromedriver import installer
+
+    # a chromedriver put in place by hand has no install stamp and is used as is
+    stale = installer.utils.read_stamp(chromedriver_path) is not None and not installer.utils.is_installed_chromedriver_current(
+        chromedriver_path, config.CHROMEDRIVER_VERSION
+    )
+    if not os.path.isfile(chromedriver_path) or stale:
         _Logger.debug(
-            f"Chromedriver not found. Downloading and installing at {chromedriver_folder}"
+            f"Chromedriver not found or outdated. Installing at {chromedriver_folder}"
+        )
+        installer.install(
+            path=chromedriver_folder,
+            version=config.CHROMEDRIVER_VERSION,
+            cache_dir=config.CHROMEDRIVER_CACHE_FOLDER,
+            sha256=config.CHROMEDRIVER_SHA256,
         )
-        from chromedriver import installer
-
-        installer.install(path=chromedriver_folder)
 
     if os.path.isfile(chromedriver_path):
         if os.access(chromedriver_path, os.X_OK):
@@ -91,16 +107,34 @@ def create_html_folder():
         return True
 
 
-def get_download_status():
-    """returns True if there are downloaded folders in html/ else returns False"""
-    if not create_html_folder():
-        return False
-    html_folder = config.HTML_FOLDER
-    downloaded_folders = list(os.listdir(html_folder))
-    if downloaded_folders:
-        return True
-    else:
-        return False
+# columns of the database file, older versions only wrote the first four
+DATABASE_FIELDS = ["name", "url", "filepath", "depth", "fetcher", "storage"]
+
+
+def read_database_file(database_file):
+    """yields the rows of a database file as dicts, by position so that the rows of older versions get empty columns"""
+
+    with open(database_file) as f:
+        reader = csv.reader(f, delimiter=",")
+        next(reader, None)
+        for row in reader:
+            yield dict(zip(DATABASE_FIELDS, row + [""] * (len(DATABASE_FIELDS) - len(row))))
+
+
+def upgrade_database_file(database_file):
+    """Rewrite a database file written by an older version with the current header, its rows padded with empty columns"""
+
+    with open(database_file) as f:
+        header = next(csv.reader(f, delimiter=","), None)
+    if header == DATABASE_FIELDS:
+        return
+    rows = list(read_database_file(database_file))
+    with open(database_file + ".tmp", "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=DATABASE_FIELDS, delimiter=",")
+        writer.writeheader()
+        writer.writerows(rows)
+    os.replace(database_file + ".tmp", database_file)
+    _Logger.info(f"Upgraded {database_file} to the columns {', '.join(DATABASE_FIELDS)}")
 
 
 # util functions to return file handler objects
@@ -109,13 +143,15 @@ def get_database_file():
 
     if not os.path.isdir(config.DATABASE_FOLDER):
         os.mkdir(config.DATABASE_FOLDER)
+    # line buffered so that the analysis finds every saved page even while the crawler still holds the file
     if os.path.isfile(config.DATABASE_FILE):
-        db_file = open(config.DATABASE_FILE, "a")
+        upgrade_database_file(config.DATABASE_FILE)
+        db_file = open(config.DATABASE_FILE, "a", buffering=1)
         writer = csv.writer(db_file, delimiter=",")
     else:
-        db_file = open(config.DATABASE_FILE, "w")
+        db_file = open(config.DATABASE_FILE, "w", buffering=1)
         writer = csv.writer(db_file, delimiter=",")
-        writer.writerow(["name", "url", "filepath", "depth"])
+        writer.writerow(DATABASE_FIELDS)
     return writer
 
 
@@ -132,6 +168,50 @@ def get_error_file():
     return writer
 
 
+def get_manifest_file():
+    """returns the crawl manifest file handler to record the candidates whose download finished"""
+
+    if not os.path.isdir(config.DATABASE_FOLDER):
+        os.mkdir(config.DATABASE_FOLDER)
+    if os.path.isfile(config.CRAWL_MANIFEST):
+        manifest_file = open(config.CRAWL_MANIFEST, "a", buffering=1)
+        writer = csv.writer(manifest_file, delimiter=",")
+    else:
+        manifest_file = open(config.CRAWL_MANIFEST, "w", buffering=1)
+        writer = csv.writer(manifest_file, delimiter=",")
+        writer.writerow(["name", "office", "website", "status", "pages", "timestamp"])
+    return writer
+
+
+def load_crawl_manifest():
+    """returns the latest manifest entry of every candidate keyed by (name, office, website)"""
+
+    manifest = {}
+    if not os.path.isfile(config.CRAWL_MANIFEST):
+        return manifest
+    with open(config.CRAWL_MANIFEST) as f:
+        for row in csv.DictReader(f, delimiter=","):
+            manifest[(row["name"], row["office"], row["website"])] = row
+    return manifest
+
+
+def get_pending_candidates(candidates):
+    """returns the (name, office, website) candidates whose download is missing, failed or older than config.RECRAWL_AFTER_DAYS"""
+
+    manifest = load_crawl_manifest()
+    stale_before = time.time() - config.RECRAWL_AFTER_DAYS * 24 * 60 * 60
+    pending = set()
+    for candidate in candidates:
+        if not candidate[2]:
+            continue
+        entry = manifest.get(tuple(candidate))
+        if entry and entry["status"] == "done":
+            if not config.RECRAWL_AFTER_DAYS or int(entry["timestamp"]) >= stale_before:
+                continue
+        pending.add(tuple(candidate))
+    return pending
+
+
 def create_results_folder():
     """Checks if a results folder already exists. Creates the folder if it is not already created"""
     if not os.path.exists(config.RESULTS_FOLDER):
@@ -166,96 +246,424 @@ def isAbsolute(url):
     return bool(urlparse(url).netloc)
 
 
+def canonicalize_url(url):
+    """
+    returns the form of an absolute url used to tell whether two links point to the same page: with a lowercase scheme
+    and host, without fragment, default port, trailing slash and tracking query parameters, with the remaining parameters sorted.
+    Paths and queries are case sensitive and kept as they are
+    """
+
+    parts = urlsplit(url.strip())
+    userinfo, at, host = parts.netloc.rpartition("@")
+    netloc = userinfo + at + host.lower()
+    default_port = {"http": ":80", "https": ":443"}.get(parts.scheme)
+    if default_port and netloc.endswith(default_port):
+        netloc = netloc[: -len(default_port)]
+    path = parts.path.rstrip("/") or "/"
+    query = sorted(
+        (name, value)
+        for name, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not name.lower().startswith("utm_") and name.lower() not in config.TRACKING_QUERY_PARAMS
+    )
+    return urlunsplit((parts.scheme, netloc, path, urlencode(query), ""))
+
+
+def get_url_fingerprint(*parts):
+    """returns a compact fingerprint of the given strings, e.g. a candidate and a canonical url"""
+
+    return hashlib.blake2b("\x1f".join(parts).encode("utf-8"), digest_size=16).digest()
+
+
+# offline public suffix list lookups, created on first use
+_domain_extractor = None
+
+
+def get_domain_extractor():
+    """returns a tldextract extractor that only uses the public suffix list snapshot bundled with tldextract, never the network"""
+
+    global _domain_extractor
+    if _domain_extractor is None:
+        import tldextract
+
+        _domain_extractor = tldextract.TLDExtract(suffix_list_urls=(), cache_dir=None)
+    return _domain_extractor
+
+
+@functools.lru_cache(maxsize=config.DOMAIN_CACHE_SIZE)
+def get_root_domain(netloc):
+    """returns the registered domain name of a (lowercase) netloc e.g. 'example' for 'www.example.co.uk'"""
+
+    return get_domain_extractor()(netloc).domain
+
+
+@functools.lru_cache(maxsize=config.DOMAIN_CACHE_SIZE)
+def get_netloc(link):
+    """returns the lowercase netloc of a link"""
+
+    return urlsplit(link.lower()).netloc
+
+
 def isSameDomain(source_link, dest_link):
     """Check if a given 'dest_link' belongs to the same domain. This is to make sure that the downloader downloads links that belong to the same domain and not deviate elsewhere"""
 
     if dest_link is None or len(dest_link) == 0:
         return False
-    source_link = source_link.lower()
-    dest_link = dest_link.lower()
 
-    dest_domain = urlparse(dest_link).netloc
-    source_domain = urlparse(source_link).netloc
-
-    if not isAbsolute(dest_link):
+    # urlsplit gives the same netloc as urlparse at half the cost
+    dest_domain = urlsplit(dest_link.lower()).netloc
+    # relative link
+    if not dest_domain:
         return True
 
+    # the source link is the candidate's website or page, the same few are checked over and over
+    source_domain = get_netloc(source_link)
     if dest_domain == source_domain:
         return True
 
-    dest_root = tldextract.extract(dest_domain).domain
-    source_root = tldextract.extract(source_domain).domain
-    return dest_root == source_root
+    return get_root_domain(dest_domain) == get_root_domain(source_domain)
 
 
-# moving attachments to a folder in root
-def attachment_cleaner():
-    """Move attachments to attachments folder"""
+# webpages kept in the page store, read from the database file
+_storage_index = {}
+_storage_index_key = None
 
-    attachment_folder = "attachments"
-    if not os.path.isdir(attachment_folder):
-        os.mkdir(attachment_folder)
 
-    for filename in os.listdir(os.getcwd()):
-        if os.path.isdir(filename):
-            continue
-        # allowed_extensions = ['.py','.sh']
+def get_storage_index():
+    """
+    returns {candidate website folder: {webpage filename: blob path}} for the webpages kept in the page store.
+    The index is read again whenever the database file changes.
+    """
 
-        if filename.endswith(".py") or filename.endswith(".sh"):
+    global _storage_index, _storage_index_key
+    if not os.path.isfile(config.DATABASE_FILE):
+        return {}
+    stat = os.stat(config.DATABASE_FILE)
+    key = (config.DATABASE_FILE, stat.st_mtime_ns, stat.st_size)
+    if key == _storage_index_key:
+        return _storage_index
+
+    index = {}
+    for row in read_database_file(config.DATABASE_FILE):
+        if not row["storage"]:
             continue
-        randomized_filename = "".join([filename, str(time.time())])
-        os.rename(filename, randomized_filename)
-        _Logger.debug(f"moving {randomized_filename} to {attachment_folder}")
-        shutil.move(randomized_filename, attachment_folder)
+        folder, filename = os.path.split(row["filepath"])
+        index.setdefault(folder, {})[filename] = row["storage"]
+    _storage_index, _storage_index_key = index, key
+    return index
 
 
-class LinkExtractor:
-    """returns a list containing links from a single webpage"""
+# storage of the webpages handed over by the crawler in pipeline mode, so that they are found without reading the database file again
+_webpage_storage = {}
+
+
+def set_webpage_storage(webpage, storage):
+    """Record where a webpage was just saved, "" for a webpage saved as a file. None forgets the webpage"""
+
+    if storage is None:
+        _webpage_storage.pop(webpage, None)
+    else:
+        _webpage_storage[webpage] = storage
+
+
+def get_webpage_storage(webpage):
+    """returns the blob path or WARC location of a webpage kept in the page store or None for a webpage saved as a file"""
+
+    if webpage in _webpage_storage:
+        return _webpage_storage[webpage] or None
+    folder, filename = os.path.split(webpage)
+    return get_storage_index().get(folder, {}).get(filename)
+
+
+def open_webpage(webpage):
+    """returns a text file object of a downloaded webpage, wherever it is stored"""
+
+    storage = get_webpage_storage(webpage)
+    if storage:
+        return page_store.open_blob(storage)
+    return open(webpage)
+
+
+def copy_webpage(webpage, folder):
+    """Copy a downloaded webpage to 'folder' under its webpage filename"""
+
+    storage = get_webpage_storage(webpage)
+    if not storage:
+        shutil.copy(webpage, folder)
+        return
+    # the page is copied as it was downloaded, without decoding it
+    with open(os.path.join(folder, os.path.basename(webpage)), "wb") as dst:
+        dst.write(page_store.read_blob(storage))
+
+
+class KeywordMatcher:
+    """
+    Finds keywords in strings case insensitively, scanning every string once whatever the number of keywords.
+    The keywords are compiled into a single regex shaped after their prefix trie.
+    """
+
+    def __init__(self, keywords) -> None:
+        self.keywords = [keyword.lower() for keyword in keywords]
+        trie = {}
+        for keyword in self.keywords:
+            node = trie
+            for char in keyword:
+                node = node.setdefault(char, {})
+            node[""] = {}
+        self.regex = re.compile(self.get_trie_pattern(trie) if self.keywords else "(?!)")
+
+    @classmethod
+    def get_trie_pattern(cls, node):
+        # a keyword ending here already matched, the longer keywords sharing its prefix cannot add a match
+        if "" in node:
+            return ""
+        alternatives = [re.escape(char) + cls.get_trie_pattern(child) for char, child in sorted(node.items())]
+        if len(alternatives) == 1:
+            return alternatives[0]
+        return "(?:" + "|".join(alternatives) + ")"
+
+    def search(self, string) -> bool:
+        """returns True if any keyword is found in the string"""
+
+        return self.regex.search(string.lower()) is not None
+
+    def find_all(self, string) -> set:
+        """returns the keywords found in the string"""
+
+        return set(self.regex.findall(string.lower()))
+
+
+class Link(NamedTuple):
+    """An <a> tag of a webpage: its href, text and space separated rel values"""
+
+    href: Optional[str]
+    text: str
+    rel: str = ""
+
+
+class ParsedWebpage:
+    """A downloaded webpage parsed once so that several analyzers can share the same document. Parsed with BeautifulSoup's html.parser"""
+
+    backend = "html.parser"
+
+    def __init__(self, webpage):
+        self.webpage = webpage
+        self._anchors = None
+        with open_webpage(webpage) as html:
+            self.document = self.parse(html)
 
     @staticmethod
-    def get_links(webpage) -> list:
-        with open(webpage) as html:
-            try:
-                soup = bs(html, "html.parser")
-            except Exception:
-                return []
-        links = soup.find_all("a")
-        all_links = []
-        for link in links:
+    def parse(html):
+        """returns the parsed document or None if the webpage cannot be parsed"""
+
+        from bs4 import BeautifulSoup as bs
+
+        try:
+            return bs(html, "html.parser")
+        except Exception:
+            return None
+
+    def find_anchors(self) -> list[Link]:
+        anchors = []
+        for link in self.document.find_all("a"):
             if link is None:
                 continue
             # href = link.xpath("@href").extract_first()
-            href = link.get("href")
-            if not href:
-                continue
-            if skipUrl(href):
-                continue
-            if href not in all_links:
-                all_links.append(href)
-        return all_links
+            anchors.append(Link(link.get("href"), link.text.strip(), " ".join(link.get("rel") or ())))
+        return anchors
+
+    def find_form_labels(self) -> list:
+        form_labels = []
+        forms = self.document.find_all("form")
+        for form in forms:
+            if form.find_all("input"):
+                labels = form.find_all("label")
+                for label in labels:
+                    form_labels.append(label.text)
+        return form_labels
+
+    def get_anchors(self) -> list[Link]:
+        """returns every <a> tag of the webpage, looked up once and shared between the link getters"""
+
+        if self.document is None:
+            return []
+        if self._anchors is None:
+            self._anchors = self.find_anchors()
+        return self._anchors
+
+    def get_links(self) -> list:
+        """returns a list containing the links of the webpage"""
+
+        # dict keys dedup in linear time and keep the order of the anchors
+        return list(dict.fromkeys(link.href for link in self.get_anchors() if link.href and not skipUrl(link.href)))
+
+    def get_unique_links(self) -> list[Link]:
+        """returns the anchors of the webpage that have a href, without duplicates"""
+
+        return list(dict.fromkeys(link for link in self.get_anchors() if link.href))
+
+    def get_links_with_texts(self) -> list[dict]:
+        """returns a list containing linktext:links of the webpage"""
+
+        texts_and_links = dict.fromkeys((link.text, link.href) for link in self.get_anchors() if link.href)
+        return [{href_text: href} for href_text, href in texts_and_links]
+
+    def get_form_labels(self) -> list:
+        """returns the label texts of the forms of the webpage that contain input fields"""
+
+        if self.document is None:
+            return []
+        return self.find_form_labels()
+
+
+class CachedWebpage(ParsedWebpage):
+    """A webpage whose anchors and form labels were found in the analysis cache. It is not read nor parsed again"""
+
+    backend = "cache"
+
+    def __init__(self, webpage, anchors, form_labels):
+        self.webpage = webpage
+        self.document = None
+        self._anchors = [Link(*anchor) for anchor in anchors]
+        self._form_labels = form_labels
+
+    def get_anchors(self) -> list[Link]:
+        return self._anchors
+
+    def get_form_labels(self) -> list:
+        return self._form_labels
+
+
+# BeautifulSoup's get_text leaves out the strings of these elements, and keeps whitespace as it is only in the last two
+_BS4_STRING_CONTAINERS = frozenset(["script", "style", "template", "rt", "rp"])
+_BS4_PRESERVE_WHITESPACE = frozenset(["pre", "textarea"])
+
+
+def _get_bs4_string(text, preserve):
+    """returns a string of the document the way BeautifulSoup stores it, which turns whitespace only strings into a single space or newline"""
+
+    if preserve or text.strip("\x20\x0a\x09\x0c\x0d"):
+        return text
+    return "\n" if "\n" in text else " "
+
+
+def _iter_lxml_strings(element, preserve=False):
+    if element.tag in _BS4_STRING_CONTAINERS:
+        return
+    preserve = preserve or element.tag in _BS4_PRESERVE_WHITESPACE
+    if element.text:
+        yield _get_bs4_string(element.text, preserve)
+    for child in element:
+        # comments and processing instructions have no text in get_text, unlike the text following them
+        if isinstance(child.tag, str):
+            yield from _iter_lxml_strings(child, preserve)
+        if child.tail:
+            yield _get_bs4_string(child.tail, preserve)
+
+
+def get_lxml_text(element):
+    """returns the text of an lxml element exactly as BeautifulSoup's get_text returns it on the html.parser document"""
+
+    return "".join(_iter_lxml_strings(element))
+
+
+class LxmlWebpage(ParsedWebpage):
+    """Fast path of ParsedWebpage that only looks up the anchors, forms and labels of an lxml parsed document"""
+
+    backend = "lxml"
+
+    @staticmethod
+    def parse(html):
+        try:
+            markup = html.read()
+            # libxml2 silently stops at NUL bytes, leave such pages to html.parser
+            if "\x00" in markup:
+                return None
+            return get_lxml_html().document_fromstring(markup)
+        except Exception:
+            return None
+
+    def find_anchors(self) -> list[Link]:
+        return [
+            Link(link.get("href"), get_lxml_text(link).strip(), " ".join((link.get("rel") or "").split()))
+            for link in self.document.iter("a")
+        ]
+
+    def find_form_labels(self) -> list:
+        form_labels = []
+        for form in self.document.iter("form"):
+            if next(form.iter("input"), None) is not None:
+                for label in form.iter("label"):
+                    form_labels.append(get_lxml_text(label))
+        return form_labels
+
+
+def get_webpage_digest(webpage):
+    """returns the hash identifying the content of a downloaded webpage"""
+
+    storage = get_webpage_storage(webpage)
+    if storage and ".warc.gz#" in storage:
+        # WARC files are only appended to, a record location always holds the same page
+        return get_hashcode(storage)
+    if storage:
+        # blobs are named after the sha256 of the page
+        return os.path.basename(storage).split(".")[0]
+    with open(webpage, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def parse_webpage(webpage):
+    """
+    returns the webpage parsed by the backend set in config.HTML_PARSER_BACKEND, falling back to html.parser on malformed webpages.
+    With config.ANALYSIS_CACHE, webpages analyzed by a previous run are looked up in the analysis cache instead of being parsed.
+    """
+
+    if not config.ANALYSIS_CACHE:
+        return parse_webpage_document(webpage)
+
+    cache = analysis_cache.get_analysis_cache()
+    digest = get_webpage_digest(webpage)
+    cached = cache.get(digest)
+    if cached is not None:
+        return CachedWebpage(webpage, *cached)
+    page = parse_webpage_document(webpage)
+    cache.put(digest, page.get_anchors(), page.get_form_labels())
+    return page
+
+
+@functools.lru_cache(maxsize=None)
+def get_lxml_html():
+    """returns lxml.html, imported on first use, or None if lxml is not installed"""
+
+    try:
+        from lxml import html
+    except ImportError:
+        return None
+    return html
+
+
+def parse_webpage_document(webpage):
+    """returns the webpage parsed by the backend set in config.HTML_PARSER_BACKEND, falling back to html.parser on malformed webpages"""
+
+    if config.HTML_PARSER_BACKEND == "lxml" and get_lxml_html() is not None:
+        page = LxmlWebpage(webpage)
+        if page.document is not None:
+            return page
+        _Logger.debug(f"lxml could not parse {webpage}. Falling back to html.parser")
+    return ParsedWebpage(webpage)
+
+
+class LinkExtractor:
+    """returns a list containing links from a single webpage"""
+
+    @staticmethod
+    def get_links(webpage) -> list:
+        return parse_webpage(webpage).get_links()
 
     @staticmethod
     def get_links_with_texts(webpage) -> list[dict]:
         """returns a list containing linktext:links from a single webpage"""
 
-        with open(webpage) as html_file:
-            try:
-                soup = bs(html_file, "html.parser")
-            except Exception:
-                return []
-        links = soup.find_all("a")
-        all_links = []
-        for link in links:
-            if link is None:
-                continue
-            href = link.get("href")
-            href_text = link.text.strip() if link.text.strip() else ""
-            if not href:
-                continue
-            to_append = {href_text: href}
-            if to_append not in all_links:
-                all_links.append(to_append)
-        return all_links
+        return parse_webpage(webpage).get_links_with_texts()
 
 
 def get_hashcode(input_string):
@@ -264,13 +672,110 @@ def get_hashcode(input_string):
     return hashlib.sha256(input_string.encode("utf-8")).hexdigest()
 
 
+def parse_shard(shard):
+    """returns (K, N) of a "K/N" shard, K counting from 1"""
+
+    index, _, count = str(shard).partition("/")
+    index, count = int(index), int(count)
+    if not 1 <= index <= count:
+        raise ValueError(f"Invalid shard {shard}, expected K/N with 1 <= K <= N")
+    return index, count
+
+
+def get_candidate_shard(candidate_name, candidate_office, count):
+    """returns the shard, counting from 1, a candidate belongs to out of 'count'. The same on every machine and run"""
+
+    digest = hashlib.blake2b(f"{candidate_name}\0{candidate_office}".encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % count + 1
+
+
+def is_selected_candidate(candidate):
+    """Check a row of the candidate file against the CANDIDATE_NAMES, CANDIDATE_OFFICES, CANDIDATE_STATES and CANDIDATE_SHARD settings"""
+
+    def matches(value, selection):
+        return not selection or (value or "").strip().lower() in {selected.strip().lower() for selected in selection}
+
+    if not matches(candidate["name"], config.CANDIDATE_NAMES):
+        return False
+    if not matches(candidate["office"], config.CANDIDATE_OFFICES):
+        return False
+    if "state" in candidate and not matches(candidate["state"], config.CANDIDATE_STATES):
+        return False
+    if config.CANDIDATE_SHARD:
+        index, count = parse_shard(config.CANDIDATE_SHARD)
+        return get_candidate_shard(candidate["name"], candidate["office"], count) == index
+    return True
+
+
+def get_config_settings():
+    """returns the settings of config.py as they are now, including the ones changed at runtime, to hand to worker processes"""
+
+    return {setting: value for setting, value in vars(config).items() if setting.isupper()}
+
+
+def apply_config_settings(settings):
+    """Apply settings returned by get_config_settings in a worker process, where config.py may have been imported again"""
+
+    for setting, value in settings.items():
+        setattr(config, setting, value)
+
+
+# config settings of the folders and files a run writes, rebound under OUTPUT_ROOT
+OUTPUT_SETTINGS = [
+    "DATABASE_FOLDER",
+    "HTML_FOLDER",
+    "CRAWL_MANIFEST",
+    "CRAWL_JOBDIR",
+    "PAGE_STORE_FOLDER",
+    "WARC_FOLDER",
+    "ATTACHMENTS_FOLDER",
+    "LOGS_FOLDER",
+    "DATABASE_FILE",
+    "ERROR_FILEPATH",
+    "RESULTS_FOLDER",
+    "ANALYSIS_CACHE_FILE",
+    "PRIVACY_POLICY_RESULTS",
+    "PRIVACY_POLICY_FOLDER",
+    "LINK_EXTRACTOR_RESULTS",
+    "FORM_EXTRACTOR_RESULTS",
+]
+_default_output_paths = {setting: getattr(config, setting) for setting in OUTPUT_SETTINGS}
+
+
+def get_default_output_path(setting):
+    """returns the path an OUTPUT_SETTINGS setting has when no output root is set"""
+
+    return _default_output_paths[setting]
+
+
+def set_output_root(root):
+    """Rebind the output folders and files of config.py under root, or back to the current folder when root is None"""
+
+    for setting, path in _default_output_paths.items():
+        setattr(config, setting, os.path.join(root, path) if root else path)
+    config.OUTPUT_ROOT = root
+    if root:
+        os.makedirs(root, exist_ok=True)
+
+
+def get_shard_root(shard):
+    """returns the output root of a "K/N" shard in SHARDS_FOLDER"""
+
+    index, count = parse_shard(shard)
+    return os.path.join(config.SHARDS_FOLDER, f"shard-{index}-of-{count}")
+
+
 class CandidateUtils:
     @staticmethod
     def load_candidates():
-        """Load the candidates and their metadata from the database"""
+        """Load the candidates and their metadata from the database, keeping those selected by the CANDIDATE_* settings"""
         with open(config.CANDIDATE_OFFICE_WEBSITE) as f:
             reader = csv.DictReader(f, delimiter=",")
+            if config.CANDIDATE_STATES and "state" not in reader.fieldnames:
+                _Logger.warning(f"{config.CANDIDATE_OFFICE_WEBSITE} has no state column. Not filtering candidates by state")
             for candidate in reader:
+                if not is_selected_candidate(candidate):
+                    continue
                 candidate_name = candidate["name"]
                 candidate_office = candidate["office"]
                 candidate_website = candidate["website"]
@@ -291,6 +796,8 @@ class CandidateUtils:
         website_path = CandidateUtils.get_candidate_website_folder(
             candidate_name, candidate_office
         )
+        for webpage in get_storage_index().get(website_path, {}):
+            yield os.path.join(website_path, webpage)
         if not os.path.isdir(website_path):
             return
         for webpage in os.listdir(website_path):
@@ -300,18 +807,5 @@ class CandidateUtils:
     def get_form_fields(candidate_name, candidate_office):
         input_fields = set()
         for html_file in CandidateUtils.get_webpages(candidate_name, candidate_office):
-            with open(html_file) as hfile:
-                try:
-                    soup = bs(hfile, "html.parser")
-                except Exception:
-                    continue
-                forms = soup.find_all("form")
-                if not forms:
-                    # return []
-                    continue
-                for form in forms:
-                    if form.find_all("input"):
-                        labels = form.find_all("label")
-                        for label in labels:
-                            input_fields.add(label.text)
+            input_fields.update(parse_webpage(html_file).get_form_labels())
         return list(input_fields)
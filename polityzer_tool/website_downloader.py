@@ -1,16 +1,23 @@
 import scrapy
+from scrapy import signals
+from scrapy.http import TextResponse
 from scrapy_selenium import SeleniumRequest
 from scrapy.crawler import CrawlerProcess
+from scrapy.exceptions import IgnoreRequest
+from scrapy.utils.gz import gunzip, gzip_magic_number
+from scrapy.utils.sitemap import Sitemap, sitemap_urls_from_robots
 from twisted.internet.error import ConnectionRefusedError
-from urllib.parse import urlparse, urljoin
+from urllib.parse import urljoin
 import logging
 import time
 import os
-import csv
 import re
+import shutil
 
 
-import config, utils
+import config, utils, page_store
+from utils import CandidateUtils
+from privacy_policy_analyzer import Privacy_Policy_Check
 
 _Logger = logging.getLogger(__name__)
 
@@ -25,82 +32,113 @@ class WebsiteCrawler(scrapy.Spider):
         "ROBOTSTXT_OBEY": True,
         "DOWNLOAD_TIMEOUT": 20,
         "SELENIUM_DRIVER_NAME": "chrome",
-        "DOWNLOADER_MIDDLEWARES": {"scrapy_selenium.SeleniumMiddleware": 800},
-        "SELENIUM_DRIVER_EXECUTABLE_PATH": chromedriver_path,
+        "DOWNLOADER_MIDDLEWARES": {
+            "website_downloader.CandidateBudgetMiddleware": 750,
+            "selenium_pool.SeleniumPoolMiddleware": 800,
+        },
+        "SPIDER_MIDDLEWARES": {
+            "scrapy.spidermiddlewares.depth.DepthMiddleware": None,
+            "website_downloader.CandidateDepthMiddleware": 900,
+        },
         "SELENIUM_DRIVER_ARGUMENTS": ["--headless"],
         "DEPTH_PRIORITY": 1,
         "SCHEDULER_DISK_QUEUE": "scrapy.squeues.PickleFifoDiskQueue",
         "SCHEDULER_MEMORY_QUEUE": "scrapy.squeues.FifoMemoryQueue",
     }
 
-    def __init__(self) -> None:
+    @classmethod
+    def update_settings(cls, settings):
+        super().update_settings(settings)
+        # read when the crawl starts rather than on import, so that set_output_root and the command line options apply
+        settings.setdict(
+            {
+                "SELENIUM_DRIVER_EXECUTABLE_PATH": config.CHROMEDRIVER_PATH,
+                "SELENIUM_POOL_SIZE": config.SELENIUM_POOL_SIZE,
+                "SELENIUM_POOL_MAX_PAGES": config.SELENIUM_POOL_MAX_PAGES,
+                "SELENIUM_BLOCK_RESOURCES": config.SELENIUM_BLOCK_RESOURCES,
+                "SELENIUM_BLOCKED_EXTENSIONS": config.SELENIUM_BLOCKED_EXTENSIONS,
+                "SELENIUM_BLOCKED_HOSTS": config.SELENIUM_BLOCKED_HOSTS,
+                "SELENIUM_DOWNLOAD_FOLDER": config.ATTACHMENTS_FOLDER,
+            },
+            priority="spider",
+        )
+
+    def __init__(self, analysis_pipeline=None) -> None:
         self.website_input_file = config.CANDIDATE_OFFICE_WEBSITE
         self.database_file = utils.get_database_file()
         self.error_file = utils.get_error_file()
         self.headers = config.HEADERS
-        self.cache = set()
+        self.page_store = page_store.get_page_store()
+        self.manifest_file = utils.get_manifest_file()
+        # requests in flight and pages saved per candidate. Persisted in JOBDIR by Scrapy so an interrupted crawl can resume
+        self.state = {}
+        # fused_analyzer.AnalysisPipeline analyzing the saved pages during the crawl, see config.PIPELINE_ANALYSIS
+        self.analysis_pipeline = analysis_pipeline
+        self.policy_keyword_matcher = utils.KeywordMatcher(config.FOCUSED_POLICY_KEYWORDS)
+
+    @classmethod
+    def from_crawler(cls, crawler, *args, **kwargs):
+        spider = super().from_crawler(crawler, *args, **kwargs)
+        crawler.signals.connect(spider.requestDropped, signal=signals.request_dropped)
+        return spider
 
     def loadCampaignSites(self):
-        """Load name and websites to be downloaded"""
+        """Load name and websites to be downloaded. Candidates whose crawl completed and is not stale are left out"""
 
         results = set()
         if not os.path.isfile(self.website_input_file):
             _Logger.error("No input file detected!")
             return results
-        input_file = self.website_input_file
-
-        with open(input_file, "r") as inputfile:
-            csvreader = csv.reader(inputfile, delimiter=",")
-            next(csvreader)
-            for row in csvreader:
-                name = row[0]
-                office = row[1]
-                site = row[-1]
-                if site is None or len(site) == 0:
-                    continue
-                results.add((name, office, site))
-        return results
+
+        # only the candidates selected by the CANDIDATE_* settings
+        for name, office, site in CandidateUtils.load_candidates():
+            if site is None or len(site) == 0:
+                continue
+            results.add((name, office, site))
+
+        pending = utils.get_pending_candidates(results)
+        _Logger.info(f"{len(results) - len(pending)} candidates already downloaded, {len(pending)} to download")
+        return pending
 
     def saveHtml(self, response, depth):
         """
-        Save the response to a html file.
+        Save the response to a html file, or to the page store set by config.PAGE_STORAGE.
         Note: Filenames are appended with random integers to avoid duplicates.
         """
 
         candidate_name = response.meta["name"].replace(" ", "")
-
-        # create office folder
         candidate_office = response.meta["office"]
-        office_download_folder = os.path.join(config.HTML_FOLDER, candidate_office)
-        if not os.path.isdir(office_download_folder):
-            os.mkdir(office_download_folder)
-
-        # create candidate folder
-        fullpath = os.path.join(office_download_folder, candidate_name)
-        if not os.path.exists(fullpath):
-            os.mkdir(fullpath)
-
-        page_title = response.css("title::text").get()
+        page_title = response.css("title::text").get() if isinstance(response, TextResponse) else None
         current_url = response.meta["url"]
-
-        relativeurlpath = urlparse(current_url).path
-        rooturlpath = urlparse(current_url).netloc
-        randomizer = str(time.time()).replace(".", "")
-        if relativeurlpath:
-            relativepath = relativeurlpath.replace("/", "|")
-            filetocreate = os.path.join(fullpath, "".join([rooturlpath, relativepath, randomizer]))
+        filetocreate = page_store.get_webpage_path(candidate_name, candidate_office, current_url, page_title)
+
+        if self.page_store:
+            headers = [
+                (name.decode("latin-1"), value.decode("latin-1"))
+                for name, values in response.headers.items()
+                for value in values
+            ]
+            storage = self.page_store.save(
+                response.body,
+                url=current_url,
+                status=response.status,
+                headers=headers,
+                metadata={"name": candidate_name, "office": candidate_office, "depth": depth},
+            )
+            _Logger.info(f"Saving {response.url}, Path -> {filetocreate}, Blob -> {storage}")
         else:
-            if page_title:
-                filetocreate = os.path.join(fullpath, "".join([rooturlpath, page_title, randomizer]))
-            else:
-                filetocreate = os.path.join(fullpath, "".join([rooturlpath, randomizer]))
-
-        _Logger.info(f"Saving {response.url}, Path -> {filetocreate}")
-        with open(filetocreate, "wb") as f:
-            f.write(response.body)
-            self.database_file.writerow([candidate_name, current_url, filetocreate, depth])
-            self.cache.add(utils.get_hashcode(current_url))
-        utils.attachment_cleaner()
+            storage = ""
+            # create office and candidate folder
+            os.makedirs(os.path.dirname(filetocreate), exist_ok=True)
+            _Logger.info(f"Saving {response.url}, Path -> {filetocreate}")
+            with open(filetocreate, "wb") as f:
+                f.write(response.body)
+
+        fetcher = response.meta.get("fetcher", "selenium")
+        self.database_file.writerow([candidate_name, current_url, filetocreate, depth, fetcher, storage])
+        self.crawler.stats.inc_value(f"polityzer/fetcher/{fetcher}")
+        if self.analysis_pipeline:
+            self.analysis_pipeline.put_page(candidateKey(response.meta), filetocreate, storage)
 
     def start_requests(self):
         """Method for the starting of the website requests"""
@@ -109,24 +147,123 @@ class WebsiteCrawler(scrapy.Spider):
 
         sites = self.loadCampaignSites()
         for name, office, link in sites:
-            self.cache = set()
             _Logger.info(f"Working on {name}->{office}->{link}")
-            if link.startswith("file://"):
-                yield scrapy.Request(
-                    url=link,
-                    callback=self.crawlCampaignSite,
-                    errback=self.error_handler,
-                    meta={"name": name, "office": office, "url": link, "depth": 0},
-                    headers=self.headers,
-                )
-            else:
-                yield SeleniumRequest(
-                    url=link,
-                    callback=self.crawlCampaignSite,
-                    errback=self.error_handler,
-                    meta={"name": name, "office": office, "url": link, "depth": 0},
-                    headers=self.headers,
-                )
+            meta = {"name": name, "office": office, "website": link, "url": link, "depth": 0}
+            if self.enqueueOnce(meta, link):
+                yield self.buildRequest(link, meta)
+            if config.SITEMAP_SEEDING and re.search(r"^http(s)?:", link):
+                yield self.buildSitemapRequest(urljoin(link, "/robots.txt"), meta, self.parseRobots)
+
+    def buildRequest(self, url, meta, render=False, priority=0):
+        """
+        Returns the request downloading 'url'.
+        Local files are always read by Scrapy. With config.HYBRID_FETCH, web pages are fetched over plain HTTP first
+        and only rendered with Selenium when 'render' is set, i.e. when the plain response looked like it needs JavaScript.
+        """
+
+        if url.startswith("file://"):
+            fetcher = "file"
+        elif config.HYBRID_FETCH and not render:
+            fetcher = "http"
+        else:
+            fetcher = "selenium"
+        request_class = SeleniumRequest if fetcher == "selenium" else scrapy.Request
+        self.trackRequest(meta, 1)
+        return request_class(
+            url=url,
+            callback=self.crawlCampaignSite,
+            errback=self.error_handler,
+            meta={**meta, "fetcher": fetcher},
+            headers=self.headers,
+            priority=priority,
+            # duplicates are filtered per candidate by enqueueOnce, Scrapy's dupefilter would drop pages shared by candidates
+            dont_filter=True,
+        )
+
+    def buildSitemapRequest(self, url, meta, callback):
+        """Returns the request downloading a candidate's robots.txt or one of its sitemaps. These are never saved as pages"""
+
+        self.trackRequest(meta, 1)
+        meta = {key: meta[key] for key in ("name", "office", "website")}
+        return scrapy.Request(
+            url=url,
+            callback=callback,
+            errback=self.sitemapError,
+            meta={**meta, "url": url, "depth": 0},
+            headers=self.headers,
+            dont_filter=True,
+        )
+
+    def parseRobots(self, response):
+        """Request the sitemaps declared in a candidate's robots.txt, or the default /sitemap.xml if there are none"""
+
+        sitemaps = list(sitemap_urls_from_robots(response.text, base_url=response.url)) if isinstance(response, TextResponse) else []
+        yield from self.followSitemaps(response.meta, sitemaps or [urljoin(response.url, "/sitemap.xml")])
+        self.trackRequest(response.meta, -1)
+
+    def parseSitemap(self, response):
+        """Seed the candidate's frontier with the same domain pages of a sitemap, following nested sitemap indexes"""
+
+        sitemap = None
+        try:
+            body = gunzip(response.body) if gzip_magic_number(response) else response.body
+            sitemap = Sitemap(body)
+        except Exception as e:
+            _Logger.debug(f"{response.url} is not a sitemap: {repr(e)}")
+
+        if sitemap is not None and sitemap.type == "sitemapindex":
+            yield from self.followSitemaps(response.meta, [entry["loc"] for entry in sitemap])
+        elif sitemap is not None and sitemap.type == "urlset":
+            seeded = self.state.setdefault("sitemap_urls", {})
+            candidate = candidateKey(response.meta)
+            for entry in sitemap:
+                url = entry["loc"]
+                if config.SITEMAP_MAX_URLS and seeded.get(candidate, 0) >= config.SITEMAP_MAX_URLS:
+                    _Logger.debug(f"Sitemap limit reached for {response.meta['name']}, {url} ignored")
+                    break
+                if not re.search(r"^http(s)?:", url) or not utils.isSameDomain(response.meta["website"], url):
+                    continue
+                if len(url) > self.settings.getint("URLLENGTH_LIMIT"):
+                    continue
+                # sitemap pages count as links of the home page, however deep the sitemap index nesting
+                meta = {key: response.meta[key] for key in ("name", "office", "website")}
+                meta.update({"url": url, "depth": 1})
+                if not self.enqueueOnce(meta, url):
+                    continue
+                seeded[candidate] = seeded.get(candidate, 0) + 1
+                self.crawler.stats.inc_value("polityzer/sitemap/urls")
+                yield self.buildRequest(url, meta, priority=self.linkPriority(meta, url))
+        self.trackRequest(response.meta, -1)
+
+    def followSitemaps(self, meta, urls):
+        """Yield the requests for the sitemaps of a candidate that were not requested yet"""
+
+        for url in urls:
+            if utils.isSameDomain(meta["website"], url) and self.enqueueOnce(meta, url):
+                yield self.buildSitemapRequest(url, meta, self.parseSitemap)
+
+    def sitemapError(self, failure):
+        """Most sites have no robots.txt or sitemap, failures to get them are not crawl errors"""
+
+        request = failure.request
+        _Logger.debug(f"Could not get {request.url}: {repr(failure)}")
+        if request.callback == self.parseRobots:
+            yield from self.followSitemaps(request.meta, [urljoin(request.url, "/sitemap.xml")])
+        self.trackRequest(request.meta, -1)
+
+    def enqueueOnce(self, meta, url):
+        """
+        Check the url against the candidate's frontier and add it. Returns False if the candidate already scheduled
+        the same page, i.e. the same url up to the case of its scheme and host, fragment, trailing slash and tracking parameters
+        """
+
+        frontier = self.state.setdefault("frontier", {}).setdefault(candidateKey(meta), set())
+        fingerprint = utils.get_url_fingerprint(utils.canonicalize_url(url))
+        if fingerprint in frontier:
+            self.crawler.stats.inc_value("polityzer/frontier/duplicate")
+            return False
+        frontier.add(fingerprint)
+        return True
 
     def crawlCampaignSite(self, response):
         """Callback method that handles the subsequent webpage downloads once the process begins with 'start_requests' methods"""
@@ -134,19 +271,89 @@ class WebsiteCrawler(scrapy.Spider):
         depth = response.meta["depth"]
         _Logger.debug(f"{str(response.url)}, {str(response.status)}, {str(response.meta['url'])}")
 
+        # pages of stopped candidates that were already downloading when the budget was hit
+        if self.isStopped(response.meta):
+            self.trackRequest(response.meta, -1)
+            return
+
+        if response.meta["fetcher"] == "http" and needsRendering(response):
+            _Logger.debug(f"{response.meta['url']} needs rendering. Retrying with selenium")
+            self.crawler.stats.inc_value("polityzer/fetcher/escalated")
+            meta = {key: response.meta[key] for key in ("name", "office", "website", "url", "depth", "policy_link") if key in response.meta}
+            # the rendered page keeps the depth of the link, see CandidateDepthMiddleware
+            yield self.buildRequest(response.meta["url"], meta, render=True, priority=response.request.priority)
+            self.trackRequest(response.meta, -1)
+            return
+
         if str(response.status) != "200":
             _Logger.error(str(response.status) + " error on url " + str(response.url) + "\n")
 
         # save the current link
         self.saveHtml(response, depth=depth)
+        key = candidateKey(response.meta)
+        pages = self.state.setdefault("pages", {})
+        pages[key] = pages.get(key, 0) + 1
+        sizes = self.state.setdefault("bytes", {})
+        sizes[key] = sizes.get(key, 0) + len(response.body)
+        self.checkCandidateBudget(response.meta, pages[key], sizes[key])
+        if config.FOCUSED_CRAWL:
+            self.checkFocusedBudget(response.meta, pages[key])
+        if not self.isStopped(response.meta):
+            yield from self.followLinks(response, depth)
+        self.trackRequest(response.meta, -1)
+
+    def checkCandidateBudget(self, meta, pages, size):
+        """Stop a candidate whose download went over the page, byte or time budget. Budget hits are logged as errors"""
+
+        elapsed = time.time() - self.state.setdefault("started", {}).get(candidateKey(meta), time.time())
+        if config.CANDIDATE_MAX_PAGES and pages >= config.CANDIDATE_MAX_PAGES:
+            reason = f"page budget of {config.CANDIDATE_MAX_PAGES} pages reached"
+        elif config.CANDIDATE_MAX_BYTES and size >= config.CANDIDATE_MAX_BYTES:
+            reason = f"byte budget of {config.CANDIDATE_MAX_BYTES} bytes reached"
+        elif config.CANDIDATE_MAX_SECONDS and elapsed >= config.CANDIDATE_MAX_SECONDS:
+            reason = f"time budget of {config.CANDIDATE_MAX_SECONDS} seconds reached"
+        else:
+            return
+        if not self.isStopped(meta):
+            self.error_file.writerow([meta["name"], meta["url"], meta["depth"], f"Download stopped: {reason}"])
+        self.stopCandidate(meta, reason)
+
+    def checkFocusedBudget(self, meta, pages):
+        """Stop a candidate's focused crawl once its privacy policy page or the page budget is reached"""
+
+        if config.FOCUSED_STOP_ON_POLICY and meta.get("policy_link"):
+            self.stopCandidate(meta, "privacy policy page found")
+        elif config.FOCUSED_PAGE_BUDGET and pages >= config.FOCUSED_PAGE_BUDGET:
+            self.stopCandidate(meta, f"page budget of {config.FOCUSED_PAGE_BUDGET} reached")
+
+    def stopCandidate(self, meta, reason):
+        """Stop downloading a candidate. Its requests that are still queued are dropped by CandidateBudgetMiddleware"""
+
+        stopped = self.state.setdefault("stopped", set())
+        if candidateKey(meta) in stopped:
+            return
+        _Logger.info(f"Stopping download of {meta['name']}->{meta['office']}: {reason}")
+        self.crawler.stats.inc_value("polityzer/candidates/stopped")
+        stopped.add(candidateKey(meta))
+
+    def isStopped(self, meta):
+        return candidateKey(meta) in self.state.get("stopped", ())
+
+    def followLinks(self, response, depth):
+        """Yield the requests for the same domain links of a saved page"""
 
         if response.meta["depth"] > config.MAX_DEPTH:
             return
 
+        # attachments such as pdfs have no links to follow
+        if not isinstance(response, TextResponse):
+            return
+
         foundLink = False
         for link in response.xpath("//a"):
             foundLink = True
             destLink = link.xpath("@href").extract_first()
+            linkText = link.xpath("string()").get() if config.FOCUSED_CRAWL else ""
             if destLink is None or len(destLink) == 0 or utils.skipUrl(destLink):
                 _Logger.debug(f"{destLink} ignored")
                 continue
@@ -162,44 +369,79 @@ class WebsiteCrawler(scrapy.Spider):
                 _Logger.debug(f"{destLink} ignored. Not proper link")
                 continue
 
-            if utils.get_hashcode(destLink) in self.cache:
+            # Scrapy drops such requests silently, they would never be counted as done
+            if len(destLink) > self.settings.getint("URLLENGTH_LIMIT"):
+                _Logger.debug(f"{destLink} ignored. Url too long")
                 continue
 
-            if destLink.startswith("file://"):
-                yield scrapy.Request(
-                    url=destLink,
-                    callback=self.crawlCampaignSite,
-                    errback=self.error_handler,
-                    meta={
-                        "name": response.meta["name"],
-                        "office": response.meta["office"],
-                        "url": destLink,
-                        "depth": depth + 1,
-                    },
-                    headers=self.headers,
-                )
-            else:
-                yield SeleniumRequest(
-                    url=destLink,
-                    callback=self.crawlCampaignSite,
-                    errback=self.error_handler,
-                    meta={
-                        "name": response.meta["name"],
-                        "office": response.meta["office"],
-                        "url": destLink,
-                        "depth": depth + 1,
-                    },
-                    headers=self.headers,
-                )
+            meta = {
+                "name": response.meta["name"],
+                "office": response.meta["office"],
+                "website": response.meta["website"],
+                "url": destLink,
+                "depth": depth + 1,
+            }
+            if not self.enqueueOnce(meta, destLink):
+                continue
+
+            yield self.buildRequest(destLink, meta, priority=self.linkPriority(meta, destLink, linkText))
         if not foundLink:
             _Logger.debug(f"No Links... {response.meta['url']}, {response.url}, {str(response.status)}")
 
+    def linkPriority(self, meta, url, text=""):
+        """returns the request priority of a link. In a focused crawl, links that look like the privacy policy or terms go to the front of the queue"""
+
+        if not config.FOCUSED_CRAWL:
+            return 0
+        score = linkFocusScore(url, text)
+        meta["policy_link"] = self.policy_keyword_matcher.search(f"{url} {text}")
+        return score * 100
+
+    def trackRequest(self, meta, delta):
+        """Count the requests in flight of a candidate. The candidate's crawl is complete once none are left"""
+
+        key = candidateKey(meta)
+        outstanding = self.state.setdefault("outstanding", {})
+        outstanding[key] = outstanding.get(key, 0) + delta
+        if delta > 0:
+            self.state.setdefault("started", {}).setdefault(key, time.time())
+        if outstanding[key] > 0:
+            return
+        del outstanding[key]
+        self.state.setdefault("frontier", {}).pop(key, None)
+        self.state.setdefault("stopped", set()).discard(key)
+        self.state.setdefault("sitemap_urls", {}).pop(key, None)
+        self.state.setdefault("started", {}).pop(key, None)
+        self.state.setdefault("bytes", {}).pop(key, None)
+        pages = self.state.setdefault("pages", {}).pop(key, 0)
+        status = "done" if pages else "failed"
+        _Logger.info(f"Download of {key[0]}->{key[1]} {status} with {pages} pages")
+        self.manifest_file.writerow([*key, status, pages, int(time.time())])
+        if self.analysis_pipeline:
+            self.analysis_pipeline.end_candidate(key)
+
+    def requestDropped(self, request, spider):
+        """Signal handler for requests the scheduler filtered out, e.g. duplicates"""
+
+        if "name" in request.meta:
+            self.trackRequest(request.meta, -1)
+
+    def closed(self, reason):
+        """Called when the crawl ends"""
+
+        if self.page_store:
+            self.page_store.close()
+
     def error_handler(self, failure):
         """callback method that handles logging of errors as they arise"""
 
+        response = failure.request
+        if failure.check(IgnoreRequest) and self.isStopped(response.meta):
+            self.trackRequest(response.meta, -1)
+            return
+
         _Logger.info("Logging error from the error handler")
         _Logger.error(repr(failure))
-        response = failure.request
         error_url = response.meta["url"]
         error_candidate = response.meta["name"]
         error_depth = response.meta["depth"]
@@ -209,26 +451,100 @@ class WebsiteCrawler(scrapy.Spider):
             # error_msg = failure.getErrorMessage()
             error_msg = repr(failure)
         self.error_file.writerow([error_candidate, error_url, error_depth, error_msg])
+        self.trackRequest(response.meta, -1)
+
+
+class CandidateBudgetMiddleware:
+    """Downloader middleware dropping the queued requests of candidates whose download was stopped"""
+
+    def process_request(self, request, spider):
+        if "name" in request.meta and spider.isStopped(request.meta):
+            raise IgnoreRequest(f"Download of {request.meta['name']} stopped")
+        return None
+
+
+class CandidateDepthMiddleware:
+    """
+    Spider middleware replacing Scrapy's DepthMiddleware, which sets the depth of every request to the depth of its
+    response plus one. Requests keep the depth set in their meta, e.g. the pages seeded from sitemaps count as links of the
+    home page and a page rendered again keeps the depth of its link. Deeper requests get a lower priority with DEPTH_PRIORITY
+    """
 
+    def __init__(self, priority=0) -> None:
+        self.priority = priority
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(crawler.settings.getint("DEPTH_PRIORITY"))
+
+    def process_spider_output(self, response, result, spider):
+        for request in result or ():
+            if isinstance(request, scrapy.Request):
+                depth = request.meta.setdefault("depth", response.meta.get("depth", 0) + 1)
+                request.priority -= depth * self.priority
+                spider.crawler.stats.max_value("request_depth_max", depth)
+            yield request
+
+
+def candidateKey(meta):
+    """returns the (name, office, website) key of the candidate a request belongs to"""
+
+    return meta["name"], meta["office"], meta["website"]
+
+
+def linkFocusScore(href, text):
+    """Number of the privacy policy analyzer's keywords found in a link's url and anchor text"""
+
+    return len(Privacy_Policy_Check.keyword_matcher.find_all(f"{href} {text}"))
+
+
+def needsRendering(response):
+    """Heuristic check if a page fetched over plain HTTP has to be rendered by a browser to get its content and links"""
+
+    if response.status != 200:
+        return True
+    # attachments are saved as they are
+    if not isinstance(response, TextResponse):
+        return False
+    if not response.body.strip():
+        return True
+    body = response.text
+    if any(marker in body for marker in config.SPA_MARKERS):
+        return True
+    return not response.xpath("//a[@href]")
+
+
+def start(analysis_pipeline=None):
+    """Download the pending candidates. Their pages are handed to analysis_pipeline as they are saved, if given"""
+
+    # resume or extend the previous crawl with the candidates that are missing, failed or stale
+    if not utils.get_pending_candidates(CandidateUtils.load_candidates()):
+        _Logger.info("Download already completed")
+        return
 
-def start():
     if not utils.configure_ChromeDriver():
         _Logger.error("Error setting up selenium..")
         return
 
     # create folder to save webpages
-    download_flag = False if utils.get_download_status() else True
+    utils.create_html_folder()
 
     # start crawling process
-    if download_flag:
-        start_time = time.time()
-        process = CrawlerProcess()
-        process.crawl(WebsiteCrawler)
-        process.start()
-        _Logger.info(f"----Time taken in seconds----:{time.time() - start_time}")
-    else:
-        _Logger.info("Download already completed")
+    start_time = time.time()
+    settings = {"JOBDIR": config.CRAWL_JOBDIR} if config.CRAWL_JOBDIR else {}
+    process = CrawlerProcess(settings)
+    crawler = process.create_crawler(WebsiteCrawler)
+    process.crawl(crawler, analysis_pipeline=analysis_pipeline)
+    process.start()
+    _Logger.info(f"----Time taken in seconds----:{time.time() - start_time}")
+
+    # the scheduler state is only needed to resume an interrupted crawl
+    if config.CRAWL_JOBDIR and crawler.stats.get_value("finish_reason") == "finished":
+        shutil.rmtree(config.CRAWL_JOBDIR, ignore_errors=True)
 
 
 if __name__ == "__main__":
+    if config.OUTPUT_ROOT:
+        utils.set_output_root(config.OUTPUT_ROOT)
+    utils.create_logger()
     start()
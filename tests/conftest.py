@@ -0,0 +1,39 @@
+import glob
+import os
+import shutil
+import sys
+
+import pytest
+
+# the polityzer_tool modules import each other as top level modules
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "polityzer_tool"))
+
+WEBPAGES = sorted(glob.glob(os.path.join(os.path.dirname(__file__), "fixtures", "webpages", "*.html")))
+
+
+@pytest.fixture
+def make_candidates():
+    """returns a factory of 'count' (name, office, website) candidates, alternately running for the house and the senate"""
+
+    def make_candidates(count):
+        return [(f"Cand{i}", ["house", "senate"][i % 2], f"https://cand{i}.org/") for i in range(count)]
+
+    return make_candidates
+
+
+@pytest.fixture
+def save_pages():
+    """returns a function saving the fixture webpages to a candidate's download folder, with a link of the candidate's own, and returning their paths"""
+
+    def save_pages(folder, name):
+        os.makedirs(folder, exist_ok=True)
+        webpages = []
+        for webpage in WEBPAGES:
+            filepath = os.path.join(folder, os.path.basename(webpage))
+            shutil.copy(webpage, filepath)
+            with open(filepath, "a") as f:
+                f.write(f'<a href="https://{name.lower()}.example.org/donate">Donate</a>')
+            webpages.append(filepath)
+        return webpages
+
+    return save_pages
@@ -0,0 +1,45 @@
+import glob
+import os
+
+import pytest
+
+pytest.importorskip("bs4")
+
+WEBPAGES = sorted(glob.glob(os.path.join(os.path.dirname(__file__), "fixtures", "webpages", "*.html")))
+
+
+@pytest.fixture
+def utils(tmp_path, monkeypatch):
+    # parse_webpage keeps the analysis cache in the working directory
+    monkeypatch.chdir(tmp_path)
+    import utils
+
+    monkeypatch.setattr(utils.config, "ANALYSIS_CACHE", 1)
+    monkeypatch.setattr(utils.config, "ANALYSIS_CACHE_FILE", str(tmp_path / "analysis_cache.sqlite"))
+    return utils
+
+
+def test_unchanged_webpages_are_not_parsed_again(utils, monkeypatch):
+    parsed = {webpage: utils.parse_webpage(webpage) for webpage in WEBPAGES}
+
+    def parse_webpage_document(webpage):
+        raise AssertionError(f"{webpage} parsed again")
+
+    monkeypatch.setattr(utils, "parse_webpage_document", parse_webpage_document)
+    for webpage, page in parsed.items():
+        cached = utils.parse_webpage(webpage)
+        assert cached.backend == "cache"
+        assert cached.get_links() == page.get_links()
+        assert cached.get_links_with_texts() == page.get_links_with_texts()
+        assert cached.get_form_labels() == page.get_form_labels()
+
+
+def test_changed_webpages_are_parsed_again(utils, tmp_path):
+    webpage = tmp_path / "index.html"
+    webpage.write_text('<a href="/about">About</a>')
+    assert utils.parse_webpage(str(webpage)).get_links() == ["/about"]
+
+    webpage.write_text('<a href="/privacy">Privacy</a>')
+    page = utils.parse_webpage(str(webpage))
+    assert page.backend != "cache"
+    assert page.get_links() == ["/privacy"]
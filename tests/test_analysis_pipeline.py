@@ -0,0 +1,181 @@
+import csv
+import functools
+import json
+import multiprocessing
+import os
+
+import pytest
+
+pytest.importorskip("bs4")
+pytest.importorskip("tldextract")
+
+RESULTS = ["PRIVACY_POLICY_RESULTS", "LINK_EXTRACTOR_RESULTS", "FORM_EXTRACTOR_RESULTS"]
+
+
+@pytest.fixture
+def fused_analyzer(tmp_path, monkeypatch):
+    # the downloads and results are in the working directory
+    monkeypatch.chdir(tmp_path)
+    import fused_analyzer
+
+    monkeypatch.setattr(fused_analyzer.config, "RESULTS_FORMAT", "json")
+    monkeypatch.setattr(fused_analyzer.config, "ANALYSIS_CACHE_FILE", str(tmp_path / "analysis_cache.sqlite"))
+    return fused_analyzer
+
+
+def read_results(fused_analyzer):
+    results = []
+    for setting in RESULTS:
+        with open(getattr(fused_analyzer.config, setting)) as f:
+            results.append(
+                {
+                    candidate: {key: sorted(map(json.dumps, value)) if isinstance(value, list) else value for key, value in entry.items()}
+                    for candidate, entry in json.load(f).items()
+                }
+            )
+    return results
+
+
+@pytest.fixture
+def save_download(fused_analyzer, make_candidates, save_pages):
+    """returns a function saving the candidate file and the pages of the candidates, which returns the candidates and their pages"""
+
+    def save_download():
+        candidates = make_candidates(6)
+        os.makedirs("database", exist_ok=True)
+        with open(fused_analyzer.config.CANDIDATE_OFFICE_WEBSITE, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["name", "office", "website"])
+            writer.writerows(candidates)
+
+        # Cand4 was partly downloaded by a previous run, Cand5 has no pages
+        downloads = {
+            (name, office, website): save_pages(os.path.join(fused_analyzer.config.HTML_FOLDER, office, name), name)
+            for name, office, website in candidates[:5]
+        }
+        os.makedirs(os.path.dirname(fused_analyzer.config.DATABASE_FILE), exist_ok=True)
+        with open(fused_analyzer.config.DATABASE_FILE, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["name", "url", "filepath", "depth", "fetcher", "storage"])
+            writer.writerow(["Cand4", "https://cand4.org/", downloads[candidates[4]][0], "0", "http", ""])
+        return candidates, downloads
+
+    return save_download
+
+
+def test_pipelined_analysis_matches_the_analysis_after_the_crawl(fused_analyzer, save_download):
+    candidates, downloads = save_download()
+    names = list(fused_analyzer.ANALYZERS)
+    fused_analyzer.FusedAnalyzer(fused_analyzer.get_analyzers(names)).analyze()
+    expected = read_results(fused_analyzer)
+
+    pipeline = fused_analyzer.AnalysisPipeline(fused_analyzer.get_analyzers(names), workers=2)
+    pipeline.start()
+    # the pages of the candidates are downloaded concurrently
+    for webpages in zip(*downloads.values()):
+        for candidate, webpage in zip(downloads, webpages):
+            pipeline.put_page(candidate, webpage)
+    for candidate in candidates:
+        pipeline.end_candidate(candidate)
+    pipeline.close()
+
+    assert pipeline.finalized == set(candidates[:4])
+    assert read_results(fused_analyzer) == expected
+
+
+def test_failed_candidates_are_analyzed_after_the_crawl(fused_analyzer, save_download, monkeypatch):
+    candidates, downloads = save_download()
+    names = list(fused_analyzer.ANALYZERS)
+    fused_analyzer.FusedAnalyzer(fused_analyzer.get_analyzers(names)).analyze()
+    expected = read_results(fused_analyzer)
+
+    end_candidate = fused_analyzer.form_extractor.FormExtractor.end_candidate
+
+    def failing_end_candidate(self):
+        # only the pipeline worker fails, the analysis from the disk succeeds
+        if multiprocessing.parent_process() is not None and self.candidate == "Cand1":
+            raise ValueError("analysis failed")
+        return end_candidate(self)
+
+    monkeypatch.setattr(fused_analyzer.form_extractor.FormExtractor, "end_candidate", failing_end_candidate)
+    pipeline = fused_analyzer.AnalysisPipeline(fused_analyzer.get_analyzers(names))
+    pipeline.start()
+    for candidate, webpages in downloads.items():
+        for webpage in webpages:
+            pipeline.put_page(candidate, webpage)
+        pipeline.end_candidate(candidate)
+    pipeline.close()
+
+    assert pipeline.finalized == {candidates[0], candidates[2], candidates[3]}
+    assert read_results(fused_analyzer) == expected
+
+
+def test_crawl_goes_on_when_a_worker_died(fused_analyzer, save_download, monkeypatch):
+    candidates, downloads = save_download()
+    names = list(fused_analyzer.ANALYZERS)
+    fused_analyzer.FusedAnalyzer(fused_analyzer.get_analyzers(names)).analyze()
+    expected = read_results(fused_analyzer)
+
+    monkeypatch.setattr(fused_analyzer.config, "PIPELINE_QUEUE_SIZE", 1)
+    pipeline = fused_analyzer.AnalysisPipeline(fused_analyzer.get_analyzers(names))
+    pipeline.start()
+    pipeline.processes[0].terminate()
+    pipeline.processes[0].join()
+    # the pages are dropped instead of waiting on the full queue of the dead worker
+    for candidate, webpages in downloads.items():
+        for webpage in webpages:
+            pipeline.put_page(candidate, webpage)
+        pipeline.end_candidate(candidate)
+    pipeline.close()
+
+    assert pipeline.dead_workers == {0}
+    assert not pipeline.finalized
+    assert read_results(fused_analyzer) == expected
+
+
+def test_sharded_analysis_matches_the_analysis_in_one_process(fused_analyzer, save_download, monkeypatch):
+    candidates, _ = save_download()
+    # every run parses the pages, and every worker gets several chunks of candidates
+    monkeypatch.setattr(fused_analyzer.config, "ANALYSIS_CACHE", 0)
+    monkeypatch.setattr(fused_analyzer.config, "ANALYSIS_CHUNKSIZE", 1)
+    names = list(fused_analyzer.ANALYZERS)
+
+    fused_analyzer.FusedAnalyzer(fused_analyzer.get_analyzers(names), workers=1).analyze()
+    expected = read_results(fused_analyzer)
+    fused_analyzer.FusedAnalyzer(fused_analyzer.get_analyzers(names), workers=2).analyze()
+    results = read_results(fused_analyzer)
+
+    assert results == expected
+    # the results are in the order of the candidate file, whatever worker analyzed them
+    assert [list(result) for result in results] == [[name for name, _, _ in candidates]] * len(RESULTS)
+    assert all(result["Cand0"] for result in results)
+
+
+def test_spawned_workers_get_the_settings_changed_at_runtime(fused_analyzer, save_download, monkeypatch):
+    # the output root of a shard is set at runtime, like --shard does
+    for setting in [*fused_analyzer.utils.OUTPUT_SETTINGS, "OUTPUT_ROOT"]:
+        monkeypatch.setattr(fused_analyzer.config, setting, getattr(fused_analyzer.config, setting))
+    fused_analyzer.utils.set_output_root(os.path.join("shards", "shard-1-of-2"))
+    candidates, downloads = save_download()
+    monkeypatch.setattr(fused_analyzer.config, "ANALYSIS_CHUNKSIZE", 1)
+    names = list(fused_analyzer.ANALYZERS)
+    fused_analyzer.FusedAnalyzer(fused_analyzer.get_analyzers(names)).analyze()
+    expected = read_results(fused_analyzer)
+    assert expected[0]["Cand0"]["privacy_present"]
+
+    # spawned workers import config.py again, as on macOS and Windows
+    spawn = multiprocessing.get_context("spawn")
+    monkeypatch.setattr(fused_analyzer, "ProcessPoolExecutor", functools.partial(fused_analyzer.ProcessPoolExecutor, mp_context=spawn))
+    monkeypatch.setattr(fused_analyzer, "multiprocessing", spawn)
+    fused_analyzer.FusedAnalyzer(fused_analyzer.get_analyzers(names), workers=2).analyze()
+    assert read_results(fused_analyzer) == expected
+
+    pipeline = fused_analyzer.AnalysisPipeline(fused_analyzer.get_analyzers(names), workers=2)
+    pipeline.start()
+    for candidate, webpages in downloads.items():
+        for webpage in webpages:
+            pipeline.put_page(candidate, webpage)
+        pipeline.end_candidate(candidate)
+    pipeline.close()
+    assert pipeline.finalized == set(candidates[:4])
+    assert read_results(fused_analyzer) == expected
@@ -0,0 +1,162 @@
+import csv
+import http.server
+import threading
+
+import pytest
+
+pytest.importorskip("tldextract")
+
+SITE = {
+    "index.html": '<html><head><title>Home</title></head><body><a href="about.html">About</a> <a href="privacy-policy.html">Privacy</a> '
+    '<a href="mailto:info@example.org">Mail</a> <a href="https://elsewhere.example.com/">Elsewhere</a> <a href="private/secret.html">Secret</a></body></html>',
+    "about.html": '<html><body><a href="index.html">Home</a> <a href="deep/one.html">Deeper</a> <a href="missing.html">Missing</a></body></html>',
+    "privacy-policy.html": "<html><body><p>We collect your email address.</p></body></html>",
+    "deep/one.html": '<html><body><a href="two.html">Deepest</a></body></html>',
+    "deep/two.html": "<html><body>Too deep</body></html>",
+    "private/secret.html": "<html><body>Not for crawlers</body></html>",
+    "robots.txt": "User-agent: *\nDisallow: /private/\n",
+}
+
+
+@pytest.fixture
+def site(tmp_path):
+    for path, content in SITE.items():
+        (tmp_path / "site" / path).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / "site" / path).write_text(content)
+    return tmp_path / "site"
+
+
+@pytest.fixture
+def async_downloader(tmp_path, monkeypatch):
+    # the downloads are written to the working directory
+    work = tmp_path / "work"
+    (work / "database").mkdir(parents=True)
+    (work / "logs").mkdir()
+    monkeypatch.chdir(work)
+    import async_downloader
+
+    monkeypatch.setattr(async_downloader.config, "MAX_DEPTH", 1)
+    monkeypatch.setattr(async_downloader.config, "ERROR_FILEPATH", "logs/error.csv")
+    return async_downloader
+
+
+def crawl(async_downloader, website):
+    config = async_downloader.config
+    with open(config.CANDIDATE_OFFICE_WEBSITE, "w", newline="") as f:
+        csv.writer(f).writerows([["name", "office", "website"], ["Cand A", "house", website]])
+    async_downloader.start()
+
+    with open(config.DATABASE_FILE) as f:
+        rows = list(csv.DictReader(f))
+    with open(config.ERROR_FILEPATH) as f:
+        errors = list(csv.DictReader(f))
+    with open(config.CRAWL_MANIFEST) as f:
+        (manifest,) = csv.DictReader(f)
+    return rows, errors, manifest
+
+
+def get_pages(rows, base_url):
+    return {row["url"][len(base_url) :]: int(row["depth"]) for row in rows}
+
+
+def test_local_files_are_crawled_offline(async_downloader, site, monkeypatch):
+    monkeypatch.setattr(async_downloader.config, "PAGE_STORAGE", "files")
+    base_url = site.as_uri() + "/"
+    rows, errors, manifest = crawl(async_downloader, base_url + "index.html")
+
+    # the depth of the pages goes one past MAX_DEPTH, like WebsiteCrawler
+    assert get_pages(rows, base_url) == {
+        "index.html": 0,
+        "about.html": 1,
+        "privacy-policy.html": 1,
+        "private/secret.html": 1,
+        "deep/one.html": 2,
+    }
+    assert {row["fetcher"] for row in rows} == {"file"}
+    for row in rows:
+        assert row["name"] == "CandA" and row["storage"] == ""
+        with open(row["filepath"]) as f:
+            assert f.read() == SITE[row["url"][len(base_url) :]]
+    assert [(error["url"][len(base_url) :], error["depth"]) for error in errors] == [("missing.html", "2")]
+    assert (manifest["status"], manifest["pages"]) == ("done", "5")
+
+    import utils
+
+    assert sorted(utils.CandidateUtils.get_webpages("CandA", "house")) == sorted(row["filepath"] for row in rows)
+
+
+class SiteHandler(http.server.SimpleHTTPRequestHandler):
+    user_agents = []
+
+    def do_GET(self):
+        self.user_agents.append(self.headers["user-agent"])
+        super().do_GET()
+
+    def log_message(self, *args):
+        pass
+
+
+def test_websites_are_crawled_over_http(async_downloader, site, monkeypatch):
+    pytest.importorskip("httpx")
+    monkeypatch.setattr(async_downloader.config, "PAGE_STORAGE", "blobs")
+
+    handler = lambda *args, **kwargs: SiteHandler(*args, directory=str(site), **kwargs)
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        base_url = f"http://127.0.0.1:{server.server_address[1]}/"
+        rows, errors, manifest = crawl(async_downloader, base_url + "index.html")
+    finally:
+        server.shutdown()
+
+    assert get_pages(rows, base_url) == {"index.html": 0, "about.html": 1, "privacy-policy.html": 1, "deep/one.html": 2}
+    assert {row["fetcher"] for row in rows} == {"http"}
+    assert sorted((error["url"][len(base_url) :], error["error_msg"]) for error in errors) == [
+        ("missing.html", "HttpError: Ignoring non-200 response (404)"),
+        ("private/secret.html", "IgnoreRequest: Forbidden by robots.txt"),
+    ]
+    assert (manifest["status"], manifest["pages"]) == ("done", "4")
+    assert set(SiteHandler.user_agents) == {async_downloader.config.HEADERS["user-agent"]}
+
+    import utils
+
+    for row in rows:
+        with utils.open_webpage(row["filepath"]) as f:
+            assert f.read() == SITE[row["url"][len(base_url) :]]
+
+
+class RedirectHandler(SiteHandler):
+    requested = []
+
+    def do_GET(self):
+        self.requested.append(self.path)
+        if self.path == "/":
+            self.send_response(302)
+            self.send_header("Location", "/en/index.html")
+            self.end_headers()
+            return
+        super().do_GET()
+
+
+def test_redirected_pages_are_saved_under_their_final_url(async_downloader, tmp_path, monkeypatch):
+    pytest.importorskip("httpx")
+    monkeypatch.setattr(async_downloader.config, "PAGE_STORAGE", "blobs")
+    site = tmp_path / "redirect"
+    (site / "en").mkdir(parents=True)
+    # the home page links back to the redirect and to itself
+    (site / "en" / "index.html").write_text('<html><body><a href="about.html">About</a> <a href="/">Home</a> <a href="index.html">Home</a></body></html>')
+    (site / "en" / "about.html").write_text("<html><body>About</body></html>")
+
+    handler = lambda *args, **kwargs: RedirectHandler(*args, directory=str(site), **kwargs)
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        base_url = f"http://127.0.0.1:{server.server_address[1]}/"
+        rows, errors, manifest = crawl(async_downloader, base_url)
+    finally:
+        server.shutdown()
+
+    assert get_pages(rows, base_url) == {"en/index.html": 0, "en/about.html": 1}
+    assert errors == []
+    assert (manifest["status"], manifest["pages"]) == ("done", "2")
+    assert RedirectHandler.requested.count("/en/index.html") == 1
@@ -0,0 +1,86 @@
+import hashlib
+import io
+import os
+import zipfile
+
+import pytest
+
+from chromedriver.installer import utils as installer_utils
+
+VERSION = "114.0.5735.90"
+
+
+def make_archive(content=b"#!/bin/sh\necho ChromeDriver 114.0.5735.90\n"):
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w") as zip_file:
+        zip_file.writestr(installer_utils.get_chromedriver_filename(), content)
+    return archive.getvalue()
+
+
+@pytest.fixture
+def cache_dir(tmp_path):
+    return str(tmp_path / "cache")
+
+
+def test_cached_archive_is_read_back(cache_dir):
+    archive = make_archive()
+    installer_utils.write_cached_archive(cache_dir, VERSION, archive)
+
+    assert installer_utils.read_cached_archive(cache_dir, VERSION) == archive
+    assert installer_utils.read_cached_archive(cache_dir, VERSION, hashlib.sha256(archive).hexdigest()) == archive
+    assert installer_utils.find_cached_chromedriver_version(cache_dir, "114.0.5735.199") == VERSION
+    assert installer_utils.read_cached_archive(cache_dir, "115.0.5790.102") is None
+
+
+def test_cached_archive_with_another_checksum_is_ignored(cache_dir):
+    archive = make_archive()
+    installer_utils.write_cached_archive(cache_dir, VERSION, archive)
+
+    assert installer_utils.read_cached_archive(cache_dir, VERSION, hashlib.sha256(b"other").hexdigest()) is None
+    # an archive changed after it was cached
+    with open(installer_utils.get_cached_archive_path(cache_dir, VERSION), "wb") as f:
+        f.write(archive[:-10])
+    assert installer_utils.read_cached_archive(cache_dir, VERSION) is None
+
+
+@pytest.mark.parametrize("checksum", [None, "", "a3f9"], ids=["missing", "empty", "truncated"])
+def test_cached_archive_without_a_valid_checksum_file(cache_dir, checksum, caplog):
+    archive = make_archive()
+    installer_utils.write_cached_archive(cache_dir, VERSION, archive)
+    checksum_path = installer_utils.get_cached_archive_path(cache_dir, VERSION) + ".sha256"
+    if checksum is None:
+        os.remove(checksum_path)
+    else:
+        with open(checksum_path, "w") as f:
+            f.write(checksum)
+
+    assert installer_utils.read_cached_archive(cache_dir, VERSION) is None
+    assert "mismatch" not in caplog.text
+    assert ("no checksum file" if checksum is None else "empty or truncated") in caplog.text
+    # a configured sha256 still verifies an archive without a checksum file
+    expected = archive if checksum is None else None
+    assert installer_utils.read_cached_archive(cache_dir, VERSION, hashlib.sha256(archive).hexdigest()) == expected
+
+
+def test_install_from_the_cache_and_stamp(tmp_path, cache_dir, monkeypatch):
+    def download(version, sha256=None):
+        raise AssertionError("the archive is in the cache")
+
+    monkeypatch.setattr(installer_utils, "download_chromedriver_archive", download)
+    monkeypatch.setattr(installer_utils, "get_chrome_fingerprint", lambda: ["/usr/bin/chrome", 1, 100])
+    installer_utils.write_cached_archive(cache_dir, VERSION, make_archive())
+    path = tmp_path / "driver"
+    path.mkdir()
+
+    chromedriver_filepath = installer_utils.download_chromedriver(str(path), version=VERSION, cache_dir=cache_dir)
+    assert installer_utils.read_stamp(chromedriver_filepath)["version"] == VERSION
+    assert installer_utils.is_installed_chromedriver_current(chromedriver_filepath, VERSION)
+    assert installer_utils.is_installed_chromedriver_current(chromedriver_filepath)
+
+    # the stamp is stale for another pinned version, an updated chrome or a changed binary
+    assert not installer_utils.is_installed_chromedriver_current(chromedriver_filepath, "115.0.5790.102")
+    monkeypatch.setattr(installer_utils, "get_chrome_fingerprint", lambda: ["/usr/bin/chrome", 2, 100])
+    assert not installer_utils.is_installed_chromedriver_current(chromedriver_filepath)
+    with open(chromedriver_filepath, "ab") as f:
+        f.write(b"\n")
+    assert not installer_utils.is_installed_chromedriver_current(chromedriver_filepath, VERSION)
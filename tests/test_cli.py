@@ -0,0 +1,95 @@
+import csv
+import os
+
+import pytest
+
+import cli
+import utils
+
+
+@pytest.fixture
+def candidate_file(tmp_path, monkeypatch):
+    path = tmp_path / "candidate_office_website.csv"
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["name", "office", "state", "website"])
+        for i in range(40):
+            writer.writerow([f"Cand{i}", ["house", "senate"][i % 2], ["TX", "OH", "PA"][i % 3], f"https://cand{i}.org/"])
+    monkeypatch.setattr(utils.config, "CANDIDATE_OFFICE_WEBSITE", str(path))
+    for setting in ("CANDIDATE_NAMES", "CANDIDATE_OFFICES", "CANDIDATE_STATES"):
+        monkeypatch.setattr(utils.config, setting, [])
+    monkeypatch.setattr(utils.config, "CANDIDATE_SHARD", None)
+    return path
+
+
+def test_shards_partition_the_candidates(candidate_file, monkeypatch):
+    everyone = list(utils.CandidateUtils.load_candidates())
+    shards = []
+    for index in range(1, 5):
+        monkeypatch.setattr(utils.config, "CANDIDATE_SHARD", f"{index}/4")
+        shards.append(list(utils.CandidateUtils.load_candidates()))
+
+    assert sorted(sum(shards, [])) == sorted(everyone)
+    assert all(shards)
+
+
+def test_candidate_filters(candidate_file, monkeypatch):
+    monkeypatch.setattr(utils.config, "CANDIDATE_OFFICES", ["Senate"])
+    monkeypatch.setattr(utils.config, "CANDIDATE_STATES", ["tx"])
+    selected = list(utils.CandidateUtils.load_candidates())
+    assert [name for name, _, _ in selected] == [f"Cand{i}" for i in range(40) if i % 2 == 1 and i % 3 == 0]
+    assert all(website.startswith("https://") for _, _, website in selected)
+
+
+def test_shard_option_is_validated():
+    assert cli.get_parser().parse_args(["--shard", "3/16", "-s", "analysis"]).shard == "3/16"
+    for shard in ("0/4", "5/4", "x"):
+        with pytest.raises(SystemExit):
+            cli.get_parser().parse_args(["--shard", shard])
+
+
+@pytest.fixture
+def run_main(tmp_path, monkeypatch):
+    """runs cli.main, returns the config settings and working directory polityzer.main starts with"""
+
+    import polityzer
+
+    monkeypatch.chdir(tmp_path)
+    for setting in [*cli.STAGES.values(), "DOWNLOAD_ENGINE", "CANDIDATE_NAMES", "CANDIDATE_OFFICES", "CANDIDATE_STATES"]:
+        monkeypatch.setattr(cli.config, setting, getattr(cli.config, setting))
+    monkeypatch.setattr(cli.config, "CANDIDATE_SHARD", None)
+    monkeypatch.setattr(cli.config, "OUTPUT_ROOT", None)
+    calls = []
+    monkeypatch.setattr(polityzer, "main", lambda: calls.append((utils.get_config_settings(), os.getcwd())))
+
+    def run_main(*argv):
+        cli.main(list(argv))
+        (call,) = calls
+        calls.clear()
+        return call
+
+    return run_main
+
+
+def test_stages_select_the_config_flags(run_main):
+    settings, _ = run_main("--stage", "analysis")
+    assert [settings[flag] for flag in cli.STAGES.values()] == [0, 1, 1, 1]
+    settings, _ = run_main("-s", "download", "-s", "form_extractor")
+    assert [settings[flag] for flag in cli.STAGES.values()] == [1, 0, 0, 1]
+
+
+def test_options_override_the_config(run_main, tmp_path):
+    (tmp_path / "campaigns").mkdir()
+    settings, cwd = run_main("-C", "campaigns", "--engine", "asyncio", "--office", "senate", "--name", "Cand1", "--name", "Cand3")
+    assert cwd == str(tmp_path / "campaigns")
+    assert settings["DOWNLOAD_ENGINE"] == "asyncio"
+    assert (settings["CANDIDATE_OFFICES"], settings["CANDIDATE_NAMES"]) == (["senate"], ["Cand1", "Cand3"])
+    assert settings["OUTPUT_ROOT"] is None
+
+
+def test_shard_option_sets_the_output_root(run_main):
+    settings, _ = run_main("--shard", "3/16")
+    assert settings["CANDIDATE_SHARD"] == "3/16"
+    assert settings["OUTPUT_ROOT"] == os.path.join(cli.config.SHARDS_FOLDER, "shard-3-of-16")
+    settings, _ = run_main("--shard", "3/16", "-o", "elsewhere")
+    assert settings["OUTPUT_ROOT"] == "elsewhere"
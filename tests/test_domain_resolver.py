@@ -0,0 +1,87 @@
+import random
+import socket
+from urllib.parse import urlparse
+
+import pytest
+
+tldextract = pytest.importorskip("tldextract")
+
+
+@pytest.fixture
+def utils():
+    import utils
+
+    return utils
+
+
+def make_links(count=20000):
+    """hrefs as found on campaign sites: mostly relative or same site, some social media and news outlets"""
+
+    rng = random.Random(0)
+    hosts = ["www.janedoe2020.com", "janedoe2020.com", "secure.actblue.com", "www.facebook.com", "twitter.com"]
+    hosts += [f"news{i}.example.co.uk" for i in range(20)] + [f"shop.candidate{i}.org" for i in range(20)]
+    links = []
+    for i in range(count):
+        if rng.random() < 0.3:
+            links.append(f"/page/{i}")
+        else:
+            links.append(f"https://{rng.choice(hosts)}/path/{i}?ref=nav")
+    return links
+
+
+def legacy_is_same_domain(extractor, source_link, dest_link):
+    """isSameDomain before memoization, with the same offline extractor"""
+
+    if dest_link is None or len(dest_link) == 0:
+        return False
+    source_link = source_link.lower()
+    dest_link = dest_link.lower()
+    dest_domain = urlparse(dest_link).netloc
+    source_domain = urlparse(source_link).netloc
+    if not bool(urlparse(dest_link).netloc):
+        return True
+    if dest_domain == source_domain:
+        return True
+    return extractor(dest_domain).domain == extractor(source_domain).domain
+
+
+def test_is_same_domain_is_offline_and_deterministic(utils, monkeypatch):
+    def no_network(*args, **kwargs):
+        raise AssertionError("network access")
+
+    monkeypatch.setattr(socket.socket, "connect", no_network)
+    monkeypatch.setattr(utils, "_domain_extractor", None)
+    utils.get_root_domain.cache_clear()
+
+    source = "https://www.JaneDoe2020.com/"
+    assert utils.isSameDomain(source, "/about")
+    assert utils.isSameDomain(source, "https://shop.janedoe2020.com/store")
+    assert utils.isSameDomain(source, "http://janedoe2020.org/")
+    assert not utils.isSameDomain(source, "https://www.facebook.com/janedoe")
+    assert not utils.isSameDomain(source, "")
+    assert utils.get_root_domain("news.bbc.co.uk") == "bbc"
+
+
+def test_domain_lookups_are_memoized(utils, monkeypatch):
+    source = "https://www.janedoe2020.com/"
+    links = make_links()
+    extractor = utils.get_domain_extractor()
+    expected = [legacy_is_same_domain(extractor, source, link) for link in links]
+
+    lookups = []
+
+    def counting_extractor(netloc):
+        lookups.append(netloc)
+        return extractor(netloc)
+
+    monkeypatch.setattr(utils, "_domain_extractor", counting_extractor)
+    utils.get_root_domain.cache_clear()
+    utils.get_netloc.cache_clear()
+    assert [utils.isSameDomain(source, link) for link in links] == expected
+    assert [utils.isSameDomain(source, link) for link in links] == expected
+
+    # the public suffix list is looked up once per host, whatever the number of links
+    hosts = {urlparse(link).netloc for link in links} - {"", "www.janedoe2020.com"}
+    assert sorted(lookups) == sorted(hosts | {"www.janedoe2020.com"})
+    assert utils.get_root_domain.cache_info().misses == len(hosts) + 1
+    assert utils.get_netloc.cache_info().misses == 1
@@ -0,0 +1,34 @@
+import pytest
+
+pytest.importorskip("bs4")
+
+
+@pytest.fixture
+def utils():
+    import utils
+
+    return utils
+
+
+KEYWORDS = ["privacy", "terms", "conditions", "notice", "statement", "disclosure", "privacidad", "términos", "aviso", "priv"]
+STRINGS = [
+    "Privacy Policy",
+    "/legal/TERMS-of-use",
+    "Aviso de Privacidad",
+    "Términos y Condiciones",
+    "https://example.org/donate?ref=footer",
+    "Contact us",
+    "",
+    "prIVacidad",
+]
+
+
+def test_keyword_matcher_matches_substring_search(utils):
+    matcher = utils.KeywordMatcher(KEYWORDS)
+    for string in STRINGS:
+        expected = {keyword for keyword in KEYWORDS if keyword in string.lower()}
+        assert matcher.search(string) == bool(expected)
+        # keywords extending a shorter keyword are reported as the shorter one
+        assert {keyword for keyword in matcher.find_all(string)} <= expected
+        assert bool(matcher.find_all(string)) == bool(expected)
+    assert not utils.KeywordMatcher([]).search("privacy")
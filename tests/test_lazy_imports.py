@@ -0,0 +1,41 @@
+import importlib.util
+import os
+import subprocess
+import sys
+
+import pytest
+
+POLITYZER_TOOL = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "polityzer_tool")
+HEAVY_MODULES = {"scrapy", "scrapy_selenium", "selenium", "twisted", "bs4", "lxml", "tldextract", "colorlog"}
+
+
+def imported_modules(cwd, statement):
+    """returns the top level packages in sys.modules after running 'statement' in a fresh interpreter"""
+
+    env = {**os.environ, "PYTHONPATH": POLITYZER_TOOL}
+    result = subprocess.run(
+        [sys.executable, "-c", f"import sys\n{statement}\nprint('\\n'.join(sys.modules))"],
+        cwd=cwd,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return {module.split(".")[0] for module in result.stdout.split()}
+
+
+def test_analysis_only_imports_skip_crawler_dependencies(tmp_path):
+    modules = imported_modules(tmp_path, "import polityzer, fused_analyzer, result_writer")
+
+    assert {"polityzer", "fused_analyzer", "result_writer", "utils", "config"} <= modules
+    assert not HEAVY_MODULES & modules
+    # importing has no side effects such as creating the logs folder
+    assert os.listdir(tmp_path) == []
+
+
+def test_crawler_dependencies_are_imported_by_the_download_stage(tmp_path):
+    if importlib.util.find_spec("scrapy") is None or importlib.util.find_spec("scrapy_selenium") is None:
+        pytest.skip("the crawler dependencies are not installed")
+    modules = imported_modules(tmp_path, "import polityzer\nimport website_downloader")
+
+    assert {"scrapy", "scrapy_selenium", "selenium", "twisted"} <= modules
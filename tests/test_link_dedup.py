@@ -0,0 +1,62 @@
+import random
+
+import pytest
+
+pytest.importorskip("bs4")
+
+
+@pytest.fixture
+def utils():
+    import utils
+
+    return utils
+
+
+def make_footer_heavy_page(path, count=5000):
+    """a page of 'count' anchors, most of them repeated navigation and footer links"""
+
+    rng = random.Random(0)
+    anchors = []
+    for i in range(count):
+        page = rng.randrange(count // 2)
+        anchors.append(f'<a href="/page/{page}" rel="nofollow">Page {page % 50}</a>')
+    path.write_text("<html><body>" + "".join(anchors) + "</body></html>")
+    return str(path)
+
+
+def legacy_get_links(utils, anchors):
+    all_links = []
+    for href, _, _ in anchors:
+        if not href:
+            continue
+        if utils.skipUrl(href):
+            continue
+        if href not in all_links:
+            all_links.append(href)
+    return all_links
+
+
+def legacy_get_links_with_texts(anchors):
+    all_links = []
+    for href, href_text, _ in anchors:
+        if not href:
+            continue
+        to_append = {href_text: href}
+        if to_append not in all_links:
+            all_links.append(to_append)
+    return all_links
+
+
+def test_link_dedup_keeps_the_first_of_each_link_in_order(utils, tmp_path):
+    page = utils.ParsedWebpage(make_footer_heavy_page(tmp_path / "footer_heavy.html"))
+    anchors = page.get_anchors()
+    assert len(anchors) == 5000
+    assert anchors[0].rel == "nofollow"
+
+    links = page.get_links()
+    assert links == legacy_get_links(utils, anchors)
+    assert len(links) == len(set(links)) == len({href for href, _, _ in anchors})
+    links_with_texts = page.get_links_with_texts()
+    assert links_with_texts == legacy_get_links_with_texts(anchors)
+    assert len(links_with_texts) == len({(text, href) for href, text, _ in anchors})
+    assert [link.href for link in page.get_unique_links()] == [href for href, _, _ in dict.fromkeys(anchors)]
@@ -0,0 +1,159 @@
+import csv
+import glob
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+pytest.importorskip("bs4")
+pytest.importorskip("colorlog")
+pytest.importorskip("tldextract")
+
+import utils
+
+POLITYZER_TOOL = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "polityzer_tool")
+SHARDS = 3
+RESULT_FILES = ["privacy_policy_result.json", "link_extractor_result.json", "form_extractor_result.json"]
+
+
+def write_csv(path, header, rows):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerows(rows)
+
+
+def read_csv(path):
+    with open(path) as f:
+        return list(csv.reader(f))
+
+
+def save_shard_pages(save_pages, work, root, name, office, website):
+    """saves the fixture webpages as the candidate's download in the output root of work, returns the database rows of the pages"""
+
+    folder = os.path.join(root, "html", office, name)
+    webpages = save_pages(os.path.join(work, folder), name)
+    return [[name, website + os.path.basename(webpage), os.path.join(folder, os.path.basename(webpage)), "1", "http", ""] for webpage in webpages]
+
+
+@pytest.fixture
+def work(tmp_path, make_candidates, save_pages):
+    """a working folder with a candidate file, the download of every candidate and the same downloads split in shards"""
+
+    candidates = make_candidates(12)
+    write_csv(str(tmp_path / "database" / "candidate_office_website.csv"), ["name", "office", "website"], candidates)
+
+    header = ["name", "url", "filepath", "depth", "fetcher", "storage"]
+    shard_rows = {index: [] for index in range(1, SHARDS + 1)}
+    for name, office, website in candidates:
+        save_shard_pages(save_pages, tmp_path, "", name, office, website)
+        index = utils.get_candidate_shard(name, office, SHARDS)
+        shard_rows[index] += save_shard_pages(save_pages, tmp_path, os.path.join("shards", f"shard-{index}-of-{SHARDS}"), name, office, website)
+    assert all(shard_rows.values())
+
+    for index, rows in shard_rows.items():
+        root = tmp_path / "shards" / f"shard-{index}-of-{SHARDS}"
+        # the same page downloaded twice by a shard and an error logged by every shard
+        write_csv(str(root / "database" / "downloaded_websites.csv"), header, rows + rows[:1])
+        write_csv(
+            str(root / "logs" / "error1.csv"),
+            ["name", "url", "depth", "error_msg"],
+            [["Cand0", "https://cand0.org/x", "1", "timeout"], [rows[0][0], rows[0][1], "1", f"shard {index}"]],
+        )
+    return tmp_path
+
+
+def run(cwd, *args):
+    return subprocess.Popen([sys.executable, *args], cwd=cwd, env={**os.environ, "PYTHONHASHSEED": "0"})
+
+
+def normalize(results):
+    return {
+        candidate: {key: sorted(map(json.dumps, value)) if isinstance(value, list) else value for key, value in entry.items()}
+        for candidate, entry in results.items()
+    }
+
+
+def test_sharded_analysis_merges_to_the_unsharded_results(work):
+    cli = os.path.join(POLITYZER_TOOL, "cli.py")
+    assert run(work, cli, "-s", "analysis").wait() == 0
+    # the shards run as independent processes that only share the working folder
+    shards = [run(work, cli, "-s", "analysis", "--shard", f"{index}/{SHARDS}") for index in range(1, SHARDS + 1)]
+    assert [shard.wait() for shard in shards] == [0] * SHARDS
+    assert run(work, os.path.join(POLITYZER_TOOL, "merge_shards.py"), "-o", "merged").wait() == 0
+
+    for result_file in RESULT_FILES:
+        with open(work / "results" / result_file) as f:
+            unsharded = json.load(f)
+        with open(work / "merged" / "results" / result_file) as f:
+            merged = json.load(f)
+        assert list(merged) == list(unsharded)
+        assert normalize(merged) == normalize(unsharded)
+
+    shard_rows = []
+    for database_file in sorted(glob.glob(str(work / "shards" / "*" / "database" / "downloaded_websites.csv"))):
+        shard_rows += read_csv(database_file)[1:]
+    merged_rows = read_csv(work / "merged" / "database" / "downloaded_websites.csv")[1:]
+    assert len(merged_rows) == len(shard_rows) - SHARDS
+    assert sorted(map(tuple, merged_rows)) == sorted(set(map(tuple, shard_rows)))
+
+    (error_file,) = glob.glob(str(work / "merged" / "logs" / "error*.csv"))
+    errors = read_csv(error_file)[1:]
+    assert errors.count(["Cand0", "https://cand0.org/x", "1", "timeout"]) == 1
+    assert len(errors) == 1 + SHARDS
+
+
+def test_database_files_of_older_versions_are_merged(tmp_path):
+    import merge_shards
+
+    old_root, new_root = tmp_path / "shard-1", tmp_path / "shard-2"
+    # rows appended by the current version under the header of an older one
+    write_csv(
+        str(old_root / "database" / "downloaded_websites.csv"),
+        ["name", "url", "filepath", "depth"],
+        [["CandA", "https://a.org/", "html/house/CandA/a.org", "0"], ["CandA", "https://a.org/x", "html/house/CandA/a.org|x", "1", "http", "pages/ab/ab.gz"]],
+    )
+    write_csv(
+        str(new_root / "database" / "downloaded_websites.csv"),
+        utils.DATABASE_FIELDS,
+        [["CandB", "https://b.org/", "html/senate/CandB/b.org", "0", "selenium", "pages/cd/cd.gz"]],
+    )
+
+    merged = str(tmp_path / "database" / "downloaded_websites.csv")
+    assert merge_shards.merge_database_files([str(old_root), str(new_root)], merged) == 3
+    assert read_csv(merged) == [
+        utils.DATABASE_FIELDS,
+        ["CandA", "https://a.org/", "html/house/CandA/a.org", "0", "", ""],
+        ["CandA", "https://a.org/x", "html/house/CandA/a.org|x", "1", "http", "pages/ab/ab.gz"],
+        ["CandB", "https://b.org/", "html/senate/CandB/b.org", "0", "selenium", "pages/cd/cd.gz"],
+    ]
+
+
+def test_candidates_analyzed_by_several_shards_are_merged(tmp_path, monkeypatch):
+    import merge_shards
+
+    entries = [
+        {"office": "house", "website": "https://a.org", "privacy_links": ["/privacy"], "privacy_present": False},
+        {"office": "house", "website": "https://a.org", "privacy_links": ["/terms", "/privacy"], "privacy_present": True},
+    ]
+    roots = []
+    for index, entry in enumerate(entries):
+        root = tmp_path / f"shard-{index}"
+        (root / "results").mkdir(parents=True)
+        (root / "results" / "privacy_policy_result.json").write_text(json.dumps({"Cand A": entry}))
+        roots.append(str(root))
+
+    monkeypatch.setattr(merge_shards.config, "RESULTS_FORMAT", "json")
+    monkeypatch.setattr(merge_shards.config, "PRIVACY_POLICY_RESULTS", str(tmp_path / "merged.json"))
+    monkeypatch.setattr(merge_shards.config, "CANDIDATE_OFFICE_WEBSITE", str(tmp_path / "missing.csv"))
+    assert merge_shards.merge_result_files(roots, "PRIVACY_POLICY_RESULTS") == 1
+    with open(tmp_path / "merged.json") as f:
+        assert json.load(f)["Cand A"] == {
+            "office": "house",
+            "website": "https://a.org",
+            "privacy_links": ["/privacy", "/terms"],
+            "privacy_present": True,
+        }
@@ -0,0 +1,143 @@
+import csv
+import gzip
+import os
+
+import pytest
+
+import page_store
+import utils
+
+# CRLF line endings and non-ASCII text, so that a copy that is not byte exact shows
+BODY = "<html>\r\n<body><a href='/privacy'>Política de privacidad</a></body>\r\n</html>\r\n".encode("utf-8")
+
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    monkeypatch.setattr(utils.config, "DATABASE_FILE", str(tmp_path / "database" / "downloaded_websites.csv"))
+    monkeypatch.setattr(utils.config, "PAGE_STORE_FOLDER", str(tmp_path / "page_store"))
+    os.makedirs(tmp_path / "database")
+    return tmp_path
+
+
+def save_pages(store, webpages, body):
+    """saves body once for every webpage path like the crawler does and returns the storage of every page"""
+
+    writer = utils.get_database_file()
+    storages = []
+    for webpage in webpages:
+        storage = store.save(body, url="https://cand.org/", status=200, headers=[], metadata={"name": "CandA"})
+        writer.writerow(["CandA", "https://cand.org/", webpage, 0, "http", storage])
+        storages.append(storage)
+    return storages
+
+
+@pytest.mark.parametrize("compression", ["gzip", "zstd"])
+def test_blobs_round_trip(database, compression):
+    if compression == "zstd":
+        pytest.importorskip("zstandard")
+    store = page_store.PageStore(compression=compression)
+    webpages = [os.path.join("html", "house", "CandA", f"cand.org|page{i}") for i in range(2)]
+    storages = save_pages(store, webpages, BODY)
+
+    # the same page saved twice is stored once
+    assert storages[0] == storages[1]
+    blobs = [os.path.join(root, name) for root, _, names in os.walk(store.folder) for name in names]
+    assert blobs == [storages[0]]
+
+    for webpage in webpages:
+        assert utils.get_webpage_storage(webpage) == storages[0]
+        with utils.open_webpage(webpage) as f:
+            assert f.read() == BODY.decode("utf-8").replace("\r\n", "\n")
+    assert page_store.read_blob(storages[0]) == BODY
+
+    copies = database / "copies"
+    copies.mkdir()
+    utils.copy_webpage(webpages[0], str(copies))
+    assert (copies / os.path.basename(webpages[0])).read_bytes() == BODY
+
+
+def test_pages_saved_as_files_are_not_in_the_index(database):
+    webpage = database / "page.html"
+    webpage.write_bytes(BODY)
+    with open(utils.config.DATABASE_FILE, "w", newline="") as f:
+        csv.writer(f).writerows([["name", "url", "filepath", "depth", "fetcher", "storage"], ["CandA", "https://cand.org/", str(webpage), 0, "http", ""]])
+
+    assert utils.get_webpage_storage(str(webpage)) is None
+    copies = database / "copies"
+    copies.mkdir()
+    utils.copy_webpage(str(webpage), str(copies))
+    assert (copies / "page.html").read_bytes() == BODY
+
+
+def test_warc_records_round_trip(database):
+    store = page_store.WarcStore(folder=str(database / "warc"), max_size=1)
+    headers = [("Content-Type", "text/html; charset=utf-8"), ("Content-Encoding", "gzip"), ("Set-Cookie", "a=1")]
+    pages = {f"https://cand.org/page{i}": BODY + str(i).encode() for i in range(3)}
+    locations = {
+        url: store.save(body, url=url, status=200, headers=headers, metadata={"name": "CandA", "depth": 1}) for url, body in pages.items()
+    }
+    store.close()
+
+    # every record goes to a new file once the first one is over max_size
+    assert len({location.rpartition("#")[0] for location in locations.values()}) == 3
+    for url, location in locations.items():
+        warc_headers, http_headers, body = page_store.read_warc_location(location)
+        assert body == pages[url] == page_store.read_blob(location)
+        assert warc_headers["WARC-Type"] == "response"
+        assert warc_headers["WARC-Target-URI"] == url
+        assert (warc_headers["Polityzer-Name"], warc_headers["Polityzer-Depth"]) == ("CandA", "1")
+        # the body is saved decoded, its transfer headers are replaced
+        assert http_headers == {"Content-Type": "text/html; charset=utf-8", "Set-Cookie": "a=1", "Content-Length": str(len(body))}
+
+    # a whole file reads as a warcinfo record followed by the response
+    with gzip.open(locations["https://cand.org/page1"].rpartition("#")[0], "rb") as stream:
+        records = list(iter(lambda: page_store.read_warc_record(stream), None))
+    assert [record[0]["WARC-Type"] for record in records] == ["warcinfo", "response"]
+    assert records[1][2] == pages["https://cand.org/page1"]
+
+
+def test_warc_records_are_appended_to_one_file(database):
+    store = page_store.WarcStore(folder=str(database / "warc"))
+    locations = [store.save(BODY, url="https://cand.org/", headers=[]) for _ in range(2)]
+    store.close()
+
+    assert locations[0].rpartition("#")[0] == locations[1].rpartition("#")[0]
+    assert locations[0] != locations[1]
+    writer = utils.get_database_file()
+    writer.writerow(["CandA", "https://cand.org/", "html/house/CandA/cand.org", 0, "http", locations[1]])
+    with utils.open_webpage("html/house/CandA/cand.org") as f:
+        assert f.read() == BODY.decode("utf-8").replace("\r\n", "\n")
+
+
+def test_database_file_of_an_older_version_is_upgraded(database):
+    old_webpage = database / "page.html"
+    old_webpage.write_bytes(BODY)
+    with open(utils.config.DATABASE_FILE, "w", newline="") as f:
+        csv.writer(f).writerows([["name", "url", "filepath", "depth"], ["CandA", "https://cand.org/", str(old_webpage), 0]])
+
+    # the crawl after the upgrade saves its pages in the page store
+    webpage = os.path.join("html", "house", "CandA", "cand.org|new")
+    [storage] = save_pages(page_store.PageStore(), [webpage], BODY)
+
+    with open(utils.config.DATABASE_FILE) as f:
+        assert list(csv.reader(f)) == [
+            utils.DATABASE_FIELDS,
+            ["CandA", "https://cand.org/", str(old_webpage), "0", "", ""],
+            ["CandA", "https://cand.org/", webpage, "0", "http", storage],
+        ]
+    assert utils.get_webpage_storage(webpage) == storage
+    assert utils.get_webpage_storage(str(old_webpage)) is None
+
+
+def test_rows_appended_under_an_older_header_are_read(database):
+    with open(utils.config.DATABASE_FILE, "w", newline="") as f:
+        csv.writer(f).writerows(
+            [
+                ["name", "url", "filepath", "depth"],
+                ["CandA", "https://cand.org/", "html/house/CandA/old", 0],
+                ["CandA", "https://cand.org/new", "html/house/CandA/new", 1, "http", "pages/ab/abcd.gz"],
+            ]
+        )
+
+    assert [row["storage"] for row in utils.read_database_file(utils.config.DATABASE_FILE)] == ["", "pages/ab/abcd.gz"]
+    assert utils.get_webpage_storage("html/house/CandA/new") == "pages/ab/abcd.gz"
@@ -0,0 +1,57 @@
+import glob
+import os
+
+import pytest
+
+pytest.importorskip("bs4")
+pytest.importorskip("lxml")
+
+WEBPAGES = sorted(glob.glob(os.path.join(os.path.dirname(__file__), "fixtures", "webpages", "*.html")))
+
+
+@pytest.fixture
+def utils(tmp_path, monkeypatch):
+    # parse_webpage keeps the analysis cache in the working directory
+    monkeypatch.chdir(tmp_path)
+    import utils
+
+    return utils
+
+
+@pytest.mark.parametrize("webpage", WEBPAGES, ids=os.path.basename)
+def test_lxml_backend_matches_html_parser(utils, webpage):
+    slow = utils.ParsedWebpage(webpage)
+    fast = utils.LxmlWebpage(webpage)
+
+    assert fast.document is not None
+    assert set(fast.get_links()) == set(slow.get_links())
+    assert {tuple(link.items())[0] for link in fast.get_links_with_texts()} == {
+        tuple(link.items())[0] for link in slow.get_links_with_texts()
+    }
+    assert fast.get_form_labels() == slow.get_form_labels()
+
+
+def test_lxml_text_matches_get_text(utils):
+    from bs4 import BeautifulSoup
+
+    html = (
+        "<html><body><form><input><label>ZIP\n  <input>\n  </label>"
+        "<label> Name <!-- hidden --> <b>first</b>\t<script>var a;</script> <pre>  x\n  </pre></label></form></body></html>"
+    )
+    slow = [label.get_text() for label in BeautifulSoup(html, "html.parser").find_all("label")]
+    fast = [utils.get_lxml_text(label) for label in utils.get_lxml_html().document_fromstring(html).iter("label")]
+    assert fast == slow == ["ZIP\n  \n", " Name  first    x\n  "]
+
+
+def test_lxml_backend_falls_back_to_html_parser(utils, tmp_path, monkeypatch):
+    monkeypatch.setattr(utils.config, "HTML_PARSER_BACKEND", "lxml")
+    malformed = tmp_path / "malformed.html"
+    malformed.write_text('<a href="/before">before</a>\x00<a href="/after">after</a>')
+    empty = tmp_path / "empty.html"
+    empty.write_text("")
+
+    page = utils.parse_webpage(str(malformed))
+    assert page.backend == "html.parser"
+    assert "/after" in page.get_links()
+    assert utils.parse_webpage(str(empty)).get_links() == []
+    assert utils.parse_webpage(WEBPAGES[0]).backend == "lxml"
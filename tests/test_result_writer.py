@@ -0,0 +1,64 @@
+import json
+import os
+
+import pytest
+
+import result_writer
+
+
+def test_jsonl_results_convert_to_legacy_json(tmp_path, monkeypatch):
+    entries = [
+        ("Cand A", {"office": "house", "website": "https://a.org", "form_fields": ["Email"]}),
+        ("Cand B", {"office": "senate", "website": "https://b.org", "form_fields": []}),
+    ]
+    json_file = str(tmp_path / "results" / "form_extractor_result.json")
+
+    monkeypatch.setattr(result_writer.config, "RESULTS_FORMAT", "json")
+    with result_writer.get_result_writer(json_file) as writer:
+        for candidate, entry in entries:
+            writer.write(candidate, entry)
+    with open(json_file) as f:
+        legacy = f.read()
+
+    monkeypatch.setattr(result_writer.config, "RESULTS_FORMAT", "jsonl")
+    jsonl_file = result_writer.get_results_path(json_file)
+    with result_writer.get_result_writer(json_file) as writer:
+        for candidate, entry in entries:
+            writer.write(candidate, entry)
+            # every candidate is readable as soon as it is written
+            assert json.loads(open(jsonl_file).readlines()[-1]) == {candidate: entry}
+
+    converted = str(tmp_path / "converted.json")
+    result_writer.jsonl_to_json(jsonl_file, converted)
+    with open(converted) as f:
+        assert f.read() == legacy
+
+
+def test_failed_analysis_keeps_the_previous_json_results(tmp_path, monkeypatch):
+    json_file = str(tmp_path / "results" / "form_extractor_result.json")
+    monkeypatch.setattr(result_writer.config, "RESULTS_FORMAT", "json")
+    with result_writer.get_result_writer(json_file) as writer:
+        writer.write("Cand A", {"office": "house", "form_fields": ["Email"]})
+        writer.write("Cand B", {"office": "senate", "form_fields": []})
+    with open(json_file) as f:
+        complete = f.read()
+
+    with pytest.raises(RuntimeError):
+        with result_writer.get_result_writer(json_file) as writer:
+            writer.write("Cand A", {"office": "house", "form_fields": []})
+            raise RuntimeError("analysis failed")
+    with open(json_file) as f:
+        assert f.read() == complete
+    assert os.listdir(tmp_path / "results") == ["form_extractor_result.json"]
+
+
+def test_failed_analysis_keeps_the_jsonl_results_written_so_far(tmp_path, monkeypatch):
+    json_file = str(tmp_path / "results" / "form_extractor_result.json")
+    monkeypatch.setattr(result_writer.config, "RESULTS_FORMAT", "jsonl")
+    with pytest.raises(RuntimeError):
+        with result_writer.get_result_writer(json_file) as writer:
+            writer.write("Cand A", {"office": "house", "form_fields": []})
+            raise RuntimeError("analysis failed")
+
+    assert writer.file.closed
+    assert list(result_writer.iter_results(json_file)) == [("Cand A", {"office": "house", "form_fields": []})]
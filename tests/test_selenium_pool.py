@@ -0,0 +1,135 @@
+import queue
+import re
+import threading
+
+import pytest
+
+pytest.importorskip("scrapy_selenium")
+
+import config
+import selenium_pool
+from scrapy_selenium import SeleniumRequest
+from selenium.common.exceptions import WebDriverException
+
+
+class StubDriver:
+    """stands in for a headless Chrome, rendering a page per url"""
+
+    def __init__(self, barrier=None) -> None:
+        self.barrier = barrier
+        self.urls = []
+        self.quits = 0
+        self.current_url = None
+        self.page_source = None
+
+    def get(self, url):
+        if url.endswith("/crash"):
+            raise WebDriverException("chrome not reachable")
+        self.urls.append(url)
+        self.current_url = url
+        self.page_source = f"<html><body>{url}</body></html>"
+        # the renders only go through together, if the pool renders them concurrently
+        if self.barrier:
+            self.barrier.wait()
+
+    def quit(self):
+        self.quits += 1
+
+
+class StubPoolMiddleware(selenium_pool.SeleniumPoolMiddleware):
+    def __init__(self, tmp_path, pool_size, max_pages=0, barrier=None) -> None:
+        self.barrier = barrier
+        self.created = []
+        super().__init__("chromedriver", ["--headless"], pool_size, max_pages, 20, str(tmp_path / "attachments"))
+
+    def create_driver(self):
+        driver = StubDriver(self.barrier)
+        self.created.append(driver)
+        return selenium_pool.PooledDriver(driver)
+
+
+@pytest.fixture
+def pools():
+    created = []
+    yield created
+    for pool in created:
+        pool.threadpool.stop()
+
+
+def test_drivers_are_reused_and_recycled(tmp_path, pools):
+    pool = StubPoolMiddleware(tmp_path, pool_size=2, max_pages=3)
+    pools.append(pool)
+    for i in range(6):
+        response = pool.render(SeleniumRequest(url=f"https://cand-a.org/{i}"))
+        assert response.url == f"https://cand-a.org/{i}"
+        assert response.text == f"<html><body>https://cand-a.org/{i}</body></html>"
+
+    first, second, *fresh = pool.created
+    # the two warm drivers take turns until each rendered max_pages, then they are replaced
+    assert first.urls == [f"https://cand-a.org/{i}" for i in (0, 2, 4)]
+    assert second.urls == [f"https://cand-a.org/{i}" for i in (1, 3, 5)]
+    assert (first.quits, second.quits) == (1, 1)
+    assert len(fresh) == 2 and not any(driver.urls for driver in fresh)
+
+
+def test_crashed_drivers_are_replaced(tmp_path, pools):
+    pool = StubPoolMiddleware(tmp_path, pool_size=1)
+    pools.append(pool)
+    with pytest.raises(WebDriverException):
+        pool.render(SeleniumRequest(url="https://cand-a.org/crash"))
+    pool.render(SeleniumRequest(url="https://cand-a.org/"))
+
+    crashed, fresh = pool.created
+    assert crashed.quits == 1
+    assert fresh.urls == ["https://cand-a.org/"]
+
+
+def test_pool_renders_concurrently_and_quits_every_driver_on_close(tmp_path):
+    pool_size = 4
+    pool = StubPoolMiddleware(tmp_path, pool_size=pool_size, barrier=threading.Barrier(pool_size, timeout=10))
+    results = queue.Queue()
+    for i in range(pool_size):
+        request = SeleniumRequest(url=f"https://cand-a.org/{i}")
+        pool.threadpool.callInThreadWithCallback(lambda success, result: results.put((success, result)), pool.render, request)
+    rendered = [results.get(timeout=20) for _ in range(pool_size)]
+
+    assert all(success for success, _ in rendered), rendered
+    assert sorted(response.url for _, response in rendered) == [f"https://cand-a.org/{i}" for i in range(pool_size)]
+    # every driver of the pool rendered one of the pages at the same time
+    assert sorted(len(driver.urls) for driver in pool.created) == [1] * pool_size
+
+    pool.spider_closed()
+    assert [driver.quits for driver in pool.created] == [1] * pool_size
+    assert not pool.threadpool.started
+
+
+def is_blocked(blocked_urls, url):
+    """matches a url against chrome's blocked url patterns, where '*' is the only wildcard and matches the whole url"""
+
+    return any(re.fullmatch(".*".join(map(re.escape, pattern.split("*"))), url) for pattern in blocked_urls)
+
+
+def test_blocked_urls_only_match_subresources():
+    blocked_urls = selenium_pool.get_blocked_urls(config.SELENIUM_BLOCKED_EXTENSIONS, config.SELENIUM_BLOCKED_HOSTS)
+
+    for url in [
+        "https://cand-a.org/wp-content/logo.png",
+        "https://cand-a.org/video/ad.mp4",
+        "https://cdn.cand-a.org/fonts/inter.woff2?v=3",
+        "https://cand-a.org/favicon.ico",
+        "https://www.google-analytics.com/analytics.js",
+        "https://googletagmanager.com/gtm.js?id=GTM-1",
+    ]:
+        assert is_blocked(blocked_urls, url), url
+    # the pages, and the documents they link to, are always loaded
+    for url in [
+        "https://www.icontest.org/",
+        "https://svgforcongress.com/about",
+        "https://cand-a.org/blog/why-.png-files-matter/",
+        "https://cand-a.org/issues?format=mp4",
+        "https://cand-a.org/privacy-policy.pdf",
+        "https://cand-a.org/contact.html",
+        "https://youtube-fans-for-cand-a.org/",
+    ]:
+        assert not is_blocked(blocked_urls, url), url
+    assert not any(extension in {".pdf", ".doc", ".docx", ".html", ".htm"} for extension in config.SELENIUM_BLOCKED_EXTENSIONS)
@@ -0,0 +1,351 @@
+import csv
+import os
+import time
+
+import pytest
+
+pytest.importorskip("scrapy")
+pytest.importorskip("scrapy_selenium")
+pytest.importorskip("tldextract")
+
+from scrapy.http import HtmlResponse, Response, TextResponse
+from scrapy.utils.test import get_crawler
+
+SITEMAPS = os.path.join(os.path.dirname(__file__), "fixtures", "sitemaps")
+CANDIDATE = ("Cand A", "house", "https://cand-a.org/")
+
+
+@pytest.fixture
+def website_downloader(tmp_path, monkeypatch):
+    # the database, logs and pages are written to the working directory
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "logs").mkdir()
+    import website_downloader
+
+    monkeypatch.setattr(website_downloader.config, "PAGE_STORAGE", "files")
+    return website_downloader
+
+
+@pytest.fixture
+def spider(website_downloader):
+    return get_crawler(website_downloader.WebsiteCrawler)._create_spider()
+
+
+def get_meta(candidate=CANDIDATE, url=None, depth=0):
+    name, office, website = candidate
+    return {"name": name, "office": office, "website": website, "url": url or website, "depth": depth}
+
+
+def write_manifest(config, rows):
+    with open(config.CRAWL_MANIFEST, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["name", "office", "website", "status", "pages", "timestamp"])
+        writer.writerows(rows)
+
+
+def test_pending_candidates(website_downloader, monkeypatch):
+    utils = website_downloader.utils
+    config = website_downloader.config
+    now = int(time.time())
+    done, failed, stale, retried, missing = [(f"Cand {i}", "house", f"https://cand{i}.org/") for i in range(5)]
+    os.makedirs(config.DATABASE_FOLDER)
+    write_manifest(
+        config,
+        [
+            [*done, "done", 12, now - 60],
+            [*failed, "failed", 0, now - 60],
+            [*stale, "done", 12, now - 30 * 24 * 60 * 60],
+            # the latest entry of a candidate counts
+            [*retried, "failed", 0, now - 120],
+            [*retried, "done", 3, now - 60],
+        ],
+    )
+    candidates = {done, failed, stale, retried, missing, ("Cand 5", "house", "")}
+
+    assert utils.get_pending_candidates(candidates) == {failed, missing}
+    monkeypatch.setattr(config, "RECRAWL_AFTER_DAYS", 7)
+    assert utils.get_pending_candidates(candidates) == {failed, stale, missing}
+
+
+def test_crawl_completion_is_recorded_once_no_request_is_left(spider, website_downloader):
+    config = website_downloader.config
+    other = ("Cand B", "senate", "https://cand-b.org/")
+    for candidate in (CANDIDATE, CANDIDATE, other):
+        spider.trackRequest(get_meta(candidate), 1)
+    spider.state["pages"] = {website_downloader.candidateKey(get_meta()): 2}
+    spider.trackRequest(get_meta(), -1)
+    spider.trackRequest(get_meta(other), -1)
+    spider.trackRequest(get_meta(), -1)
+
+    with open(config.CRAWL_MANIFEST) as f:
+        rows = [(row["name"], row["status"], row["pages"]) for row in csv.DictReader(f)]
+    assert rows == [("Cand B", "failed", "0"), ("Cand A", "done", "2")]
+    assert spider.state["outstanding"] == {}
+    assert website_downloader.utils.get_pending_candidates({CANDIDATE, other}) == {other}
+
+
+def test_canonical_urls(website_downloader):
+    canonicalize_url = website_downloader.utils.canonicalize_url
+
+    assert canonicalize_url("HTTPS://Cand-A.ORG:443/About/?utm_source=x&b=2&A=1#team") == "https://cand-a.org/About?A=1&b=2"
+    assert canonicalize_url("https://user:PW@Cand-A.org/") == "https://user:PW@cand-a.org/"
+    # paths and queries are case sensitive
+    assert canonicalize_url("https://cand-a.org/Donate") != canonicalize_url("https://cand-a.org/donate")
+    assert canonicalize_url("https://cand-a.org/?id=A") != canonicalize_url("https://cand-a.org/?id=a")
+
+
+def test_frontier_is_deduplicated_per_candidate(spider):
+    meta = get_meta()
+    assert spider.enqueueOnce(meta, "https://cand-a.org/Issues")
+    for duplicate in ["https://CAND-A.org/Issues/", "https://cand-a.org/Issues#economy", "https://cand-a.org:443/Issues?fbclid=1"]:
+        assert not spider.enqueueOnce(meta, duplicate)
+    assert spider.enqueueOnce(meta, "https://cand-a.org/issues")
+    assert spider.enqueueOnce(meta, "https://cand-a.org/Issues?page=2")
+    # another candidate linking to the same page downloads it too
+    assert spider.enqueueOnce(get_meta(("Cand B", "senate", "https://cand-b.org/")), "https://cand-a.org/Issues")
+    assert spider.crawler.stats.get_value("polityzer/frontier/duplicate") == 3
+
+
+def get_output(website_downloader, spider, callback, response):
+    """returns the requests a spider callback yields for a response, with the depth set by the spider middleware"""
+
+    middleware = website_downloader.CandidateDepthMiddleware.from_crawler(spider.crawler)
+    return list(middleware.process_spider_output(response, callback(response), spider))
+
+
+def get_fixture_response(request, filename):
+    with open(os.path.join(SITEMAPS, filename), "rb") as f:
+        return TextResponse(request.url, body=f.read(), encoding="utf-8", request=request)
+
+
+def test_crawl_is_seeded_from_robots_and_sitemaps(spider, website_downloader, monkeypatch):
+    config = website_downloader.config
+    monkeypatch.setattr(config, "SITEMAP_SEEDING", 1)
+    monkeypatch.setattr(config, "SITEMAP_MAX_URLS", 4)
+    with open(config.CANDIDATE_OFFICE_WEBSITE, "w", newline="") as f:
+        csv.writer(f).writerows([["name", "office", "website"], CANDIDATE])
+
+    home, robots = spider.start_requests()
+    assert (home.url, home.meta["depth"]) == (CANDIDATE[2], 0)
+    assert (robots.url, robots.callback) == ("https://cand-a.org/robots.txt", spider.parseRobots)
+
+    # the sitemaps of other sites are not followed
+    (index,) = get_output(website_downloader, spider, spider.parseRobots, get_fixture_response(robots, "robots.txt"))
+    assert (index.url, index.meta["depth"], index.callback) == ("https://cand-a.org/sitemap_index.xml", 0, spider.parseSitemap)
+    nested = get_output(website_downloader, spider, spider.parseSitemap, get_fixture_response(index, "sitemap_index.xml"))
+    assert [(request.url, request.meta["depth"]) for request in nested] == [
+        ("https://cand-a.org/page-sitemap.xml", 0),
+        ("https://cand-a.org/post-sitemap.xml", 0),
+    ]
+
+    # the pages count as links of the home page, the home page itself is already downloading
+    pages = get_output(website_downloader, spider, spider.parseSitemap, get_fixture_response(nested[0], "page-sitemap.xml"))
+    assert [(request.url, request.meta["depth"], request.callback) for request in pages] == [
+        (url, 1, spider.crawlCampaignSite)
+        for url in ["https://cand-a.org/about/", "https://cand-a.org/privacy-policy/", "https://cand-a.org/About/#team", "https://www.cand-a.org/issues/"]
+    ]
+    assert spider.crawler.stats.get_value("polityzer/sitemap/urls") == 4
+    # a missing sitemap, served as a page
+    assert get_output(website_downloader, spider, spider.parseSitemap, HtmlResponse(nested[1].url, body=b"<html></html>", request=nested[1])) == []
+
+
+def test_robots_without_sitemaps_fall_back_to_sitemap_xml(spider, website_downloader):
+    robots = spider.buildSitemapRequest("https://cand-a.org/robots.txt", get_meta(), spider.parseRobots)
+    response = TextResponse(robots.url, body=b"User-agent: *\nDisallow:\n", encoding="utf-8", request=robots)
+
+    (sitemap,) = get_output(website_downloader, spider, spider.parseRobots, response)
+    assert (sitemap.url, sitemap.meta["depth"]) == ("https://cand-a.org/sitemap.xml", 0)
+
+
+def test_rendered_pages_keep_the_depth_of_their_link(spider, website_downloader):
+    meta = get_meta(url="https://cand-a.org/app/", depth=2)
+    request = spider.buildRequest(meta["url"], meta)
+    assert request.meta["fetcher"] == "http"
+    response = HtmlResponse(request.url, body=b'<html><body><div id="root"></div></body></html>', request=request)
+
+    (rendered,) = get_output(website_downloader, spider, spider.crawlCampaignSite, response)
+    assert (rendered.meta["fetcher"], rendered.meta["depth"]) == ("selenium", 2)
+    assert response.meta["depth"] == 2
+    # requests without a depth are links of the response
+    (link,) = get_output(website_downloader, spider, lambda response: [website_downloader.scrapy.Request("https://cand-a.org/x")], response)
+    assert link.meta["depth"] == 3
+
+
+def test_focused_crawl_downloads_policy_links_first(spider, website_downloader, monkeypatch):
+    monkeypatch.setattr(website_downloader.config, "FOCUSED_CRAWL", 1)
+    linkFocusScore = website_downloader.linkFocusScore
+    # distinct keywords of the url and text
+    assert linkFocusScore("https://cand-a.org/privacy-notice/", "Privacy Statement") == 3
+    assert linkFocusScore("https://cand-a.org/tos/", "Terms") == 1
+    assert linkFocusScore("https://cand-a.org/donate/", "Donate") == 0
+
+    home = spider.buildRequest(CANDIDATE[2], get_meta())
+    body = b'<html><body><a href="/donate/">Donate</a> <a href="/tos/">Terms</a> <a href="/privacy-notice/">Our <b>Privacy</b> Statement</a></body></html>'
+    links = get_output(website_downloader, spider, spider.crawlCampaignSite, HtmlResponse(home.url, body=body, request=home))
+    assert [(request.url, request.meta["policy_link"]) for request in sorted(links, key=lambda request: -request.priority)] == [
+        ("https://cand-a.org/privacy-notice/", True),
+        ("https://cand-a.org/tos/", False),
+        ("https://cand-a.org/donate/", False),
+    ]
+
+    # the candidate is stopped once its privacy policy is downloaded, its queued requests are dropped
+    policy = next(request for request in links if request.meta["policy_link"])
+    body = b'<html><body><a href="/contact/">Contact</a></body></html>'
+    assert get_output(website_downloader, spider, spider.crawlCampaignSite, HtmlResponse(policy.url, body=body, request=policy)) == []
+    assert spider.isStopped(policy.meta)
+    middleware = website_downloader.CandidateBudgetMiddleware()
+    with pytest.raises(website_downloader.IgnoreRequest):
+        middleware.process_request(links[0], spider)
+    other = spider.buildRequest("https://cand-b.org/", get_meta(("Cand B", "senate", "https://cand-b.org/")))
+    assert middleware.process_request(other, spider) is None
+
+
+def test_focused_crawl_page_budget(spider, website_downloader, monkeypatch):
+    monkeypatch.setattr(website_downloader.config, "FOCUSED_PAGE_BUDGET", 3)
+    spider.checkFocusedBudget(get_meta(), 2)
+    assert not spider.isStopped(get_meta())
+    spider.checkFocusedBudget(get_meta(), 3)
+    assert spider.isStopped(get_meta())
+
+
+class Rows(list):
+    """stands in for the csv writers of the spider"""
+
+    writerow = list.append
+
+
+def test_candidate_page_budget_stops_the_crawl(spider, website_downloader, monkeypatch):
+    monkeypatch.setattr(website_downloader.config, "CANDIDATE_MAX_PAGES", 2)
+    spider.error_file = Rows()
+    body = b'<html><body><a href="/a/">A</a> <a href="/b/">B</a></body></html>'
+    home = spider.buildRequest(CANDIDATE[2], get_meta())
+    first, second = get_output(website_downloader, spider, spider.crawlCampaignSite, HtmlResponse(home.url, body=body, request=home))
+
+    # the page reaching the budget is saved, its links are not followed and pages already downloading are dropped
+    assert get_output(website_downloader, spider, spider.crawlCampaignSite, HtmlResponse(first.url, body=body, request=first)) == []
+    assert spider.isStopped(get_meta())
+    assert get_output(website_downloader, spider, spider.crawlCampaignSite, HtmlResponse(second.url, body=body, request=second)) == []
+    assert spider.error_file == [["Cand A", first.url, 1, "Download stopped: page budget of 2 pages reached"]]
+    with open(website_downloader.config.CRAWL_MANIFEST) as f:
+        (manifest,) = csv.DictReader(f)
+    assert (manifest["status"], manifest["pages"]) == ("done", "2")
+
+
+@pytest.mark.parametrize(
+    "setting, pages, size, reason",
+    [
+        ("CANDIDATE_MAX_BYTES", 1, 5000, "byte budget of 4096 bytes reached"),
+        ("CANDIDATE_MAX_SECONDS", 1, 10, "time budget of 4096 seconds reached"),
+    ],
+)
+def test_candidate_byte_and_time_budgets(spider, website_downloader, monkeypatch, setting, pages, size, reason):
+    monkeypatch.setattr(website_downloader.config, setting, 4096)
+    spider.error_file = Rows()
+    meta = get_meta()
+    spider.trackRequest(meta, 1)
+
+    spider.checkCandidateBudget(meta, pages, 100)
+    assert not spider.isStopped(meta)
+    # the download started before the time budget
+    spider.state["started"][website_downloader.candidateKey(meta)] -= 5000
+    spider.checkCandidateBudget(meta, pages, size)
+    spider.checkCandidateBudget(meta, pages, size)
+    assert spider.isStopped(meta)
+    assert spider.error_file == [["Cand A", CANDIDATE[2], 0, f"Download stopped: {reason}"]]
+
+
+@pytest.mark.parametrize(
+    "status, body, expected",
+    [
+        (200, b'<html><body><a href="/about/">About</a></body></html>', False),
+        (200, b"<html><body><p>Loading...</p></body></html>", True),
+        (200, b'<html><body><div id="root"></div><a href="/about/">About</a></body></html>', True),
+        (200, b"  \n", True),
+        (403, b'<html><body><a href="/about/">About</a></body></html>', True),
+    ],
+    ids=["links", "no links", "app shell", "empty", "blocked"],
+)
+def test_pages_needing_rendering(website_downloader, status, body, expected):
+    response = HtmlResponse("https://cand-a.org/", status=status, body=body)
+    assert website_downloader.needsRendering(response) == expected
+
+
+def test_attachments_are_never_rendered(website_downloader):
+    assert not website_downloader.needsRendering(Response("https://cand-a.org/platform.pdf", body=b"%PDF-1.4"))
+
+
+def test_requests_are_fetched_over_http_first(spider, website_downloader, monkeypatch):
+    SeleniumRequest = website_downloader.SeleniumRequest
+    requests = {
+        "file": spider.buildRequest("file:///tmp/site/index.html", get_meta(url="file:///tmp/site/index.html")),
+        "http": spider.buildRequest(CANDIDATE[2], get_meta()),
+        "selenium": spider.buildRequest(CANDIDATE[2], get_meta(), render=True),
+    }
+    monkeypatch.setattr(website_downloader.config, "HYBRID_FETCH", 0)
+    requests["no hybrid fetch"] = spider.buildRequest(CANDIDATE[2], get_meta())
+
+    assert {name: (request.meta["fetcher"], isinstance(request, SeleniumRequest)) for name, request in requests.items()} == {
+        "file": ("file", False),
+        "http": ("http", False),
+        "selenium": ("selenium", True),
+        "no hybrid fetch": ("selenium", True),
+    }
+    assert all(request.dont_filter and request.callback == spider.crawlCampaignSite for request in requests.values())
+
+
+def test_pages_fetched_over_http_are_saved_as_they_are(spider, website_downloader):
+    request = spider.buildRequest(CANDIDATE[2], get_meta())
+    body = b'<html><head><title>Home</title></head><body><a href="/about/">About</a></body></html>'
+
+    (link,) = get_output(website_downloader, spider, spider.crawlCampaignSite, HtmlResponse(request.url, body=body, request=request))
+    assert (link.url, link.meta["fetcher"]) == ("https://cand-a.org/about/", "http")
+    with open(website_downloader.config.DATABASE_FILE) as f:
+        (row,) = csv.DictReader(f)
+    assert (row["url"], row["fetcher"]) == (CANDIDATE[2], "http")
+    with open(row["filepath"], "rb") as f:
+        assert f.read() == body
+    assert spider.crawler.stats.get_value("polityzer/fetcher/http") == 1
+
+
+def test_closing_the_crawl_leaves_the_working_directory_alone(spider, tmp_path):
+    for filename in ("README.md", "pyproject.toml", "notes.txt"):
+        (tmp_path / filename).write_text(filename)
+
+    spider.closed("finished")
+    assert all((tmp_path / filename).read_text() == filename for filename in ("README.md", "pyproject.toml", "notes.txt"))
+    assert not (tmp_path / "attachments").exists()
+
+
+def test_focused_crawl_stops_on_policy_pages_in_other_languages(website_downloader, monkeypatch):
+    config = website_downloader.config
+    monkeypatch.setattr(config, "FOCUSED_CRAWL", 1)
+    monkeypatch.setattr(config, "FOCUSED_POLICY_KEYWORDS", ["privacy", "privacidad"])
+    keywords = website_downloader.utils.KeywordMatcher([*config.PRIVACY_KEYWORDS, "privacidad", "aviso"])
+    monkeypatch.setattr(website_downloader.Privacy_Policy_Check, "keyword_matcher", keywords)
+    spider = get_crawler(website_downloader.WebsiteCrawler)._create_spider()
+
+    home = spider.buildRequest(CANDIDATE[2], get_meta())
+    body = '<html><body><a href="/aviso-legal/">Aviso legal</a> <a href="/privacidad/">Aviso de privacidad</a></body></html>'.encode()
+    links = get_output(website_downloader, spider, spider.crawlCampaignSite, HtmlResponse(home.url, body=body, request=home))
+    assert [(request.url, request.meta["policy_link"]) for request in sorted(links, key=lambda request: -request.priority)] == [
+        ("https://cand-a.org/privacidad/", True),
+        ("https://cand-a.org/aviso-legal/", False),
+    ]
+
+    policy = next(request for request in links if request.meta["policy_link"])
+    body = b'<html><body><a href="/contacto/">Contacto</a></body></html>'
+    assert get_output(website_downloader, spider, spider.crawlCampaignSite, HtmlResponse(policy.url, body=body, request=policy)) == []
+    assert spider.isStopped(policy.meta)
+
+
+def test_crawl_settings_follow_the_output_root_set_after_import(website_downloader, monkeypatch):
+    config = website_downloader.config
+    for setting in [*website_downloader.utils.OUTPUT_SETTINGS, "OUTPUT_ROOT"]:
+        monkeypatch.setattr(config, setting, getattr(config, setting))
+    monkeypatch.setattr(config, "SELENIUM_POOL_SIZE", 2)
+    website_downloader.utils.set_output_root("run")
+
+    settings = get_crawler(website_downloader.WebsiteCrawler).settings
+    assert settings["SELENIUM_DOWNLOAD_FOLDER"] == os.path.join("run", "attachments")
+    assert settings.getint("SELENIUM_POOL_SIZE") == 2
+    assert settings.getint("DEPTH_PRIORITY") == 1